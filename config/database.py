@@ -1,15 +1,73 @@
 import sys
 import os
+import time
+import random
 import sqlite3
 import logging
+import threading
+from contextlib import contextmanager
 from threading import Lock
+from config.migrations import apply_migrations
+from config.instrumentation import InstrumentedCursor, query_stats
 
 logger = logging.getLogger(__name__)
 
+# Performance profile applied to every connection when it is opened.
+# WAL lets report queries read while the register commits a sale.
+DEFAULT_PRAGMAS = {
+    'busy_timeout': 5000,           # ms to wait on a locked database
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',        # safe with WAL, avoids an fsync per commit
+    'cache_size': -16000,           # negative = KiB, so ~16 MB per connection
+    'mmap_size': 64 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+    'wal_autocheckpoint': 1000,     # pages
+}
+
+
+def is_busy_error(e):
+    """True for the transient SQLITE_BUSY/SQLITE_LOCKED OperationalErrors."""
+    message = str(e)
+    return isinstance(e, sqlite3.OperationalError) and ('locked' in message or 'busy' in message)
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection that carries the bookkeeping used by the pool."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.last_used = time.monotonic()
+
+    # Every statement goes through an InstrumentedCursor so it is timed.
+    # Connection.execute does not call self.cursor(), hence the overrides.
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
 class Database:
     _instance = None
     _lock = Lock()
 
+    # Pool settings
+    pool_size = 5
+    acquire_timeout = 30.0
+    health_check_interval = 60.0
+
+    # BEGIN IMMEDIATE retry policy for writers (on top of busy_timeout)
+    write_retries = 5
+    write_backoff = 0.05
+
+    # WAL checkpoint scheduler settings
+    checkpoint_interval = 30.0
+    checkpoint_idle_seconds = 10.0
+    wal_size_limit = 16 * 1024 * 1024
+
     def __new__(cls):
         if cls._instance is None:
             with cls._lock:
@@ -31,53 +89,396 @@ class Database:
 
             self.db_path = os.path.join(base_dir, 'supercash.db')
             logger.info(f'Database path: {self.db_path}')
+
+            # Idle connections, most recently used last (LIFO keeps caches warm)
+            self._idle = []
+            self._in_use = set()
+            self._opening = 0
+            self._pool_cond = threading.Condition(Lock())
+            self._closed = False
+            self._local = threading.local()
+            self._last_activity = time.monotonic()
+
+            self.pragmas = dict(DEFAULT_PRAGMAS)
+            self._checkpoint_thread = None
+            self._checkpoint_stop = threading.Event()
+            self.last_checkpoint = None
+
+            # Query instrumentation (see config/instrumentation.py)
+            self.stats = query_stats
+            self.trace_sql = False
             self.initialized = True
 
-    def get_connection(self):
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                               factory=PooledConnection)
+        conn.row_factory = sqlite3.Row  # Enable column access by name
+        self._configure(conn)
+        return conn
+
+    def _configure(self, conn):
+        # Per-connection settings, applied once when the connection is opened
+        conn.execute("PRAGMA foreign_keys = ON")
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        if self.trace_sql:
+            conn.set_trace_callback(self.stats.trace)
+
+    def set_pragmas(self, **pragmas):
+        """Override entries of the performance profile.
+
+        Idle connections are dropped so the next checkout picks up the new
+        settings; connections currently in use keep theirs until returned.
+        """
+        for name, value in pragmas.items():
+            if name not in DEFAULT_PRAGMAS:
+                raise ValueError(f'Unsupported PRAGMA: {name}')
+            if not isinstance(value, int) and not str(value).isalnum():
+                raise ValueError(f'Invalid value for PRAGMA {name}: {value!r}')
+            self.pragmas[name] = value
+
+        self._drop_idle()
+
+    def set_tracing(self, enabled):
+        """Count every statement SQLite runs via its trace callback.
+
+        This includes implicit BEGIN/COMMIT and trigger bodies, at the
+        cost of a Python call per statement, so it is off by default.
+        """
+        self.trace_sql = bool(enabled)
+        self._drop_idle()
+
+    def _drop_idle(self):
+        with self._pool_cond:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._discard(conn)
+
+    def _is_healthy(self, conn):
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, conn):
         try:
-            conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            conn.row_factory = sqlite3.Row  # Enable column access by name
-            # Enable foreign keys
-            conn.execute("PRAGMA foreign_keys = ON")
+            conn.close()
+        except Exception as e:
+            logger.error(f'Error closing connection: {e}', exc_info=True)
+
+    def get_connection(self):
+        deadline = time.monotonic() + self.acquire_timeout
+
+        while True:
+            conn = None
+            with self._pool_cond:
+                while not self._idle and self._open_count() >= self.pool_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        logger.error('Timed out waiting for a database connection')
+                        raise sqlite3.OperationalError('Connection pool exhausted')
+                    self._pool_cond.wait(remaining)
+
+                if self._idle:
+                    conn = self._idle.pop()
+                    self._in_use.add(id(conn))
+                else:
+                    # Reserve the slot now, open the file outside the lock
+                    self._opening += 1
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except sqlite3.Error as e:
+                    logger.error(f'Error connecting to database: {e}', exc_info=True)
+                    raise
+                finally:
+                    with self._pool_cond:
+                        self._opening -= 1
+                        if conn is not None:
+                            self._in_use.add(id(conn))
+                        self._pool_cond.notify()
+            elif time.monotonic() - conn.last_used > self.health_check_interval \
+                    and not self._is_healthy(conn):
+                logger.warning('Discarding unhealthy pooled connection')
+                with self._pool_cond:
+                    self._in_use.discard(id(conn))
+                    self._pool_cond.notify()
+                self._discard(conn)
+                continue
+
             return conn
-        except sqlite3.Error as e:
-            logger.error(f'Error connecting to database: {e}', exc_info=True)
-            raise
+
+    def _open_count(self):
+        return len(self._in_use) + self._opening
 
     def return_connection(self, conn):
-        if conn:
+        if not conn:
+            return
+
+        with self._pool_cond:
+            pooled = id(conn) in self._in_use
+            self._in_use.discard(id(conn))
+
+        if not pooled or not isinstance(conn, PooledConnection):
+            self._discard(conn)
+            return
+
+        try:
+            # Never hand a half-finished transaction to the next caller
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error as e:
+            logger.error(f'Error resetting pooled connection: {e}', exc_info=True)
+            self._discard(conn)
+            with self._pool_cond:
+                self._pool_cond.notify()
+            return
+
+        conn.last_used = time.monotonic()
+        with self._pool_cond:
+            self._last_activity = conn.last_used
+            if self._closed:
+                self._discard(conn)
+            else:
+                self._idle.append(conn)
+            self._pool_cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a pooled connection for the duration of a ``with`` block.
+
+        Nested blocks on the same thread share the outer connection, so
+        helpers called from inside a transaction see (and join) it instead
+        of competing for another pool slot. The connection is counted per
+        block and goes back to the pool when the last one exits, whichever
+        that is: two iter_query generators interleaved on one thread can
+        finish in either order.
+        """
+        held = getattr(self._local, 'held', None)
+        if held is None:
+            held = [self.get_connection(), 0]
+            self._local.held = held
+        held[1] += 1
+        try:
+            yield held[0]
+        finally:
+            held[1] -= 1
+            if not held[1]:
+                if getattr(self._local, 'held', None) is held:
+                    self._local.held = None
+                self.return_connection(held[0])
+
+    def iter_query(self, sql, params=(), batch_size=500):
+        """Yield the rows of ``sql`` while holding one pooled connection.
+
+        Rows are pulled with fetchmany, so memory stays flat however large
+        the result; the connection goes back to the pool when the
+        generator is exhausted or closed.
+        """
+        with self.connection() as conn:
+            cur = conn.execute(sql, params)
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+
+    def run_immediate(self, fn, retries=None, busy_timeout=None):
+        """Run ``fn(cursor)`` in a BEGIN IMMEDIATE transaction and commit.
+
+        Taking the write lock up front means two registers never both read
+        under a shared lock and then fail to upgrade it. If the lock still
+        cannot be had (SQLITE_BUSY after busy_timeout), the whole
+        transaction is retried with jittered exponential backoff, up to
+        ``retries`` times, before the OperationalError is raised.
+        ``busy_timeout`` (ms) overrides the connection's wait for the lock
+        for this call only, for callers that must not block for long.
+        Returns whatever ``fn`` returns.
+
+        Called while the thread's connection is already in a transaction,
+        ``fn`` runs inside a SAVEPOINT instead: a failure undoes only its
+        own work, and committing is left to the caller who opened the
+        transaction. No retries there, since the caller holds the locks.
+        """
+        retries = self.write_retries if retries is None else retries
+        with self.connection() as conn:
+            if conn.in_transaction:
+                conn.execute("SAVEPOINT run_immediate")
+                try:
+                    result = fn(conn.cursor())
+                except Exception:
+                    conn.execute("ROLLBACK TO run_immediate")
+                    conn.execute("RELEASE run_immediate")
+                    raise
+                conn.execute("RELEASE run_immediate")
+                return result
+
+            if busy_timeout is not None:
+                conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout)}")
+            try:
+                return self._run_immediate(conn, fn, retries)
+            finally:
+                if busy_timeout is not None:
+                    conn.execute(f"PRAGMA busy_timeout = {int(self.pragmas['busy_timeout'])}")
+
+    def _run_immediate(self, conn, fn, retries):
+        attempt = 0
+        while True:
             try:
-                conn.close()
-                logger.debug('Connection closed successfully')
+                conn.execute("BEGIN IMMEDIATE")
+                result = fn(conn.cursor())
+                conn.commit()
+                return result
+            except sqlite3.OperationalError as e:
+                if conn.in_transaction:
+                    conn.rollback()
+                if not is_busy_error(e) or attempt >= retries:
+                    raise
+                delay = self.write_backoff * 2 ** attempt
+                attempt += 1
+                logger.warning(f'Database busy, retrying write ({attempt}/{retries})')
+                time.sleep(delay * random.uniform(0.5, 1.5))
+            except Exception:
+                if conn.in_transaction:
+                    conn.rollback()
+                raise
+
+    def pool_status(self):
+        with self._pool_cond:
+            return {
+                'size': self.pool_size,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+            }
+
+    def wal_size(self):
+        try:
+            return os.path.getsize(f'{self.db_path}-wal')
+        except OSError:
+            return 0
+
+    def wal_info(self):
+        with self.connection() as conn:
+            journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+            autocheckpoint = conn.execute("PRAGMA wal_autocheckpoint").fetchone()[0]
+        return {
+            'journal_mode': journal_mode,
+            'wal_bytes': self.wal_size(),
+            'wal_autocheckpoint': autocheckpoint,
+            'last_checkpoint': self.last_checkpoint,
+        }
+
+    def checkpoint(self, mode='PASSIVE'):
+        mode = mode.upper()
+        if mode not in ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'):
+            raise ValueError(f'Invalid checkpoint mode: {mode}')
+
+        with self.connection() as conn:
+            busy, log_frames, checkpointed = conn.execute(
+                f"PRAGMA wal_checkpoint({mode})"
+            ).fetchone()
+
+        self.last_checkpoint = {
+            'mode': mode,
+            'busy': bool(busy),
+            'log_frames': log_frames,
+            'checkpointed_frames': checkpointed,
+            'at': time.time(),
+        }
+        logger.debug(f'WAL checkpoint {mode}: {checkpointed}/{log_frames} frames')
+        return self.last_checkpoint
+
+    def _maybe_checkpoint(self):
+        wal_bytes = self.wal_size()
+        if not wal_bytes:
+            return None
+
+        with self._pool_cond:
+            idle = (not self._in_use and not self._opening and
+                    time.monotonic() - self._last_activity >= self.checkpoint_idle_seconds)
+
+        if idle:
+            # Nobody is at the register: fold the WAL back and shrink the file
+            return self.checkpoint('TRUNCATE')
+        if wal_bytes >= self.wal_size_limit:
+            # Busy, but the WAL keeps growing: copy back what we can without blocking
+            return self.checkpoint('PASSIVE')
+        return None
+
+    def _checkpoint_loop(self):
+        while not self._checkpoint_stop.wait(self.checkpoint_interval):
+            try:
+                self._maybe_checkpoint()
             except Exception as e:
-                logger.error(f'Error closing connection: {e}', exc_info=True)
+                logger.error(f'WAL checkpoint failed: {e}', exc_info=True)
+
+    def start_checkpoint_scheduler(self):
+        if self._checkpoint_thread and self._checkpoint_thread.is_alive():
+            return
+        self._checkpoint_stop.clear()
+        self._checkpoint_thread = threading.Thread(
+            target=self._checkpoint_loop, name='wal-checkpoint', daemon=True
+        )
+        self._checkpoint_thread.start()
+        logger.info('WAL checkpoint scheduler started')
+
+    def stop_checkpoint_scheduler(self):
+        thread = getattr(self, '_checkpoint_thread', None)
+        if thread is None:
+            return
+        self._checkpoint_stop.set()
+        if thread is not threading.current_thread():
+            thread.join(timeout=5)
+        self._checkpoint_thread = None
 
     def close_all(self):
-        # SQLite doesn't need connection pooling cleanup
+        pool_cond = getattr(self, '_pool_cond', None)
+        if pool_cond is None:
+            return
+
+        self.stop_checkpoint_scheduler()
+
+        with pool_cond:
+            idle, self._idle = self._idle, []
+            self._closed = True
+            pool_cond.notify_all()
+
+        for conn in idle:
+            self._discard(conn)
         logger.info('Database connections cleanup completed')
 
     def __del__(self):
         self.close_all()
 
     def initialize(self):
+        # Reopen the pool after a close_all(); nothing else clears the flag,
+        # so threads still running at shutdown cannot revive it
+        with self._pool_cond:
+            self._closed = False
         try:
             logger.info('Initializing SQLite database...')
-            conn = self.get_connection()
+            with self.connection() as conn:
+                # Create tables
+                with open(os.path.join(os.path.dirname(__file__), '..', 'scripts', 'create_tables.sql'), 'r') as f:
+                    sql_script = f.read()
 
-            # Create tables
-            with open(os.path.join(os.path.dirname(__file__), '..', 'scripts', 'create_tables.sql'), 'r') as f:
-                sql_script = f.read()
+                # Execute each statement separately
+                for statement in sql_script.split(';'):
+                    statement = statement.strip()
+                    if statement:
+                        conn.execute(statement)
 
-            # Execute each statement separately
-            for statement in sql_script.split(';'):
-                statement = statement.strip()
-                if statement:
-                    conn.execute(statement)
+                conn.commit()
 
-            conn.commit()
-            self.return_connection(conn)
+                # Bring existing stores up to the current schema version
+                applied = apply_migrations(conn)
+                if applied:
+                    logger.info(f'Applied schema migrations: {applied}')
+            self.start_checkpoint_scheduler()
             logger.info('Database initialization completed successfully')
 
         except Exception as e:
             logger.error(f'Failed to initialize database: {e}', exc_info=True)
-            raise
\ No newline at end of file
+            raise
@@ -0,0 +1,300 @@
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import logging
+import threading
+from bisect import bisect_left
+from collections import Counter, deque
+
+logger = logging.getLogger(__name__)
+# Separate logger so the slow-query log can be routed or silenced on its own
+slow_logger = logging.getLogger('supercash.slow_queries')
+
+# Upper bounds (ms) of the latency histogram buckets; one more bucket holds the rest
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+# Frames in these files are skipped when looking for the statement's call site
+_INTERNAL_FILES = {
+    os.path.abspath(__file__),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database.py'),
+    os.path.abspath(sys.modules['contextlib'].__file__) if 'contextlib' in sys.modules else '',
+}
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# sqlite3 hands the trace callback the SQL with bound values expanded
+# into it: string and blob literals, then numbers, are put back as ?
+_LITERALS = re.compile(r"[xX]?'(?:[^']|'')*'|(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+
+_site_names = {}
+
+
+def _call_site():
+    frame = sys._getframe(2)
+    while frame is not None and frame.f_code.co_filename in _INTERNAL_FILES:
+        frame = frame.f_back
+    if frame is None:
+        return '?'
+    code = frame.f_code
+    where = (code, frame.f_lineno)
+    site = _site_names.get(where)
+    if site is None:
+        path = code.co_filename
+        if path.startswith(_PROJECT_ROOT):
+            path = os.path.relpath(path, _PROJECT_ROOT)
+        site = _site_names[where] = f'{path}:{frame.f_lineno} {code.co_name}'
+    return site
+
+
+class StatementStats:
+    """Counters for one normalised SQL statement."""
+    __slots__ = ('sql', 'calls', 'errors', 'total_ms', 'max_ms', 'fetch_ms',
+                 'rows', 'buckets', 'sites')
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.fetch_ms = 0.0
+        self.rows = 0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.sites = Counter()
+
+    def percentile(self, fraction):
+        """Upper bound (ms) of the bucket holding the given fraction of calls."""
+        if not self.calls:
+            return 0.0
+        target = fraction * self.calls
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.buckets):
+            seen += count
+            if seen >= target:
+                return bound
+        return self.max_ms
+
+    def as_dict(self):
+        return {
+            'sql': self.sql,
+            'calls': self.calls,
+            'errors': self.errors,
+            'total_ms': round(self.total_ms, 3),
+            'avg_ms': round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            'max_ms': round(self.max_ms, 3),
+            'p50_ms': self.percentile(0.50),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'fetch_ms': round(self.fetch_ms, 3),
+            'rows': self.rows,
+            'histogram': dict(zip([f'<={bound}' for bound in BUCKETS_MS] + ['>1000'],
+                                  self.buckets)),
+            'sites': dict(self.sites.most_common()),
+        }
+
+
+class QueryStats:
+    """Per-statement latency histograms, row counts and call sites.
+
+    Every execute()/executemany() on a pooled connection is timed and
+    filed under its SQL text with whitespace collapsed; fetches on the
+    same cursor add their time and rows to that statement. Statements
+    slower than ``slow_ms`` also go to the slow-query log. Parameter
+    values are never recorded, since they include CPFs and password
+    hashes.
+
+    With tracing on, sqlite3's trace callback additionally counts every
+    statement SQLite runs, including implicit BEGIN/COMMIT and trigger
+    bodies that never pass through a cursor.
+    """
+    max_statements = 1000
+    max_sites = 8
+
+    def __init__(self, slow_ms=100.0, slow_log_size=200):
+        self.enabled = True
+        self.slow_ms = slow_ms
+        self._lock = threading.Lock()
+        self._statements = {}
+        self._normalised = {}
+        self._traced = Counter()
+        self.slow_queries = deque(maxlen=slow_log_size)
+        self.started_at = time.time()
+
+    def _key(self, sql):
+        key = self._normalised.get(sql)
+        if key is None:
+            key = ' '.join(sql.split())
+            if len(self._normalised) < self.max_statements * 4:
+                self._normalised[sql] = key
+        return key
+
+    def record(self, sql, elapsed_ms, rows, error=False):
+        """File one execution; returns the key fetches are charged to."""
+        key = self._key(sql)
+        site = _call_site()
+        with self._lock:
+            stats = self._statements.get(key)
+            if stats is None:
+                if len(self._statements) >= self.max_statements:
+                    key = '<other>'
+                    stats = self._statements.get(key)
+                if stats is None:
+                    stats = self._statements[key] = StatementStats(key)
+            stats.calls += 1
+            stats.errors += error
+            stats.total_ms += elapsed_ms
+            if elapsed_ms > stats.max_ms:
+                stats.max_ms = elapsed_ms
+            stats.rows += rows
+            stats.buckets[bisect_left(BUCKETS_MS, elapsed_ms)] += 1
+            if site in stats.sites or len(stats.sites) < self.max_sites:
+                stats.sites[site] += 1
+
+        if elapsed_ms >= self.slow_ms:
+            entry = {'at': time.time(), 'ms': round(elapsed_ms, 3), 'sql': key, 'site': site}
+            self.slow_queries.append(entry)
+            slow_logger.warning(f'Slow query ({elapsed_ms:.1f} ms) at {site}: {key[:500]}')
+        return key
+
+    def record_fetch(self, key, elapsed_ms, rows):
+        if key is None:
+            return
+        with self._lock:
+            stats = self._statements.get(key)
+            if stats is not None:
+                stats.fetch_ms += elapsed_ms
+                stats.rows += rows
+
+    def trace(self, statement):
+        # sqlite3 trace callback: runs for every statement. Values are
+        # stripped so CPFs and hashes never become keys, and distinct
+        # values do not each add a key.
+        key = _LITERALS.sub('?', ' '.join(statement.split()))[:160]
+        with self._lock:
+            if key not in self._traced and len(self._traced) >= self.max_statements:
+                key = '<other>'
+            self._traced[key] += 1
+
+    def reset(self):
+        with self._lock:
+            self._statements = {}
+            self._traced = Counter()
+            self.slow_queries.clear()
+            self.started_at = time.time()
+
+    def snapshot(self):
+        """Plain-dict copy of every counter, busiest statements first."""
+        with self._lock:
+            statements = [stats.as_dict() for stats in self._statements.values()]
+            traced = dict(self._traced.most_common(200))
+        statements.sort(key=lambda stats: stats['total_ms'], reverse=True)
+        return {
+            'started_at': self.started_at,
+            'taken_at': time.time(),
+            'slow_ms': self.slow_ms,
+            'statements': statements,
+            'slow_queries': list(self.slow_queries),
+            'traced': traced,
+        }
+
+    def dump(self, path):
+        """Write snapshot() as JSON, atomically, for scripts/query_stats.py."""
+        tmp_path = f'{path}.part'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+        return path
+
+
+def stats_path(db_path):
+    """Where the running app dumps its counters: next to the database."""
+    return f'{os.path.splitext(db_path)[0]}-query-stats.json'
+
+
+def format_report(snapshot, limit=20, sort='total_ms'):
+    """Fixed-width text table of a snapshot, for the CLI and the dev overlay."""
+    statements = sorted(snapshot['statements'], key=lambda stats: stats[sort], reverse=True)
+    lines = [
+        f'{"calls":>8} {"errors":>6} {"total ms":>10} {"avg":>8} {"p95":>7} {"max":>8} '
+        f'{"rows":>9}  sql',
+    ]
+    for stats in statements[:limit]:
+        sql = stats['sql'] if len(stats['sql']) <= 90 else stats['sql'][:87] + '...'
+        lines.append(f'{stats["calls"]:>8} {stats["errors"]:>6} {stats["total_ms"]:>10.1f} {stats["avg_ms"]:>8.2f} '
+                     f'{stats["p95_ms"]:>7} {stats["max_ms"]:>8.1f} {stats["rows"]:>9}  {sql}')
+        top_site = next(iter(stats['sites']), None)
+        if top_site:
+            lines.append(f'{"":>62}  at {top_site}')
+    if snapshot['slow_queries']:
+        lines.append('')
+        lines.append(f'Slow queries (>= {snapshot["slow_ms"]} ms), newest last:')
+        for entry in snapshot['slow_queries'][-limit:]:
+            lines.append(f'  {time.strftime("%H:%M:%S", time.localtime(entry["at"]))} '
+                         f'{entry["ms"]:>8.1f} ms  {entry["site"]}  {entry["sql"][:80]}')
+    return '\n'.join(lines)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor whose execute/executemany/fetch* calls feed ``query_stats``."""
+
+    _stats_key = None
+
+    def execute(self, sql, parameters=()):
+        stats = query_stats
+        if not stats.enabled:
+            return super().execute(sql, parameters)
+        start = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        except sqlite3.Error:
+            stats.record(sql, (time.perf_counter() - start) * 1000, 0, error=True)
+            raise
+        self._stats_key = stats.record(sql, (time.perf_counter() - start) * 1000,
+                                       max(self.rowcount, 0))
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        stats = query_stats
+        if not stats.enabled:
+            return super().executemany(sql, seq_of_parameters)
+        start = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        except sqlite3.Error:
+            stats.record(sql, (time.perf_counter() - start) * 1000, 0, error=True)
+            raise
+        self._stats_key = stats.record(sql, (time.perf_counter() - start) * 1000,
+                                       max(self.rowcount, 0))
+        return self
+
+    def fetchone(self):
+        if self._stats_key is None:
+            return super().fetchone()
+        start = time.perf_counter()
+        row = super().fetchone()
+        query_stats.record_fetch(self._stats_key, (time.perf_counter() - start) * 1000,
+                                 row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        if self._stats_key is None:
+            return super().fetchmany(self.arraysize if size is None else size)
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        query_stats.record_fetch(self._stats_key, (time.perf_counter() - start) * 1000, len(rows))
+        return rows
+
+    def fetchall(self):
+        if self._stats_key is None:
+            return super().fetchall()
+        start = time.perf_counter()
+        rows = super().fetchall()
+        query_stats.record_fetch(self._stats_key, (time.perf_counter() - start) * 1000, len(rows))
+        return rows
+
+
+# Process-wide; Database exposes it as ``Database().stats``
+query_stats = QueryStats()
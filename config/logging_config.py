@@ -0,0 +1,191 @@
+import os
+import gzip
+import json
+import time
+import queue
+import atexit
+import shutil
+import logging
+from datetime import datetime, timedelta
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_FILE = 'supercash.log'
+MAX_BYTES = 5 * 1024 * 1024
+BACKUP_COUNT = 10
+
+# Default per-module levels; '' is the root logger. The 'log_levels'
+# setting and then the SUPERCASH_LOG_LEVELS environment variable override
+# them, both in the form "config.database=DEBUG,models=WARNING".
+DEFAULT_LEVELS = {
+    '': 'INFO',
+    'supercash.slow_queries': 'WARNING',
+}
+
+# LogRecord attributes that are not user-supplied ``extra`` fields
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, so the log can be filtered with jq or grep."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'thread': record.threadName,
+            'where': f'{record.module}:{record.lineno}',
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = record.stack_info
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class BackgroundQueueHandler(QueueHandler):
+    """Hands records to the listener thread with as little work as possible.
+
+    The stock prepare() runs the full formatter on the calling thread; here
+    only the message is merged with its args (they may not be picklable or
+    may change later) and any traceback is rendered. JSON encoding and file
+    I/O happen on the listener thread.
+    """
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class CompressingRotatingFileHandler(RotatingFileHandler):
+    """Rotates when the file reaches ``maxBytes`` or at local midnight.
+
+    Rotated files are gzipped (supercash.log.1.gz, .2.gz, ...). Both the
+    rotation and the compression run on the listener thread.
+    """
+
+    def __init__(self, filename, maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT,
+                 encoding='utf-8'):
+        super().__init__(filename, maxBytes=maxBytes, backupCount=backupCount,
+                         encoding=encoding, delay=True)
+        self.namer = lambda name: f'{name}.gz'
+        self.rotator = self._compress
+        self.rollover_at = self._next_midnight()
+
+    @staticmethod
+    def _next_midnight():
+        tomorrow = datetime.now().date() + timedelta(days=1)
+        return datetime.combine(tomorrow, datetime.min.time()).timestamp()
+
+    @staticmethod
+    def _compress(source, dest):
+        with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+
+    def shouldRollover(self, record):
+        if time.time() >= self.rollover_at:
+            if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename):
+                return True
+            # Nothing logged yesterday: no empty backup, just wait for tomorrow
+            self.rollover_at = self._next_midnight()
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = self._next_midnight()
+
+
+def parse_levels(spec):
+    """"a.b=DEBUG,c=WARNING" -> {'a.b': 'DEBUG', 'c': 'WARNING'}; 'root' means ''."""
+    levels = {}
+    for item in (spec or '').split(','):
+        name, sep, level = item.partition('=')
+        if not sep:
+            continue
+        name = name.strip()
+        level = level.strip().upper()
+        if not isinstance(logging.getLevelName(level), int):
+            logging.getLogger(__name__).warning(f'Ignoring unknown log level {level!r} for {name!r}')
+            continue
+        levels['' if name == 'root' else name] = level
+    return levels
+
+
+def apply_levels(levels):
+    for name, level in levels.items():
+        logging.getLogger(name or None).setLevel(level)
+
+
+def configure_levels(setting=None):
+    """Defaults, then the stored 'log_levels' setting, then the environment."""
+    apply_levels(DEFAULT_LEVELS)
+    apply_levels(parse_levels(setting))
+    apply_levels(parse_levels(os.environ.get('SUPERCASH_LOG_LEVELS')))
+
+
+def setup_logging(log_file=LOG_FILE, console_level='INFO'):
+    """Route every record through a queue to a background writer thread.
+
+    Loggers only enqueue; the listener thread writes JSON lines to a
+    rotating, compressed ``log_file`` and a short text line to the console.
+    Safe to call more than once; later calls replace the pipeline.
+    """
+    global _listener
+    stop_logging()
+
+    file_handler = CompressingRotatingFileHandler(log_file)
+    file_handler.setFormatter(JsonFormatter())
+
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(console_level)
+    console_handler.setFormatter(
+        logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    # Drops basicConfig handlers and any left by a stopped pipeline
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(BackgroundQueueHandler(log_queue))
+
+    configure_levels()
+
+    _listener = QueueListener(log_queue, file_handler, console_handler,
+                              respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging():
+    """Flush queued records and stop the writer thread.
+
+    The writer's handlers are then attached to the root logger directly,
+    so records logged during shutdown are still written, synchronously.
+    """
+    global _listener
+    if _listener is not None:
+        listener, _listener = _listener, None
+        listener.stop()
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            if isinstance(handler, QueueHandler):
+                root.removeHandler(handler)
+        for handler in listener.handlers:
+            root.addHandler(handler)
+
+
+atexit.register(stop_logging)
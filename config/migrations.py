@@ -0,0 +1,77 @@
+import os
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), '..', 'scripts', 'migrations')
+
+# Files are named <version>_<description>.sql, e.g. 001_add_indexes.sql
+_MIGRATION_RE = re.compile(r'^(\d+)_([\w-]+)\.sql$')
+
+
+def list_migrations(migrations_dir=MIGRATIONS_DIR):
+    """Return (version, name, path) for every migration file, in order."""
+    migrations = []
+    if not os.path.isdir(migrations_dir):
+        return migrations
+
+    for filename in os.listdir(migrations_dir):
+        match = _MIGRATION_RE.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2),
+                               os.path.join(migrations_dir, filename)))
+
+    migrations.sort()
+    versions = [version for version, _, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f'Duplicate migration versions in {migrations_dir}')
+    return migrations
+
+
+def current_version(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.commit()
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def apply_migrations(conn, migrations_dir=MIGRATIONS_DIR):
+    """Apply every migration newer than the stored schema version.
+
+    Each file runs in its own transaction together with its schema_version
+    row, so a failing migration leaves the database at the previous version.
+    Returns the list of versions applied.
+    """
+    version = current_version(conn)
+    applied = []
+
+    for number, name, path in list_migrations(migrations_dir):
+        if number <= version:
+            continue
+
+        with open(path, 'r', encoding='utf-8') as f:
+            sql_script = f.read()
+
+        logger.info(f'Applying migration {number:03d}_{name}')
+        try:
+            conn.executescript(f"""
+                BEGIN;
+                {sql_script}
+                ;
+                INSERT INTO schema_version (version, name) VALUES ({number}, '{name}');
+                COMMIT;
+            """)
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            logger.error(f'Migration {number:03d}_{name} failed', exc_info=True)
+            raise
+        applied.append(number)
+
+    return applied
@@ -0,0 +1,42 @@
+import threading
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+from models.exportacao import export_report, ExportCancelled
+
+
+class _ExportSignals(QObject):
+    progress = Signal(int)
+    finished = Signal(str, int)
+    failed = Signal(str)
+    cancelled = Signal()
+
+
+class ExportTask(QRunnable):
+    """Writes one report to a CSV/XLSX/PDF file on a pool thread."""
+
+    def __init__(self, path, relatorio, start_date=None, end_date=None):
+        super().__init__()
+        self.path = path
+        self.relatorio = relatorio
+        self.start_date = start_date
+        self.end_date = end_date
+        self.signals = _ExportSignals()
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def run(self):
+        try:
+            count = export_report(self.path, self.relatorio, self.start_date, self.end_date,
+                                  progress=self.signals.progress.emit,
+                                  cancel_event=self._cancel)
+        except ExportCancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+        else:
+            self.signals.finished.emit(self.path, count)
+
+    def start(self):
+        QThreadPool.globalInstance().start(self)
+        return self
@@ -3,19 +3,25 @@ from ui.login import LoginWindow
 from models.usuario import Usuario
 from ui.dashboard import DashboardWindow
 from ui.admin_dashboard import AdminDashboardWindow
+from controllers.worker import Worker
 
 class LoginController:
     def __init__(self):
         self.login_window = LoginWindow()
+        self._worker = None
         self.setup_connections()
     
     def setup_connections(self):
         self.login_window.login_button.clicked.connect(self.handle_login)
+        self.login_window.password_input.returnPressed.connect(self.handle_login)
     
     def show_login(self):
         self.login_window.show()
     
     def handle_login(self):
+        if self._worker is not None:
+            return
+
         username = self.login_window.username_input.text().strip()
         password = self.login_window.password_input.text().strip()
         
@@ -23,7 +29,16 @@ class LoginController:
             QMessageBox.warning(self.login_window, 'Error', 'Please enter both username and password')
             return
         
-        user = Usuario.authenticate(username, password)
+        # Password verification is deliberately slow; keep it off the UI thread
+        self.login_window.set_busy(True)
+        self._worker = Worker(Usuario.authenticate, username, password)
+        self._worker.signals.finished.connect(self.on_authenticated)
+        self._worker.signals.failed.connect(self.on_authentication_failed)
+        self._worker.start()
+
+    def on_authenticated(self, user):
+        self._worker = None
+        self.login_window.set_busy(False)
         
         if user:
             QMessageBox.information(self.login_window, 'Success', f'Welcome {user.nome}!')
@@ -38,4 +53,9 @@ class LoginController:
             self.dashboard.show()
         else:
             QMessageBox.warning(self.login_window, 'Error', 'Invalid username or password')
-            self.login_window.password_input.clear()
\ No newline at end of file
+            self.login_window.password_input.clear()
+
+    def on_authentication_failed(self, message):
+        self._worker = None
+        self.login_window.set_busy(False)
+        QMessageBox.critical(self.login_window, 'Error', f'Login failed: {message}')
@@ -0,0 +1,117 @@
+import sqlite3
+import threading
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, QTimer, Signal
+from config.database import Database
+
+
+class _SearchSignals(QObject):
+    finished = Signal(int, str, object)
+    failed = Signal(int, str, str)
+
+
+class _SearchTask(QRunnable):
+    """Runs one query on a pool thread, on a connection it can interrupt."""
+
+    def __init__(self, generation, text, search_fn):
+        super().__init__()
+        self.generation = generation
+        self.text = text
+        self.search_fn = search_fn
+        self.signals = _SearchSignals()
+        self._conn = None
+        self._cancelled = False
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        with self._lock:
+            self._cancelled = True
+            if self._conn is not None:
+                # Aborts the running statement with OperationalError
+                self._conn.interrupt()
+
+    def run(self):
+        if self._cancelled:
+            return
+        try:
+            # Model code using Database.connection() on this thread shares
+            # this connection, so cancel() can interrupt its statements
+            with Database().connection() as conn:
+                with self._lock:
+                    self._conn = conn
+                try:
+                    results = self.search_fn(self.text)
+                finally:
+                    with self._lock:
+                        self._conn = None
+        except sqlite3.OperationalError as e:
+            if not self._cancelled:
+                self.signals.failed.emit(self.generation, self.text, str(e))
+            return
+        except Exception as e:
+            self.signals.failed.emit(self.generation, self.text, str(e))
+            return
+
+        if not self._cancelled:
+            self.signals.finished.emit(self.generation, self.text, results)
+
+
+class SearchController(QObject):
+    """Search-as-you-type for a QLineEdit.
+
+    Keystrokes are debounced, the query runs on the global QThreadPool and
+    a newer keystroke cancels the query still in flight, so only results
+    for the latest text ever reach ``results_ready``.
+    """
+    results_ready = Signal(str, object)
+    search_failed = Signal(str, str)
+    busy_changed = Signal(bool)
+
+    def __init__(self, line_edit, search_fn, delay_ms=250, parent=None):
+        super().__init__(parent or line_edit)
+        self.search_fn = search_fn
+        self.line_edit = line_edit
+        self._generation = 0
+        self._task = None
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay_ms)
+        self._timer.timeout.connect(self.trigger)
+        line_edit.textChanged.connect(self._on_text_changed)
+
+    def _on_text_changed(self, _text):
+        self._timer.start()
+
+    def trigger(self):
+        """Search for the current text right away."""
+        self._timer.stop()
+        self.cancel()
+
+        self._generation += 1
+        task = _SearchTask(self._generation, self.line_edit.text().strip(), self.search_fn)
+        task.signals.finished.connect(self._on_finished)
+        task.signals.failed.connect(self._on_failed)
+        self._task = task
+        self.busy_changed.emit(True)
+        QThreadPool.globalInstance().start(task)
+
+    def cancel(self):
+        self._timer.stop()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+            self.busy_changed.emit(False)
+
+    def _on_finished(self, generation, text, results):
+        if generation != self._generation:
+            return
+        self._task = None
+        self.busy_changed.emit(False)
+        self.results_ready.emit(text, results)
+
+    def _on_failed(self, generation, text, message):
+        if generation != self._generation:
+            return
+        self._task = None
+        self.busy_changed.emit(False)
+        self.search_failed.emit(text, message)
@@ -6,16 +6,14 @@ from PySide6.QtWidgets import QApplication, QMessageBox
 from PySide6.QtCore import QFile
 from controllers.login_controller import LoginController
 from config.database import Database
+from config.instrumentation import stats_path
+from config.logging_config import setup_logging, configure_levels, stop_logging
+from models.configuracao import Configuracao
+from models.diario_vendas import DiarioVendas
 
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('supercash.log'),
-        logging.StreamHandler()
-    ]
-)
+# Configure logging: records are queued and written as JSON lines by a
+# background thread, so logging never blocks the register on file I/O
+setup_logging()
 logger = logging.getLogger(__name__)
 
 def setup_environment():
@@ -49,6 +47,19 @@ def main():
         db = Database()
         db.initialize()
         
+        # Per-module log levels stored with the installation's settings
+        configure_levels(Configuracao.get('log_levels'))
+        
+        # Query instrumentation: the slow-query threshold and full SQL
+        # tracing are per-installation settings
+        db.stats.slow_ms = float(Configuracao.get('slow_query_ms', db.stats.slow_ms))
+        db.set_tracing(Configuracao.get('trace_sql', '0') == '1')
+        
+        # Commit sales journalled by the register, including any left over
+        # from the previous run
+        sale_journal = DiarioVendas()
+        sale_journal.start()
+        
         # Create Qt application
         logger.info('Creating Qt application instance')
         app = QApplication(sys.argv)
@@ -56,6 +67,17 @@ def main():
         # Set application style
         app.setStyle('Fusion')
         
+        # Drain the sale journal, then stop the WAL checkpointer and close
+        # pooled connections on exit
+        app.aboutToQuit.connect(sale_journal.stop)
+        app.aboutToQuit.connect(db.close_all)
+        
+        # Leave the query counters where scripts/query_stats.py looks for them
+        app.aboutToQuit.connect(lambda: db.stats.dump(stats_path(db.db_path)))
+        
+        # Flush whatever is still queued for the log writer
+        app.aboutToQuit.connect(stop_logging)
+        
         # Initialize and show login window
         logger.info('Initializing login controller')
         login_controller = LoginController()
@@ -0,0 +1,17 @@
+import re
+
+# Same notion of a token as the unicode61 tokenizer: runs of letters/digits
+_TOKEN_RE = re.compile(r'[^\W_]+')
+
+
+def fts_query(text):
+    """Turn free text typed by the user into an FTS5 MATCH expression.
+
+    Every token becomes a quoted prefix term, so "rac golden" finds
+    "Ração Golden Adulto" and punctuation in CPF/CNPJ or barcodes cannot
+    break the query syntax. Returns None when there is nothing to search.
+    """
+    tokens = _TOKEN_RE.findall(text or '')
+    if not tokens:
+        return None
+    return ' '.join(f'"{token}"*' for token in tokens)
@@ -0,0 +1,119 @@
+from models.dinheiro import to_money, ZERO
+
+
+class ItemCarrinho:
+    def __init__(self, produto_id, nome, preco, estoque, quantidade=1):
+        self.produto_id = produto_id
+        self.nome = nome
+        self.preco_tabela = to_money(preco)
+        self.preco = self.preco_tabela
+        self.estoque = estoque
+        self.quantidade = quantidade
+
+    @property
+    def subtotal(self):
+        return self.preco * self.quantidade
+
+
+class Carrinho:
+    """Cart lines keyed by product, with the subtotal kept up to date.
+
+    Scanning a product that is already in the cart bumps its quantity
+    instead of adding a line. Every change adjusts ``subtotal`` by its
+    own delta, so totals never require a pass over the cart.
+    """
+    MAX_QUANTIDADE = 9999
+
+    def __init__(self):
+        self.itens = []
+        self._rows = {}
+        self.subtotal = ZERO
+        self.desconto = ZERO
+
+    def __len__(self):
+        return len(self.itens)
+
+    def __getitem__(self, row):
+        return self.itens[row]
+
+    @property
+    def total(self):
+        return self.subtotal - self.desconto
+
+    def row_of(self, produto_id):
+        return self._rows.get(produto_id)
+
+    def limite(self, item):
+        return min(self.MAX_QUANTIDADE, item.estoque)
+
+    def can_add(self, produto, quantidade=1):
+        row = self._rows.get(produto.id)
+        if row is not None:
+            item = self.itens[row]
+            return item.quantidade + quantidade <= self.limite(item)
+        return 1 <= quantidade <= min(self.MAX_QUANTIDADE, produto.estoque_atual)
+
+    def add(self, produto, quantidade=1):
+        """Add ``produto`` or merge into its line; returns the row, or None when out of stock."""
+        if not self.can_add(produto, quantidade):
+            return None
+        row = self._rows.get(produto.id)
+        if row is not None:
+            self.set_quantidade(row, self.itens[row].quantidade + quantidade)
+            return row
+
+        item = ItemCarrinho(produto.id, produto.nome, produto.preco_venda,
+                            produto.estoque_atual, quantidade)
+        row = len(self.itens)
+        self.itens.append(item)
+        self._rows[produto.id] = row
+        self.subtotal += item.subtotal
+        return row
+
+    def set_quantidade(self, row, quantidade):
+        item = self.itens[row]
+        if not 1 <= quantidade <= self.limite(item):
+            return False
+        self.subtotal += item.preco * (quantidade - item.quantidade)
+        item.quantidade = quantidade
+        return True
+
+    def set_preco(self, row, preco):
+        preco = to_money(preco)
+        if preco < 0:
+            return False
+        item = self.itens[row]
+        self.subtotal += (preco - item.preco) * item.quantidade
+        item.preco = preco
+        return True
+
+    def set_desconto(self, desconto):
+        desconto = to_money(desconto)
+        if desconto < 0:
+            return False
+        self.desconto = desconto
+        return True
+
+    def remove(self, row):
+        item = self.itens.pop(row)
+        del self._rows[item.produto_id]
+        # Only the lines after the removed one move up
+        for following in self.itens[row:]:
+            self._rows[following.produto_id] -= 1
+        self.subtotal -= item.subtotal
+        return item
+
+    def clear(self):
+        self.itens = []
+        self._rows = {}
+        self.subtotal = ZERO
+        self.desconto = ZERO
+
+    def fill_venda(self, venda):
+        """Copy the cart lines and discount into ``venda`` (replacing its items)."""
+        venda.itens = []
+        venda.valor_total = ZERO
+        for item in self.itens:
+            venda.add_item(item.produto_id, item.quantidade, item.preco)
+        venda.desconto = self.desconto
+        return venda
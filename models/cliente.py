@@ -1,9 +1,20 @@
 
 from config.database import Database
+from models.periodo import day_bounds, parse_timestamp, parse_date
+from models.busca import fts_query
+from models.dinheiro import from_cents
+from models.registro import RowMapper, name_keyset, where_clause
+from models.resumo_cliente import ResumoCliente
 from datetime import datetime
 import sqlite3
 
+CLIENT_COLUMNS = "id, nome, cpf_cnpj, telefone, endereco, pet_nome, pet_nascimento"
+
+
 class Cliente:
+    __slots__ = ('id', 'nome', 'cpf_cnpj', 'telefone', 'endereco',
+                 'pet_nome', 'pet_nascimento')
+
     def __init__(self, id=None, nome=None, cpf_cnpj=None, telefone=None,
                  endereco=None, pet_nome=None, pet_nascimento=None):
         self.id = id
@@ -13,10 +24,10 @@ class Cliente:
         self.endereco = endereco
         self.pet_nome = pet_nome
         self.pet_nascimento = pet_nascimento
-        self.db = Database()
     
     def save(self):
-        conn = self.db.get_connection()
+        db = Database()
+        conn = db.get_connection()
         cur = conn.cursor()
         
         try:
@@ -49,7 +60,7 @@ class Cliente:
             conn.commit()
             return self.id
         finally:
-            self.db.return_connection(conn)
+            db.return_connection(conn)
 
     @classmethod
     def get_by_id(cls, cliente_id):
@@ -58,19 +69,12 @@ class Cliente:
         
         try:
             cur = conn.cursor()
-            cur.execute("SELECT * FROM clientes WHERE id = ?", (cliente_id,))
+            cur.execute(f"SELECT {CLIENT_COLUMNS} FROM clientes WHERE id = ?",
+                        (cliente_id,))
             cliente_data = cur.fetchone()
             
             if cliente_data:
-                return cls(
-                    id=cliente_data[0],
-                    nome=cliente_data[1],
-                    cpf_cnpj=cliente_data[2],
-                    telefone=cliente_data[4],
-                    endereco=cliente_data[5],
-                    pet_nome=cliente_data[6],
-                    pet_nascimento=cliente_data[7]
-                )
+                return cls._from_row(cliente_data)
             return None
         finally:
             db.return_connection(conn)
@@ -82,84 +86,196 @@ class Cliente:
         
         try:
             cur = conn.cursor()
-            cur.execute("SELECT * FROM clientes WHERE cpf_cnpj = ?", (cpf_cnpj,))
+            cur.execute(f"SELECT {CLIENT_COLUMNS} FROM clientes WHERE cpf_cnpj = ?",
+                        (cpf_cnpj,))
             cliente_data = cur.fetchone()
             
             if cliente_data:
-                return cls(
-                    id=cliente_data[0],
-                    nome=cliente_data[1],
-                    cpf_cnpj=cliente_data[2],
-                    telefone=cliente_data[4],
-                    endereco=cliente_data[5],
-                    pet_nome=cliente_data[6],
-                    pet_nascimento=cliente_data[7]
-                )
+                return cls._from_row(cliente_data)
             return None
         finally:
             db.return_connection(conn)
 
     @classmethod
     def get_all(cls):
+        return list(cls.iter_all())
+
+    @classmethod
+    def iter_all(cls, batch_size=500):
+        """Stream every client by name, ``batch_size`` rows per fetch."""
+        rows = Database().iter_query(f"""
+            SELECT {CLIENT_COLUMNS}
+            FROM clientes
+            ORDER BY nome, id
+        """, batch_size=batch_size)
+        for row in rows:
+            yield cls._from_row(row)
+
+    @classmethod
+    def get_page(cls, limit=100, after_id=None, after_name=None, search=None, com_pet=None):
+        """One page of clients by name, after the (after_name, after_id) cursor.
+
+        ``search`` keeps only full-text matches; ``com_pet`` True/False keeps
+        clients with/without a registered pet.
+        """
+        conditions = []
+        params = []
+        keyset, keyset_params = name_keyset('clientes', after_id, after_name)
+        if keyset:
+            conditions.append(keyset)
+            params.extend(keyset_params)
+        match = fts_query(search)
+        if match:
+            conditions.append("id IN (SELECT rowid FROM clientes_fts WHERE clientes_fts MATCH ?)")
+            params.append(match)
+        if com_pet is not None:
+            conditions.append("pet_nome IS NOT NULL AND pet_nome != ''" if com_pet
+                              else "(pet_nome IS NULL OR pet_nome = '')")
+
         db = Database()
         conn = db.get_connection()
         
         try:
             cur = conn.cursor()
-            cur.execute("SELECT * FROM clientes ORDER BY nome")
-            clientes = []
-            
-            for cliente_data in cur.fetchall():
-                clientes.append(cls(
-                    id=cliente_data[0],
-                    nome=cliente_data[1],
-                    cpf_cnpj=cliente_data[2],
-                    telefone=cliente_data[4],
-                    endereco=cliente_data[5],
-                    pet_nome=cliente_data[6],
-                    pet_nascimento=cliente_data[7]
-                ))
-            
-            return clientes
+            cur.execute(f"""
+                SELECT {CLIENT_COLUMNS}
+                FROM clientes
+                {where_clause(conditions)}
+                ORDER BY nome, id
+                LIMIT ?
+            """, (*params, limit))
+            return cls._from_row.all(cur.fetchall())
         finally:
             db.return_connection(conn)
 
-    def get_purchase_history(self):
-        conn = self.db.get_connection()
+    @classmethod
+    def search(cls, text, limit=50):
+        """Clients matching ``text`` in name, CPF/CNPJ, e-mail, phone or
+        pet name (prefix, accent-insensitive), best matches first."""
+        match = fts_query(text)
+        if not match:
+            return []
+
+        # Runs on the worker's held connection when called from a search task
+        with Database().connection() as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT c.id, c.nome, c.cpf_cnpj, c.telefone, c.endereco,
+                       c.pet_nome, c.pet_nascimento
+                FROM clientes_fts f
+                JOIN clientes c ON c.id = f.rowid
+                WHERE clientes_fts MATCH ?
+                ORDER BY bm25(clientes_fts, 10.0, 8.0, 2.0, 2.0, 4.0)
+                LIMIT ?
+            """, (match, limit))
+            return cls._from_row.all(cur.fetchall())
+
+    @classmethod
+    def get_most_active(cls, start_date, end_date, limit=50):
+        """Customers with the most purchases between start_date and end_date."""
+        return list(cls.iter_most_active(start_date, end_date, limit))
+
+    @classmethod
+    def iter_most_active(cls, start_date, end_date, limit=None):
+        """Stream customers by purchases between start_date and end_date, most first.
+
+        ``limit=None`` streams every customer who bought in the period.
+        """
+        rows = Database().iter_query("""
+            SELECT c.id, c.nome, c.cpf_cnpj, c.telefone, c.endereco,
+                   c.pet_nome, c.pet_nascimento,
+                   COUNT(*) AS total_compras,
+                   SUM(v.valor_total) AS valor_total,
+                   MAX(v.data_venda) AS ultima_compra
+            FROM vendas v
+            JOIN clientes c ON c.id = v.cliente_id
+            WHERE v.data_venda >= ? AND v.data_venda < ?
+            GROUP BY v.cliente_id
+            ORDER BY total_compras DESC, valor_total DESC
+            LIMIT ?
+        """, (*day_bounds(start_date, end_date), -1 if limit is None else limit))
+        
+        for row in rows:
+            yield {
+                'cliente': cls._from_row(row),
+                'total_compras': row[7],
+                'valor_total': from_cents(row[8]),
+                'ultima_compra': parse_timestamp(row[9])
+            }
+
+    def get_summary(self):
+        """Lifetime value, purchase count, average ticket and first/last purchase.
+
+        Read from the maintained resumo_clientes row, not from the history.
+        """
+        return ResumoCliente.get(self.id)
+
+    def get_purchase_history(self, limit=20, after_id=None):
+        """One page of this client's sales, newest first, each with its items.
+
+        ``after_id`` is the last sale already shown. Sales are paged on
+        (data_venda, id) along idx_vendas_cliente_data, and the items of
+        the whole page come from a second query, so a page costs two
+        queries however long the history is.
+        """
+        conditions = ["v.cliente_id = ?"]
+        params = [self.id]
+        if after_id is not None:
+            conditions.append("(v.data_venda, v.id) < "
+                              "((SELECT data_venda FROM vendas WHERE id = ?), ?)")
+            params.extend((after_id, after_id))
+
+        db = Database()
+        conn = db.get_connection()
         
         try:
             cur = conn.cursor()
-            cur.execute("""
-                SELECT v.id, v.data_venda, v.valor_total, v.forma_pagamento,
-                       p.nome as produto_nome, iv.quantidade, iv.preco_unitario
+            cur.execute(f"""
+                SELECT v.id, v.data_venda, v.valor_total, v.desconto, v.forma_pagamento
                 FROM vendas v
-                JOIN itens_venda iv ON v.id = iv.venda_id
-                JOIN produtos p ON iv.produto_id = p.id
-                WHERE v.cliente_id = ?
-                ORDER BY v.data_venda DESC
-            """, (self.id,))
+                {where_clause(conditions)}
+                ORDER BY v.data_venda DESC, v.id DESC
+                LIMIT ?
+            """, (*params, limit))
             
-            purchases = []
+            purchases = {}
             for row in cur.fetchall():
-                purchases.append({
+                purchases[row[0]] = {
                     'venda_id': row[0],
-                    'data': row[1],
-                    'valor_total': row[2],
-                    'forma_pagamento': row[3],
-                    'produto': row[4],
-                    'quantidade': row[5],
-                    'preco_unitario': row[6]
+                    'data': parse_timestamp(row[1]),
+                    'valor_total': from_cents(row[2]),
+                    'desconto': from_cents(row[3]),
+                    'forma_pagamento': row[4],
+                    'itens': []
+                }
+            if not purchases:
+                return []
+            
+            cur.execute(f"""
+                SELECT iv.venda_id, p.nome, iv.quantidade, iv.preco_unitario, iv.subtotal
+                FROM itens_venda iv
+                LEFT JOIN produtos p ON p.id = iv.produto_id
+                WHERE iv.venda_id IN ({','.join('?' * len(purchases))})
+                ORDER BY iv.id
+            """, list(purchases))
+            for row in cur.fetchall():
+                purchases[row[0]]['itens'].append({
+                    'produto': row[1] or '?',
+                    'quantidade': row[2],
+                    'preco_unitario': from_cents(row[3]),
+                    'subtotal': from_cents(row[4])
                 })
             
-            return purchases
+            return list(purchases.values())
         finally:
-            self.db.return_connection(conn)
+            db.return_connection(conn)
 
     def delete(self):
         if self.id is None:
             return False
             
-        conn = self.db.get_connection()
+        db = Database()
+        conn = db.get_connection()
         
         try:
             cur = conn.cursor()
@@ -170,6 +286,13 @@ class Cliente:
             print(f"Error deleting client: {e}")
             success = False
         finally:
-            self.db.return_connection(conn)
+            db.return_connection(conn)
             
         return success
+
+
+# Row (CLIENT_COLUMNS order) -> Cliente; the birth date is stored as ISO text
+Cliente._from_row = RowMapper(Cliente, [
+    'id', 'nome', 'cpf_cnpj', 'telefone', 'endereco', 'pet_nome',
+    ('pet_nascimento', parse_date),
+])
@@ -0,0 +1,22 @@
+from config.database import Database
+
+
+class Configuracao:
+    """Per-installation settings stored in the ``configuracoes`` table."""
+
+    @staticmethod
+    def get(chave, default=None):
+        with Database().connection() as conn:
+            row = conn.execute(
+                "SELECT valor FROM configuracoes WHERE chave = ?", (chave,)
+            ).fetchone()
+        return row[0] if row else default
+
+    @staticmethod
+    def set(chave, valor):
+        with Database().connection() as conn:
+            conn.execute("""
+                INSERT INTO configuracoes (chave, valor) VALUES (?, ?)
+                ON CONFLICT (chave) DO UPDATE SET valor = excluded.valor
+            """, (chave, str(valor)))
+            conn.commit()
@@ -0,0 +1,316 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from threading import Lock
+from config.database import Database, is_busy_error
+from models.venda import Venda
+from models.periodo import to_timestamp
+from models.dinheiro import to_cents, from_cents
+
+logger = logging.getLogger(__name__)
+
+
+class DiarioVendas:
+    """Durable local queue between the register and the database.
+
+    ``append`` writes the sale as one JSON line to an append-only journal
+    file and fsyncs it, which takes milliseconds whatever the state of
+    the database. A background thread drains the journal into ``vendas``
+    in batches, retrying with backoff while the database is locked, and
+    appends an ``ok`` line for every sale it commits. On start-up every
+    sale without one is replayed; the idempotency key stored with the
+    sale keeps a replay from inserting it twice.
+
+    Sales the database rejects outright (not just busy) are moved to a
+    dead-letter file next to the journal instead of blocking the queue.
+    """
+    _instance = None
+    _lock = Lock()
+
+    batch_size = 50
+    retry_delay = 0.5
+    max_retry_delay = 30.0
+    # Truncate the journal once it is fully drained and larger than this
+    compact_bytes = 1024 * 1024
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super(DiarioVendas, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, 'initialized'):
+            base = os.path.splitext(Database().db_path)[0]
+            self.path = f'{base}-vendas.journal'
+            self.dead_letter_path = f'{base}-vendas.falhas'
+            self._file_lock = Lock()
+            self._pending = {}
+            self._wake = threading.Event()
+            self._stop = threading.Event()
+            self._drained = threading.Condition(Lock())
+            self._thread = None
+            self._failures = 0
+            self.last_error = None
+            self.initialized = True
+
+    # Journal file
+
+    def _write_lines(self, path, records):
+        with open(path, 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _load(self):
+        """Sales in the journal that have no ``ok`` or ``falha`` line yet."""
+        pending = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return pending
+
+        for number, line in enumerate(lines, 1):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A crash mid-append leaves a torn last line; it was never acknowledged
+                logger.warning(f'Skipping unreadable sale journal line {number}')
+                continue
+            if record['op'] == 'venda':
+                pending[record['chave']] = record['venda']
+            else:
+                pending.pop(record['chave'], None)
+        return pending
+
+    def _compact(self):
+        with self._file_lock:
+            if self._pending:
+                return
+            try:
+                if os.path.getsize(self.path) < self.compact_bytes:
+                    return
+            except OSError:
+                return
+            open(self.path, 'w').close()
+            logger.info('Sale journal compacted')
+
+    # Sale encoding
+
+    @staticmethod
+    def _encode(venda):
+        return {
+            'cliente_id': venda.cliente_id,
+            'usuario_id': venda.usuario_id,
+            'data_venda': to_timestamp(venda.data_venda),
+            'desconto': to_cents(venda.desconto),
+            'forma_pagamento': venda.forma_pagamento,
+            'itens': [
+                [item['produto_id'], item['quantidade'], to_cents(item['preco_unitario'])]
+                for item in venda.itens
+            ],
+        }
+
+    @staticmethod
+    def _decode(chave, data):
+        venda = Venda(
+            cliente_id=data['cliente_id'],
+            usuario_id=data['usuario_id'],
+            data_venda=data['data_venda'],
+            desconto=from_cents(data['desconto']),
+            forma_pagamento=data['forma_pagamento'],
+            chave_idempotencia=chave
+        )
+        for produto_id, quantidade, preco_unitario in data['itens']:
+            venda.add_item(produto_id, quantidade, from_cents(preco_unitario))
+        return venda
+
+    # Public API
+
+    def append(self, venda):
+        """Journal ``venda`` for commit; returns its idempotency key."""
+        chave = venda.chave_idempotencia or uuid.uuid4().hex
+        venda.chave_idempotencia = chave
+        data = self._encode(venda)
+        with self._file_lock:
+            self._write_lines(self.path, [{'op': 'venda', 'chave': chave, 'venda': data}])
+            self._pending[chave] = data
+        self._wake.set()
+        return chave
+
+    def pending_count(self):
+        with self._file_lock:
+            return len(self._pending)
+
+    def wait_drained(self, timeout=None):
+        """Block until every journalled sale is committed; False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._drained:
+            while self.pending_count():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._wake.set()
+                self._drained.wait(remaining if remaining is not None else 1.0)
+        return True
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        with self._file_lock:
+            self._pending = self._load()
+        if self._pending:
+            logger.info(f'Replaying {len(self._pending)} journalled sale(s)')
+        self._release_stale_reservations()
+        self._stop.clear()
+        self._wake.set()
+        self._thread = threading.Thread(target=self._run, name='sale-journal', daemon=True)
+        self._thread.start()
+        logger.info('Sale journal committer started')
+
+    def stop(self, timeout=5.0):
+        """Give the committer ``timeout`` seconds to drain, then stop it.
+
+        Anything still pending stays in the journal for the next start.
+        """
+        thread = self._thread
+        if thread is None:
+            return
+        self.wait_drained(timeout)
+        self._stop.set()
+        self._wake.set()
+        if thread is not threading.current_thread():
+            thread.join(timeout=timeout)
+        self._thread = None
+
+    # Committer
+
+    def _run(self):
+        while not self._stop.is_set():
+            delay = None
+            try:
+                if self._drain_once():
+                    continue
+            except sqlite3.OperationalError as e:
+                # Only busy/locked errors get this far: keep everything and back off
+                self._failures += 1
+                self.last_error = str(e)
+                delay = min(self.max_retry_delay,
+                            self.retry_delay * 2 ** (self._failures - 1))
+                logger.warning(f'Sale journal commit deferred ({e}); retrying in {delay:.1f}s')
+            except Exception as e:
+                self._failures += 1
+                self.last_error = str(e)
+                delay = self.max_retry_delay
+                logger.error(f'Sale journal committer error: {e}', exc_info=True)
+
+            if delay is not None:
+                # New appends must not cut the backoff short
+                self._stop.wait(delay)
+                continue
+
+            # Queue empty: wake anyone waiting for the drain, then sleep until append()
+            with self._drained:
+                self._drained.notify_all()
+            self._compact()
+            self._release_stale_reservations()
+            self._wake.wait()
+            self._wake.clear()
+
+    def _drain_once(self):
+        """Commit one batch; returns False when there was nothing to do.
+
+        Busy/locked errors propagate so _run backs off with the batch
+        intact. Anything else is blamed on the sale that caused it: a
+        record that cannot be decoded, or that the database rejects for
+        good, is dead-lettered so the sales behind it keep flowing.
+        """
+        with self._file_lock:
+            batch = list(self._pending.items())[:self.batch_size]
+        if not batch:
+            return False
+
+        vendas, failed = [], []
+        for chave, data in batch:
+            try:
+                vendas.append(self._decode(chave, data))
+            except Exception as e:
+                logger.error(f'Sale {chave} cannot be decoded: {e!r}')
+                failed.append((chave, f'decode: {e!r}'))
+
+        # Checkout normally reserved the stock already (see reservas_estoque).
+        # Sales journalled without a reservation (database busy at checkout)
+        # have left with the customer, so their shortfall is recorded as
+        # negative stock rather than refused
+        try:
+            outcomes = Venda.commit_batch(vendas, permitir_falta=True) if vendas else []
+            done = vendas
+        except Exception as e:
+            if is_busy_error(e):
+                raise
+            # Something in the batch is rejected; find it by committing one by one
+            outcomes, done = [], []
+            for venda in vendas:
+                try:
+                    outcomes.append(venda.commit(permitir_falta=True))
+                    done.append(venda)
+                except Exception as e:
+                    if is_busy_error(e):
+                        raise
+                    logger.error(f'Sale {venda.chave_idempotencia} rejected: {e!r}')
+                    failed.append((venda.chave_idempotencia, repr(e)))
+                    self._release(venda)
+
+        for venda, results in zip(done, outcomes):
+            for result in results:
+                if result['estoque_negativo']:
+                    logger.warning(f"Sale {venda.id} oversold product {result['produto_id']} "
+                                   f"(stock now {result['estoque_atual']})")
+
+        self._acknowledge(done, failed)
+        self._failures = 0
+        self.last_error = None
+        return True
+
+    def _release_stale_reservations(self):
+        # Stock reserved by a checkout that crashed before its sale reached
+        # the journal has no sale to consume it: give it back
+        with self._file_lock:
+            chaves = list(self._pending)
+        try:
+            released = Venda.release_stale_reservations(chaves)
+        except sqlite3.Error as e:
+            logger.warning(f'Could not release stale stock reservations: {e}')
+            return
+        if released:
+            logger.warning(f'Released stale stock reservations for {released} product(s)')
+
+    @staticmethod
+    def _release(venda):
+        # A dead-lettered sale must not keep the units checkout reserved for it
+        try:
+            venda.release_stock()
+        except sqlite3.Error as e:
+            logger.error(f'Could not release stock reserved by sale '
+                         f'{venda.chave_idempotencia}: {e}')
+
+    def _acknowledge(self, done, failed):
+        with self._file_lock:
+            if failed:
+                self._write_lines(self.dead_letter_path, [
+                    {'chave': chave, 'erro': erro, 'venda': self._pending.get(chave)}
+                    for chave, erro in failed
+                ])
+            records = [{'op': 'ok', 'chave': venda.chave_idempotencia, 'venda_id': venda.id}
+                       for venda in done]
+            records += [{'op': 'falha', 'chave': chave} for chave, _ in failed]
+            self._write_lines(self.path, records)
+            for record in records:
+                self._pending.pop(record['chave'], None)
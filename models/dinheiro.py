@@ -0,0 +1,38 @@
+import functools
+from decimal import Decimal, ROUND_HALF_UP
+
+# Money is stored in SQLite as integer centavos (see migration 007) and
+# handled in Python as Decimal reais; convert only at the SQL boundary.
+
+CENTAVO = Decimal('0.01')
+ZERO = Decimal('0.00')
+
+
+def to_money(value):
+    """Decimal rounded to centavos; floats go through str() to avoid binary noise."""
+    if value is None:
+        return ZERO
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return value.quantize(CENTAVO, rounding=ROUND_HALF_UP)
+
+
+def to_cents(value):
+    """Integer centavos for binding into SQL; None stays NULL."""
+    if value is None:
+        return None
+    return int(to_money(value) * 100)
+
+
+# Decimals are immutable, so rows with the same amount can share one
+# object; prices repeat across thousands of products and sale lines
+@functools.lru_cache(maxsize=65536)
+def from_cents(cents):
+    """Decimal reais from a centavos column value; NULL stays None."""
+    if cents is None:
+        return None
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def format_brl(value):
+    return 'R$ ' + f'{value:,.2f}'.replace(',', '_').replace('.', ',').replace('_', '.')
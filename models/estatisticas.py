@@ -0,0 +1,125 @@
+import time
+from datetime import date, datetime, timedelta
+from threading import Lock
+from config.database import Database
+from models.periodo import to_timestamp, month_range
+from models.venda import Venda
+from models.dinheiro import from_cents
+
+# A customer counts as active with a purchase in this many days
+ACTIVE_CLIENT_DAYS = 90
+
+
+class Estatisticas:
+    """Cached overview figures for the dashboard.
+
+    A full refresh is four indexed queries; between refreshes each sale
+    committed in this process updates the cached values in place, so the
+    overview can be re-read as often as needed at no cost.
+    """
+    _instance = None
+    _lock = Lock()
+
+    # Recompute from the database after this many seconds, to pick up
+    # sales and stock changes made by other registers
+    max_age = 300.0
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super(Estatisticas, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, 'initialized'):
+            self.db = Database()
+            self._data_lock = Lock()
+            self._values = None
+            self._active_clients = set()
+            self._day = None
+            self._refreshed_at = 0.0
+            Venda.add_listener(self._on_sale)
+            self.initialized = True
+
+    def refresh(self):
+        today = date.today()
+        month_start, month_end = month_range(today.year, today.month)
+        active_since = datetime.now() - timedelta(days=ACTIVE_CLIENT_DAYS)
+
+        conn = self.db.get_connection()
+        try:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT COALESCE(SUM(valor_total - COALESCE(desconto, 0)), 0)
+                FROM vendas
+                WHERE data_venda >= ? AND data_venda < ?
+            """, (to_timestamp(today), to_timestamp(today + timedelta(days=1))))
+            vendas_hoje = from_cents(cur.fetchone()[0])
+
+            cur.execute("""
+                SELECT COALESCE(SUM(valor_total - COALESCE(desconto, 0)), 0)
+                FROM vendas
+                WHERE data_venda >= ? AND data_venda < ?
+            """, (to_timestamp(month_start), to_timestamp(month_end)))
+            vendas_mes = from_cents(cur.fetchone()[0])
+
+            cur.execute("SELECT COUNT(*) FROM produtos WHERE estoque_atual > 0")
+            produtos_estoque = cur.fetchone()[0]
+
+            cur.execute("""
+                SELECT DISTINCT cliente_id
+                FROM vendas
+                WHERE data_venda >= ? AND cliente_id IS NOT NULL
+            """, (to_timestamp(active_since),))
+            active_clients = {row[0] for row in cur.fetchall()}
+        finally:
+            self.db.return_connection(conn)
+
+        with self._data_lock:
+            self._values = {
+                'vendas_hoje': vendas_hoje,
+                'vendas_mes': vendas_mes,
+                'produtos_estoque': produtos_estoque,
+                'clientes_ativos': len(active_clients),
+            }
+            self._active_clients = active_clients
+            self._day = today
+            self._refreshed_at = time.monotonic()
+            return dict(self._values)
+
+    def get(self):
+        with self._data_lock:
+            fresh = (self._values is not None and self._day == date.today() and
+                     time.monotonic() - self._refreshed_at < self.max_age)
+            if fresh:
+                return dict(self._values)
+        return self.refresh()
+
+    def invalidate(self):
+        with self._data_lock:
+            self._values = None
+
+    def _on_sale(self, venda, results):
+        total = venda.valor_total - (venda.desconto or 0)
+        sale_day = venda.data_venda.date()
+
+        # Products whose stock went from positive to zero or below
+        sold = {}
+        for result in results:
+            sold[result['produto_id']] = sold.get(result['produto_id'], 0) + result['quantidade']
+        stock_after = {result['produto_id']: result['estoque_atual'] for result in results}
+        sold_out = sum(1 for produto_id, quantidade in sold.items()
+                       if stock_after[produto_id] <= 0 < stock_after[produto_id] + quantidade)
+
+        with self._data_lock:
+            if self._values is None or self._day != date.today():
+                return
+            if sale_day == self._day:
+                self._values['vendas_hoje'] += total
+            if (sale_day.year, sale_day.month) == (self._day.year, self._day.month):
+                self._values['vendas_mes'] += total
+            self._values['produtos_estoque'] -= sold_out
+            if venda.cliente_id is not None and venda.cliente_id not in self._active_clients:
+                self._active_clients.add(venda.cliente_id)
+                self._values['clientes_ativos'] = len(self._active_clients)
@@ -0,0 +1,115 @@
+import os
+import csv
+from models.relatorios import format_value
+
+# Rows between progress callbacks / cancellation checks
+PROGRESS_EVERY = 1000
+
+XLSX_FORMATS = {
+    'dinheiro': '#,##0.00',
+    'data': 'DD/MM/YYYY',
+    'data_hora': 'DD/MM/YYYY HH:MM',
+    'percentual': '0.0%',
+}
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def _csv_value(value, tipo):
+    # Semicolon-separated with decimal commas, as Excel expects in pt-BR
+    if value is None:
+        return ''
+    if tipo == 'dinheiro':
+        return f'{value:.2f}'.replace('.', ',')
+    if tipo == 'percentual':
+        return f'{value * 100:.1f}'.replace('.', ',')
+    return format_value(value, tipo)
+
+
+def _write_csv(f, colunas, linhas, tick):
+    writer = csv.writer(f, delimiter=';')
+    writer.writerow([coluna.titulo for coluna in colunas])
+    tipos = [coluna.tipo for coluna in colunas]
+    count = 0
+    for linha in linhas:
+        writer.writerow([_csv_value(value, tipo) for value, tipo in zip(linha, tipos)])
+        count += 1
+        if count % PROGRESS_EVERY == 0:
+            tick(count)
+    return count
+
+
+def _write_xlsx(path, titulo, colunas, linhas, tick):
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    # Write-only mode streams rows to the file instead of keeping a sheet in memory
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(titulo[:31])
+    sheet.freeze_panes = 'A2'
+
+    header = []
+    for coluna in colunas:
+        cell = WriteOnlyCell(sheet, value=coluna.titulo)
+        cell.font = Font(bold=True)
+        header.append(cell)
+    sheet.append(header)
+
+    formats = [XLSX_FORMATS.get(coluna.tipo) for coluna in colunas]
+    count = 0
+    for linha in linhas:
+        row = []
+        for value, number_format in zip(linha, formats):
+            if number_format and value is not None:
+                value = WriteOnlyCell(sheet, value=value)
+                value.number_format = number_format
+            row.append(value)
+        sheet.append(row)
+        count += 1
+        if count % PROGRESS_EVERY == 0:
+            tick(count)
+
+    workbook.save(path)
+    return count
+
+
+def export_report(path, relatorio, start=None, end=None, progress=None, cancel_event=None):
+    """Stream ``relatorio`` rows into ``path`` (.csv, .xlsx or .pdf).
+
+    Rows go from the database cursor to the file one at a time, so the
+    whole report is never held in memory. ``progress(rows)`` is called
+    every PROGRESS_EVERY rows; setting ``cancel_event`` stops the export,
+    removes the partial file and raises ExportCancelled.
+    Returns the number of rows written.
+    """
+    def tick(count):
+        if cancel_event is not None and cancel_event.is_set():
+            raise ExportCancelled()
+        if progress is not None:
+            progress(count)
+
+    linhas = relatorio.linhas(start, end)
+    tmp_path = f'{path}.part'
+    try:
+        if path.lower().endswith('.pdf'):
+            from models.impressao import write_report_pdf
+            count = write_report_pdf(tmp_path, relatorio, linhas, start, end, tick)
+        elif path.lower().endswith('.xlsx'):
+            count = _write_xlsx(tmp_path, relatorio.titulo, relatorio.colunas, linhas, tick)
+        else:
+            # utf-8-sig so Excel recognises the encoding
+            with open(tmp_path, 'w', newline='', encoding='utf-8-sig') as f:
+                count = _write_csv(f, relatorio.colunas, linhas, tick)
+        tick(count)
+        os.replace(tmp_path, path)
+        return count
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        # Hands the pooled connection back if the export stopped early
+        linhas.close()
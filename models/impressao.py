@@ -0,0 +1,341 @@
+import os
+import functools
+from datetime import datetime
+from collections import namedtuple
+from xml.sax.saxutils import escape
+import qrcode
+from reportlab.lib import colors
+from reportlab.lib.units import mm
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from reportlab.platypus import BaseDocTemplate, Frame, PageTemplate, Paragraph, Table, TableStyle
+from config.database import Database
+from models.cache import LRUCache
+from models.configuracao import Configuracao
+from models.dinheiro import format_brl
+from models.relatorios import format_value
+from models.exportacao import PROGRESS_EVERY
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'assets')
+LOGO_PATH = os.path.join(ASSETS_DIR, 'logo.png')
+
+# DejaVu covers every accented character; the built-in Helvetica is the fallback
+FONT_CANDIDATES = [
+    ('/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+     '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf'),
+    ('C:/Windows/Fonts/arial.ttf', 'C:/Windows/Fonts/arialbd.ttf'),
+    ('/Library/Fonts/Arial.ttf', '/Library/Fonts/Arial Bold.ttf'),
+]
+
+# Report rows per platypus Table; one huge table makes page splitting quadratic
+REPORT_CHUNK_ROWS = 200
+
+ItemRecibo = namedtuple('ItemRecibo', 'nome quantidade preco subtotal')
+
+# Everything printed on a receipt, captured on the UI thread so the
+# worker never touches the cart or the sale while rendering
+Recibo = namedtuple(
+    'Recibo', 'chave data_venda operador cliente forma_pagamento itens subtotal desconto total'
+)
+
+
+def build_receipt(venda, nomes, operador=None, cliente=None):
+    """Recibo for ``venda``; ``nomes`` maps produto_id to the product name."""
+    itens = [
+        ItemRecibo(nomes.get(item['produto_id'], str(item['produto_id'])),
+                   item['quantidade'], item['preco_unitario'], item['subtotal'])
+        for item in venda.itens
+    ]
+    return Recibo(venda.chave_idempotencia, venda.data_venda, operador, cliente,
+                  venda.forma_pagamento, itens, venda.valor_total, venda.desconto,
+                  venda.valor_total - venda.desconto)
+
+
+@functools.lru_cache(maxsize=None)
+def fonts():
+    """(regular, bold) font names, registering the TTF files only once per process."""
+    for regular, bold in FONT_CANDIDATES:
+        if os.path.exists(regular) and os.path.exists(bold):
+            try:
+                pdfmetrics.registerFont(TTFont('SupercashSans', regular))
+                pdfmetrics.registerFont(TTFont('SupercashSans-Bold', bold))
+                return 'SupercashSans', 'SupercashSans-Bold'
+            except Exception as e:
+                print(f"Error registering font {regular}: {e}")
+    return 'Helvetica', 'Helvetica-Bold'
+
+
+@functools.lru_cache(maxsize=8)
+def load_logo(path):
+    """Decoded logo image, or None when the file does not exist."""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        return ImageReader(path)
+    except Exception as e:
+        print(f"Error loading logo {path}: {e}")
+        return None
+
+
+def receipts_dir():
+    base = os.path.splitext(Database().db_path)[0]
+    return f'{base}-recibos'
+
+
+class ReceiptRenderer:
+    """Draws 80 mm roll receipts straight onto a reportlab canvas.
+
+    Fonts, the logo and the static header are prepared once when the
+    renderer is built, and QR codes are cached by content, so rendering
+    a receipt is just text placement. Instances are safe to share
+    between worker threads.
+    """
+    WIDTH = 80 * mm
+    MARGIN = 4 * mm
+    LINE = 4.2 * mm
+    FONT_SIZE = 8
+    QR_SIZE = 30 * mm
+    LOGO_HEIGHT = 14 * mm
+
+    _qr_cache = LRUCache(max_size=256, ttl=3600.0)
+
+    def __init__(self, logo_path=LOGO_PATH):
+        self.font, self.font_bold = fonts()
+        self.loja = Configuracao.get('nome_loja', 'SuperCash')
+        self.rodape = Configuracao.get('rodape_recibo', 'Obrigado pela preferência!')
+        self.logo = load_logo(logo_path)
+        self._header = self._build_header()
+        self._header_height = sum(step for _, _, _, step in self._header)
+        if self.logo is not None:
+            self._header_height += self.LOGO_HEIGHT + self.LINE / 2
+
+    def _build_header(self):
+        # (font, size, text, line advance) for the lines every receipt starts with
+        return [
+            (self.font_bold, 11, self.loja, self.LINE * 1.4),
+            (self.font, self.FONT_SIZE, 'CUPOM NÃO FISCAL', self.LINE),
+        ]
+
+    # QR codes
+
+    @classmethod
+    def qr_modules(cls, data):
+        """Dark module runs of the QR code for ``data`` as (row, col, length)."""
+        runs = cls._qr_cache.get(data)
+        if runs is None:
+            qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, border=0)
+            qr.add_data(data)
+            qr.make(fit=True)
+            matrix = qr.get_matrix()
+            # Horizontal runs instead of single modules keep the PDF path small
+            runs = []
+            for row, line in enumerate(matrix):
+                col = 0
+                while col < len(line):
+                    if line[col]:
+                        start = col
+                        while col < len(line) and line[col]:
+                            col += 1
+                        runs.append((row, start, col - start))
+                    else:
+                        col += 1
+            runs = (len(matrix), runs)
+            cls._qr_cache.put(data, runs)
+        return runs
+
+    def _draw_qr(self, c, data, x, y, size):
+        count, runs = self.qr_modules(data)
+        module = size / count
+        path = c.beginPath()
+        for row, col, length in runs:
+            path.rect(x + col * module, y + size - (row + 1) * module, length * module, module)
+        c.drawPath(path, stroke=0, fill=1)
+
+    @staticmethod
+    def qr_data(recibo):
+        return (f'SUPERCASH|{recibo.chave}|{recibo.data_venda:%Y%m%d%H%M%S}'
+                f'|{int(recibo.total * 100)}')
+
+    # Layout
+
+    def _fit(self, text, font, size, width):
+        if pdfmetrics.stringWidth(text, font, size) <= width:
+            return text
+        while text and pdfmetrics.stringWidth(text + '…', font, size) > width:
+            text = text[:-1]
+        return text + '…'
+
+    def _height(self, recibo):
+        lines = 3 + bool(recibo.operador) + bool(recibo.cliente)
+        lines += 2 * len(recibo.itens)
+        lines += 4 + (1 if recibo.desconto else 0)
+        return (2 * self.MARGIN + self._header_height + lines * self.LINE
+                + self.QR_SIZE + 3 * self.LINE)
+
+    def draw(self, c, recibo):
+        """Draw ``recibo`` on ``c``, which must be sized by ``page_size(recibo)``."""
+        width = self.WIDTH
+        left, right = self.MARGIN, width - self.MARGIN
+        y = self._height(recibo) - self.MARGIN
+
+        if self.logo is not None:
+            logo_w, logo_h = self.logo.getSize()
+            draw_w = self.LOGO_HEIGHT * logo_w / logo_h
+            y -= self.LOGO_HEIGHT
+            c.drawImage(self.logo, (width - draw_w) / 2, y, draw_w, self.LOGO_HEIGHT, mask='auto')
+            y -= self.LINE / 2
+        for font, size, text, step in self._header:
+            y -= step
+            c.setFont(font, size)
+            c.drawCentredString(width / 2, y, text)
+
+        def line(text, value=None, font=self.font):
+            nonlocal y
+            y -= self.LINE
+            c.setFont(font, self.FONT_SIZE)
+            c.drawString(left, y, text)
+            if value is not None:
+                c.drawRightString(right, y, value)
+
+        def rule():
+            nonlocal y
+            y -= self.LINE / 2
+            c.line(left, y, right, y)
+            y -= self.LINE / 2
+
+        line(recibo.data_venda.strftime('%d/%m/%Y %H:%M:%S'), f'Venda {recibo.chave[:8].upper()}')
+        if recibo.operador:
+            line(f'Operador: {recibo.operador}')
+        if recibo.cliente:
+            line(f'Cliente: {recibo.cliente}')
+        rule()
+
+        for item in recibo.itens:
+            line(self._fit(item.nome, self.font, self.FONT_SIZE, right - left))
+            line(f'  {item.quantidade} x {format_brl(item.preco)}', format_brl(item.subtotal))
+        rule()
+
+        line('Subtotal', format_brl(recibo.subtotal))
+        if recibo.desconto:
+            line('Desconto', '- ' + format_brl(recibo.desconto))
+        line('TOTAL', format_brl(recibo.total), font=self.font_bold)
+        line('Pagamento', recibo.forma_pagamento or '')
+
+        y -= self.LINE + self.QR_SIZE
+        self._draw_qr(c, self.qr_data(recibo), (width - self.QR_SIZE) / 2, y, self.QR_SIZE)
+        y -= self.LINE * 1.5
+        c.setFont(self.font, self.FONT_SIZE)
+        c.drawCentredString(width / 2, y, self.rodape)
+
+    def page_size(self, recibo):
+        return self.WIDTH, self._height(recibo)
+
+    def render(self, recibo, path=None):
+        """Write ``recibo`` as a one-page PDF; returns the file path.
+
+        Without ``path`` the file goes to the receipts folder next to the
+        database, named after the sale date and idempotency key.
+        """
+        if path is None:
+            folder = receipts_dir()
+            os.makedirs(folder, exist_ok=True)
+            path = os.path.join(folder, f'{recibo.data_venda:%Y%m%d-%H%M%S}-{recibo.chave[:12]}.pdf')
+        c = canvas.Canvas(path, pagesize=self.page_size(recibo), pageCompression=1)
+        c.setTitle(f'Recibo {recibo.chave}')
+        self.draw(c, recibo)
+        c.showPage()
+        c.save()
+        return path
+
+
+@functools.lru_cache(maxsize=1)
+def _report_styles():
+    regular, bold = fonts()
+    cell = ParagraphStyle('cell', fontName=regular, fontSize=8, leading=10)
+    title = ParagraphStyle('title', fontName=bold, fontSize=14, leading=18, spaceAfter=6)
+    table = TableStyle([
+        ('FONT', (0, 0), (-1, -1), regular, 8),
+        ('FONT', (0, 0), (-1, 0), bold, 8),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0078d4')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f2f2f2')]),
+        ('LINEBELOW', (0, 0), (-1, -1), 0.25, colors.HexColor('#cccccc')),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ])
+    return cell, title, table
+
+
+def write_report_pdf(path, relatorio, linhas, start=None, end=None, tick=None):
+    """Lay ``linhas`` out as a landscape A4 table; returns the row count.
+
+    ``tick(rows)`` is called as rows are consumed, like the CSV/XLSX writers.
+    Unlike them, the laid-out pages are built in memory before saving.
+    """
+    regular, bold = fonts()
+    cell_style, title_style, table_style = _report_styles()
+    pagesize = landscape(A4)
+    margin = 12 * mm
+    gerado = datetime.now().strftime('%d/%m/%Y %H:%M')
+    periodo = ''
+    if relatorio.usa_periodo and start and end:
+        periodo = f'{format_value(start, "data")} a {format_value(end, "data")}'
+
+    def decorate(c, doc):
+        c.saveState()
+        c.setFont(regular, 7)
+        c.drawString(margin, margin / 2, f'{relatorio.titulo} {periodo}'.strip())
+        c.drawRightString(pagesize[0] - margin, margin / 2, f'Gerado em {gerado} - página {doc.page}')
+        c.restoreState()
+
+    doc = BaseDocTemplate(path, pagesize=pagesize, title=relatorio.titulo,
+                          leftMargin=margin, rightMargin=margin,
+                          topMargin=margin, bottomMargin=margin)
+    frame = Frame(doc.leftMargin, doc.bottomMargin, doc.width, doc.height, id='corpo')
+    doc.addPageTemplates([PageTemplate(id='relatorio', frames=[frame], onPage=decorate)])
+
+    tipos = [coluna.tipo for coluna in relatorio.colunas]
+    header = [coluna.titulo for coluna in relatorio.colunas]
+    right_aligned = [i for i, tipo in enumerate(tipos) if tipo in ('dinheiro', 'inteiro', 'percentual')]
+    widths = [doc.width * (3 if tipo == 'texto' else 1) / sum(3 if t == 'texto' else 1 for t in tipos)
+              for tipo in tipos]
+    style = TableStyle(table_style.getCommands() + [
+        ('ALIGN', (i, 0), (i, -1), 'RIGHT') for i in right_aligned
+    ])
+
+    story = [Paragraph(relatorio.titulo, title_style)]
+    if periodo:
+        story.append(Paragraph(f'Período: {periodo}', cell_style))
+
+    count = 0
+    chunk = []
+
+    def flush():
+        story.append(Table([header] + chunk, colWidths=widths, repeatRows=1, style=style))
+
+    # Cell padding is 6pt a side; only text that would overflow its column
+    # pays for a wrapping Paragraph
+    fits = [width - 12 for width in widths]
+
+    def cell(value, tipo, fit):
+        text = format_value(value, tipo)
+        if tipo == 'texto' and pdfmetrics.stringWidth(text, regular, 8) > fit:
+            return Paragraph(escape(text), cell_style)
+        return text
+
+    for linha in linhas:
+        chunk.append([cell(value, tipo, fit) for value, tipo, fit in zip(linha, tipos, fits)])
+        count += 1
+        if len(chunk) == REPORT_CHUNK_ROWS:
+            flush()
+            chunk = []
+        if tick is not None and count % PROGRESS_EVERY == 0:
+            tick(count)
+    if chunk or not count:
+        flush()
+
+    doc.build(story)
+    return count
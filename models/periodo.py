@@ -0,0 +1,57 @@
+from datetime import datetime, date, timedelta
+
+# Canonical layout of vendas.data_venda; sorts lexicographically in time order
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def to_timestamp(value):
+    """Format a datetime/date/ISO string the way data_venda is stored."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    elif not isinstance(value, datetime) and isinstance(value, date):
+        value = datetime.combine(value, datetime.min.time())
+    return value.strftime(TIMESTAMP_FORMAT)
+
+
+def parse_timestamp(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+def parse_date(value):
+    """date from a DATE column (ISO text); NULL and empty text stay None."""
+    if not value:
+        return None
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value[:10])
+
+
+def day_range(start_date, end_date):
+    """Half-open [start, end) covering the calendar days start_date..end_date."""
+    if isinstance(start_date, str):
+        start_date = date.fromisoformat(start_date[:10])
+    if isinstance(end_date, str):
+        end_date = date.fromisoformat(end_date[:10])
+    if isinstance(start_date, datetime):
+        start_date = start_date.date()
+    if isinstance(end_date, datetime):
+        end_date = end_date.date()
+    return start_date, end_date + timedelta(days=1)
+
+
+def day_bounds(start_date, end_date):
+    """day_range() formatted for comparison against data_venda."""
+    start, end = day_range(start_date, end_date)
+    return to_timestamp(start), to_timestamp(end)
+
+
+def month_range(year, month):
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
+def year_range(year):
+    return date(year, 1, 1), date(year + 1, 1, 1)
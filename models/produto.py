@@ -1,7 +1,36 @@
 from config.database import Database
+from models.cache import LRUCache
+from models.periodo import day_bounds
+from models.busca import fts_query
+from models.dinheiro import to_money, to_cents, from_cents
+from models.registro import RowMapper, name_keyset, where_clause
 import sqlite3
 
+# Product rows by ('id', id) and ('barcode', codigo_barras). Scans at the
+# register hit the same SKUs all day; the TTL bounds how stale a row can get
+# when another register changes it.
+product_cache = LRUCache(max_size=4096, ttl=300.0)
+
+PRODUCT_COLUMNS = """id, nome, codigo_barras, categoria_id, preco_custo,
+                     preco_venda, estoque_atual, estoque_minimo, fornecedor"""
+
+
+def invalidate_product_cache(*produto_ids, codigo_barras=None):
+    """Drop cached rows for the given product ids (and/or barcode)."""
+    for produto_id in produto_ids:
+        row = product_cache.pop(('id', produto_id))
+        if row is not None and row[2]:
+            product_cache.pop(('barcode', row[2]))
+    if codigo_barras:
+        row = product_cache.pop(('barcode', codigo_barras))
+        if row is not None:
+            product_cache.pop(('id', row[0]))
+
+
 class Produto:
+    __slots__ = ('id', 'nome', 'codigo_barras', 'categoria_id', 'preco_custo',
+                 'preco_venda', 'estoque_atual', 'estoque_minimo', 'fornecedor')
+
     def __init__(self, id=None, nome=None, codigo_barras=None, categoria_id=None,
                  preco_custo=None, preco_venda=None, estoque_atual=None,
                  estoque_minimo=None, fornecedor=None):
@@ -9,15 +38,15 @@ class Produto:
         self.nome = nome
         self.codigo_barras = codigo_barras
         self.categoria_id = categoria_id
-        self.preco_custo = preco_custo
-        self.preco_venda = preco_venda
+        self.preco_custo = None if preco_custo is None else to_money(preco_custo)
+        self.preco_venda = None if preco_venda is None else to_money(preco_venda)
         self.estoque_atual = estoque_atual
         self.estoque_minimo = estoque_minimo
         self.fornecedor = fornecedor
-        self.db = Database()
     
     def save(self):
-        conn = self.db.get_connection()
+        db = Database()
+        conn = db.get_connection()
         cur = conn.cursor()
         
         try:
@@ -31,8 +60,8 @@ class Produto:
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                 """, (
                     self.nome, self.codigo_barras, self.categoria_id,
-                    self.preco_custo, self.preco_venda, self.estoque_atual,
-                    self.estoque_minimo, self.fornecedor
+                    to_cents(self.preco_custo), to_cents(self.preco_venda),
+                    self.estoque_atual, self.estoque_minimo, self.fornecedor
                 ))
                 self.id = cur.lastrowid
             else:
@@ -45,146 +74,257 @@ class Produto:
                     WHERE id = ?
                 """, (
                     self.nome, self.codigo_barras, self.categoria_id,
-                    self.preco_custo, self.preco_venda, self.estoque_atual,
-                    self.estoque_minimo, self.fornecedor, self.id
+                    to_cents(self.preco_custo), to_cents(self.preco_venda),
+                    self.estoque_atual, self.estoque_minimo, self.fornecedor, self.id
                 ))
             conn.commit()
+            invalidate_product_cache(self.id, codigo_barras=self.codigo_barras)
             success = True
         except Exception as e:
             print(f"Error saving product: {e}")
             success = False
         finally:
-            self.db.return_connection(conn)
+            db.return_connection(conn)
         
         return success
 
     @classmethod
-    def get_by_id(cls, produto_id):
+    def _fetch_cached(cls, key, where, value):
+        row = product_cache.get(key)
+        if row is not None:
+            return cls._from_row(row)
+
         db = Database()
         conn = db.get_connection()
         cur = conn.cursor()
         
         try:
-            cur.execute("SELECT * FROM produtos WHERE id = ?", (produto_id,))
+            cur.execute(f"SELECT {PRODUCT_COLUMNS} FROM produtos WHERE {where} = ?", (value,))
             produto_data = cur.fetchone()
-            
-            if produto_data:
-                return cls(
-                    id=produto_data[0],
-                    nome=produto_data[1],
-                    codigo_barras=produto_data[2],
-                    categoria_id=produto_data[3],
-                    preco_custo=produto_data[4],
-                    preco_venda=produto_data[5],
-                    estoque_atual=produto_data[6],
-                    estoque_minimo=produto_data[7],
-                    fornecedor=produto_data[8]
-                )
-            return None
         finally:
             db.return_connection(conn)
+            
+        if produto_data:
+            row = tuple(produto_data)
+            product_cache.put(('id', row[0]), row)
+            if row[2]:
+                product_cache.put(('barcode', row[2]), row)
+            return cls._from_row(row)
+        return None
+
+    @classmethod
+    def get_by_id(cls, produto_id):
+        return cls._fetch_cached(('id', produto_id), 'id', produto_id)
 
     @classmethod
     def get_by_barcode(cls, codigo_barras):
-        db = Database()
-        conn = db.get_connection()
-        cur = conn.cursor()
-        
-        try:
-            cur.execute("SELECT * FROM produtos WHERE codigo_barras = ?", (codigo_barras,))
-            produto_data = cur.fetchone()
-            
-            if produto_data:
-                return cls(
-                    id=produto_data[0],
-                    nome=produto_data[1],
-                    codigo_barras=produto_data[2],
-                    categoria_id=produto_data[3],
-                    preco_custo=produto_data[4],
-                    preco_venda=produto_data[5],
-                    estoque_atual=produto_data[6],
-                    estoque_minimo=produto_data[7],
-                    fornecedor=produto_data[8]
-                )
-            return None
-        finally:
-            db.return_connection(conn)
+        return cls._fetch_cached(('barcode', codigo_barras), 'codigo_barras', codigo_barras)
+
+    @staticmethod
+    def cache_stats():
+        return product_cache.stats()
 
     @classmethod
     def get_all(cls):
+        return list(cls.iter_all())
+
+    @classmethod
+    def iter_all(cls, batch_size=500):
+        """Stream every product by name, ``batch_size`` rows per fetch."""
+        rows = Database().iter_query(f"""
+            SELECT {PRODUCT_COLUMNS}
+            FROM produtos
+            ORDER BY nome, id
+        """, batch_size=batch_size)
+        for row in rows:
+            yield cls._from_row(row)
+
+    @classmethod
+    def get_low_stock(cls):
+        """Products at or below their minimum stock, emptiest first."""
+        return list(cls.iter_low_stock())
+
+    @classmethod
+    def iter_low_stock(cls):
+        rows = Database().iter_query(f"""
+            SELECT {PRODUCT_COLUMNS}
+            FROM produtos
+            WHERE estoque_atual <= estoque_minimo
+            ORDER BY estoque_atual, nome
+        """)
+        for row in rows:
+            yield cls._from_row(row)
+
+    @staticmethod
+    def get_rows_page(limit=200, after_id=None, after_name=None, search=None,
+                      categoria_id=None, fornecedor=None, estoque_baixo=False):
+        """One page of raw product rows (PRODUCT_COLUMNS order, prices in centavos), by name.
+
+        ``after_id``/``after_name`` identify the last row already shown
+        (see name_keyset); paging on that key walks idx_produtos_nome
+        instead of using OFFSET, so every page costs the same however deep
+        the list is scrolled. The other arguments narrow the list.
+        """
+        conditions = []
+        params = []
+        keyset, keyset_params = name_keyset('produtos', after_id, after_name)
+        if keyset:
+            conditions.append(keyset)
+            params.extend(keyset_params)
+        match = fts_query(search)
+        if match:
+            conditions.append("id IN (SELECT rowid FROM produtos_fts WHERE produtos_fts MATCH ?)")
+            params.append(match)
+        if categoria_id is not None:
+            conditions.append("categoria_id = ?")
+            params.append(categoria_id)
+        if fornecedor is not None:
+            conditions.append("fornecedor = ?")
+            params.append(fornecedor)
+        if estoque_baixo:
+            conditions.append("estoque_atual <= estoque_minimo")
+
         db = Database()
         conn = db.get_connection()
-        cur = conn.cursor()
         
         try:
-            cur.execute("""
-                SELECT p.*, c.nome as categoria_nome
-                FROM produtos p
-                LEFT JOIN categorias c ON p.categoria_id = c.id
-                ORDER BY p.nome
-            """)
-            produtos = []
-            
-            for produto_data in cur.fetchall():
-                produtos.append(cls(
-                    id=produto_data[0],
-                    nome=produto_data[1],
-                    codigo_barras=produto_data[2],
-                    categoria_id=produto_data[3],
-                    preco_custo=produto_data[4],
-                    preco_venda=produto_data[5],
-                    estoque_atual=produto_data[6],
-                    estoque_minimo=produto_data[7],
-                    fornecedor=produto_data[8]
-                ))
-            
-            return produtos
+            cur = conn.cursor()
+            cur.execute(f"""
+                SELECT {PRODUCT_COLUMNS}
+                FROM produtos
+                {where_clause(conditions)}
+                ORDER BY nome, id
+                LIMIT ?
+            """, (*params, limit))
+            return [tuple(row) for row in cur.fetchall()]
         finally:
             db.return_connection(conn)
 
-    def update_stock(self, quantidade):
-        """Update stock quantity (positive for additions, negative for subtractions)"""
-        conn = self.db.get_connection()
-        cur = conn.cursor()
+    @classmethod
+    def get_page(cls, limit=200, after_id=None, after_name=None, **filters):
+        """Like get_rows_page, as Produto objects."""
+        return [cls._from_row(row)
+                for row in cls.get_rows_page(limit, after_id, after_name, **filters)]
+
+    @staticmethod
+    def search_rows(text, limit=50):
+        """Raw product rows matching ``text``, best matches first.
+
+        Uses the produtos_fts index (prefix, accent-insensitive), ranking
+        hits in the name above barcode and supplier hits.
+        """
+        match = fts_query(text)
+        if not match:
+            return []
+
+        # connection() joins a connection already held by this thread, which
+        # lets a search worker interrupt the query (see SearchController)
+        with Database().connection() as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT p.id, p.nome, p.codigo_barras, p.categoria_id, p.preco_custo,
+                       p.preco_venda, p.estoque_atual, p.estoque_minimo, p.fornecedor
+                FROM produtos_fts f
+                JOIN produtos p ON p.id = f.rowid
+                WHERE produtos_fts MATCH ?
+                ORDER BY bm25(produtos_fts, 10.0, 5.0, 1.0)
+                LIMIT ?
+            """, (match, limit))
+            return [tuple(row) for row in cur.fetchall()]
+
+    @classmethod
+    def search(cls, text, limit=50):
+        return [cls._from_row(row) for row in cls.search_rows(text, limit)]
+
+    @classmethod
+    def get_best_sellers(cls, start_date, end_date, limit=50):
+        """Top products by quantity sold between start_date and end_date."""
+        return list(cls.iter_best_sellers(start_date, end_date, limit))
+
+    @classmethod
+    def iter_best_sellers(cls, start_date, end_date, limit=None):
+        """Stream products by quantity sold between start_date and end_date, best first.
+
+        Quantity, revenue and profit (against the cost recorded on each item) are
+        aggregated by SQLite; ``limit=None`` streams every product sold.
+        """
+        rows = Database().iter_query("""
+            SELECT p.id, p.nome, p.codigo_barras, p.categoria_id, p.preco_custo,
+                   p.preco_venda, p.estoque_atual, p.estoque_minimo, p.fornecedor,
+                   SUM(iv.quantidade) AS quantidade,
+                   SUM(iv.subtotal) AS valor_total,
+                   SUM(iv.subtotal) - SUM(iv.quantidade *
+                       COALESCE(iv.custo_unitario, p.preco_custo)) AS lucro
+            FROM vendas v
+            JOIN itens_venda iv ON iv.venda_id = v.id
+            JOIN produtos p ON p.id = iv.produto_id
+            WHERE v.data_venda >= ? AND v.data_venda < ?
+            GROUP BY iv.produto_id
+            ORDER BY quantidade DESC, valor_total DESC
+            LIMIT ?
+        """, (*day_bounds(start_date, end_date), -1 if limit is None else limit))
         
-        try:
+        for row in rows:
+            yield {
+                'produto': cls._from_row(row),
+                'quantidade': row[9],
+                'valor_total': from_cents(row[10]),
+                'lucro': from_cents(row[11])
+            }
+
+    def update_stock(self, quantidade):
+        """Update stock quantity (positive for additions, negative for subtractions).
+
+        A subtraction larger than the stock on hand changes nothing and
+        returns False; the check and the change are one statement, so
+        concurrent registers cannot push the stock below zero.
+        """
+        def apply(cur):
             cur.execute("""
                 UPDATE produtos
-                SET estoque_atual = estoque_atual + ?
-                WHERE id = ?
-            """, (quantidade, self.id))
-            
-            # Get updated stock value
-            cur.execute("SELECT estoque_atual FROM produtos WHERE id = ?", (self.id,))
-            result = cur.fetchone()
-            if result:
-                self.estoque_atual = result[0]
-            
-            conn.commit()
-            success = True
+                SET estoque_atual = estoque_atual + :quantidade
+                WHERE id = :id AND (:quantidade >= 0 OR estoque_atual + :quantidade >= 0)
+                RETURNING estoque_atual
+            """, {'quantidade': quantidade, 'id': self.id})
+            return cur.fetchone()
+
+        try:
+            result = Database().run_immediate(apply)
         except Exception as e:
             print(f"Error updating stock: {e}")
-            success = False
-        finally:
-            self.db.return_connection(conn)
-            
-        return success
+            return False
+
+        invalidate_product_cache(self.id)
+        if result is None:
+            print(f"Error updating stock: insufficient stock for product {self.id}")
+            return False
+        self.estoque_atual = result[0]
+        return True
 
     def delete(self):
         if self.id is None:
             return False
             
-        conn = self.db.get_connection()
+        db = Database()
+        conn = db.get_connection()
         cur = conn.cursor()
         
         try:
             cur.execute("DELETE FROM produtos WHERE id = ?", (self.id,))
             conn.commit()
+            invalidate_product_cache(self.id)
             success = cur.rowcount > 0
         except Exception as e:
             print(f"Error deleting product: {e}")
             success = False
         finally:
-            self.db.return_connection(conn)
+            db.return_connection(conn)
             
-        return success
\ No newline at end of file
+        return success
+
+# Row (PRODUCT_COLUMNS order, prices in centavos) -> Produto
+Produto._from_row = RowMapper(Produto, [
+    'id', 'nome', 'codigo_barras', 'categoria_id',
+    ('preco_custo', from_cents), ('preco_venda', from_cents),
+    'estoque_atual', 'estoque_minimo', 'fornecedor',
+])
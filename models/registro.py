@@ -0,0 +1,63 @@
+class RowMapper:
+    """Builds ``cls`` instances from rows whose columns follow ``fields``.
+
+    Each field is an attribute name or an (attribute, converter) pair, in
+    SELECT-list order. Attributes the row does not cover are filled from
+    ``defaults``, a mapping of attribute to zero-argument factory.
+
+    The assignments are generated and compiled once per mapper, the way
+    collections.namedtuple builds its classes, so mapping a row is one
+    plain function call: no keyword parsing, no per-column loop. The
+    constructor is bypassed on purpose; rows hold stored values, which
+    must not be normalised again (a password hash is not a password).
+    """
+
+    def __init__(self, cls, fields, defaults=None):
+        self.cls = cls
+        self.attributes = []
+        namespace = {'_new': object.__new__, '_cls': cls}
+        body = ['    obj = _new(_cls)']
+
+        for index, field in enumerate(fields):
+            name, converter = (field, None) if isinstance(field, str) else field
+            self.attributes.append(name)
+            if converter is None:
+                body.append(f'    obj.{name} = row[{index}]')
+            else:
+                namespace[f'_c{index}'] = converter
+                body.append(f'    obj.{name} = _c{index}(row[{index}])')
+
+        for name, factory in (defaults or {}).items():
+            namespace[f'_d_{name}'] = factory
+            body.append(f'    obj.{name} = _d_{name}()')
+
+        source = 'def build(row):\n' + '\n'.join(body) + '\n    return obj\n'
+        exec(compile(source, f'<RowMapper {cls.__name__}>', 'exec'), namespace)
+        self.build = namespace['build']
+
+    def __call__(self, row):
+        return self.build(row)
+
+    def all(self, rows):
+        return [self.build(row) for row in rows]
+
+
+def name_keyset(table, after_id=None, after_name=None):
+    """WHERE condition and parameters for the rows after a (nome, id) cursor.
+
+    Lists ordered by ``nome, id`` page by comparing against the last row
+    already shown instead of using OFFSET, so every page costs one index
+    seek however deep the list goes. Pass that row's name and id; an id
+    alone works too (its name is looked up), as does a name alone.
+    """
+    if after_id is None and after_name is None:
+        return None, ()
+    if after_id is None:
+        return "nome > ?", (after_name,)
+    if after_name is None:
+        return f"(nome, id) > ((SELECT nome FROM {table} WHERE id = ?), ?)", (after_id, after_id)
+    return "(nome, id) > (?, ?)", (after_name, after_id)
+
+
+def where_clause(conditions):
+    return f"WHERE {' AND '.join(conditions)}" if conditions else ''
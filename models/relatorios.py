@@ -0,0 +1,106 @@
+from collections import namedtuple
+from models.venda import Venda
+from models.produto import Produto
+from models.cliente import Cliente
+from models.resumo_diario import ResumoDiario
+
+# tipo is one of: texto, inteiro, dinheiro, data, data_hora, percentual
+Coluna = namedtuple('Coluna', 'titulo tipo')
+
+# ``linhas(start, end)`` yields one tuple per row, in ``colunas`` order,
+# as plain values (Decimal, datetime, int, str) so every output - the
+# on-screen table, CSV, XLSX - formats them its own way.
+Relatorio = namedtuple('Relatorio', 'chave titulo colunas linhas usa_periodo')
+
+
+def _vendas(start, end):
+    for sale in Venda.iter_sales_report(start, end):
+        yield (sale['data_venda'], sale['cliente_nome'], sale['produtos'],
+               sale['valor_total'], sale['forma_pagamento'])
+
+
+def _mais_vendidos(start, end):
+    for data in Produto.iter_best_sellers(start, end):
+        yield data['produto'].nome, data['quantidade'], data['valor_total'], data['lucro']
+
+
+def _clientes_ativos(start, end):
+    for data in Cliente.iter_most_active(start, end):
+        yield (data['cliente'].nome, data['total_compras'], data['valor_total'],
+               data['ultima_compra'])
+
+
+def _estoque_baixo(start=None, end=None):
+    for product in Produto.iter_low_stock():
+        yield product.nome, product.estoque_atual, product.estoque_minimo, product.fornecedor
+
+
+def _lucro(start, end):
+    for data in ResumoDiario.get_profit_by_product(start, end):
+        yield (data['produto'], data['quantidade'], data['receita'], data['custo'],
+               data['lucro'], data['margem'])
+
+
+def _tendencias(start, end):
+    # Daily points for up to two months, monthly beyond that
+    granularity = 'day' if (end - start).days <= 62 else 'month'
+    for data in ResumoDiario.get_trends(start, end, granularity):
+        yield data['periodo'], data['quantidade'], data['receita'], data['lucro']
+
+
+def _itens_vendidos(start, end):
+    for item in Venda.iter_sold_items(start, end):
+        yield (item['data_venda'], item['venda_id'], item['cliente_nome'],
+               item['produto_nome'], item['quantidade'], item['preco_unitario'],
+               item['subtotal'], item['forma_pagamento'])
+
+
+# In ReportsWindow combo box order
+RELATORIOS = [
+    Relatorio('vendas', 'Vendas por Período', [
+        Coluna('Data', 'data'), Coluna('Cliente', 'texto'), Coluna('Produtos', 'texto'),
+        Coluna('Valor Total', 'dinheiro'), Coluna('Forma Pagamento', 'texto'),
+    ], _vendas, True),
+    Relatorio('mais_vendidos', 'Produtos Mais Vendidos', [
+        Coluna('Produto', 'texto'), Coluna('Quantidade Vendida', 'inteiro'),
+        Coluna('Valor Total', 'dinheiro'), Coluna('Lucro', 'dinheiro'),
+    ], _mais_vendidos, True),
+    Relatorio('clientes_ativos', 'Clientes Mais Ativos', [
+        Coluna('Cliente', 'texto'), Coluna('Total de Compras', 'inteiro'),
+        Coluna('Valor Total', 'dinheiro'), Coluna('Última Compra', 'data'),
+    ], _clientes_ativos, True),
+    Relatorio('estoque_baixo', 'Produtos com Estoque Baixo', [
+        Coluna('Produto', 'texto'), Coluna('Estoque Atual', 'inteiro'),
+        Coluna('Estoque Mínimo', 'inteiro'), Coluna('Fornecedor', 'texto'),
+    ], _estoque_baixo, False),
+    Relatorio('lucro', 'Análise de Lucro', [
+        Coluna('Produto', 'texto'), Coluna('Quantidade', 'inteiro'),
+        Coluna('Receita', 'dinheiro'), Coluna('Custo', 'dinheiro'),
+        Coluna('Lucro', 'dinheiro'), Coluna('Margem', 'percentual'),
+    ], _lucro, True),
+    Relatorio('tendencias', 'Tendências de Vendas', [
+        Coluna('Período', 'texto'), Coluna('Itens Vendidos', 'inteiro'),
+        Coluna('Receita', 'dinheiro'), Coluna('Lucro', 'dinheiro'),
+    ], _tendencias, True),
+    Relatorio('itens_vendidos', 'Itens Vendidos', [
+        Coluna('Data', 'data_hora'), Coluna('Venda', 'inteiro'), Coluna('Cliente', 'texto'),
+        Coluna('Produto', 'texto'), Coluna('Quantidade', 'inteiro'),
+        Coluna('Preço Unit.', 'dinheiro'), Coluna('Subtotal', 'dinheiro'),
+        Coluna('Forma Pagamento', 'texto'),
+    ], _itens_vendidos, True),
+]
+
+
+def format_value(value, tipo):
+    """Display text for a report cell (on screen and in CSV files)."""
+    if value is None:
+        return ''
+    if tipo == 'dinheiro':
+        return f'R$ {value:.2f}'
+    if tipo == 'data':
+        return value.strftime('%d/%m/%Y')
+    if tipo == 'data_hora':
+        return value.strftime('%d/%m/%Y %H:%M')
+    if tipo == 'percentual':
+        return f'{value * 100:.1f}%'
+    return str(value)
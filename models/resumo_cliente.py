@@ -0,0 +1,111 @@
+from config.database import Database
+from models.periodo import parse_timestamp
+from models.dinheiro import from_cents, ZERO
+
+# Shared by the incremental path (one sale) and the full rebuild.
+_SUMMARY_SELECT = """
+    SELECT cliente_id, COUNT(*), SUM(valor_total - COALESCE(desconto, 0)),
+           MIN(data_venda), MAX(data_venda)
+    FROM vendas
+    WHERE {where} AND cliente_id IS NOT NULL
+    GROUP BY cliente_id
+"""
+
+
+class ResumoCliente:
+    """Per-customer lifetime summary (resumo_clientes).
+
+    Purchase count, net value and first/last purchase are kept up to
+    date by every sale commit and delete, so reading a customer's
+    summary is a primary-key lookup however long their history is.
+    """
+
+    @staticmethod
+    def apply_sale(cur, venda_id, sign=1):
+        """Add (sign=1) or remove (sign=-1) one sale from its customer's summary.
+
+        Runs on the caller's cursor so it commits or rolls back together
+        with the sale itself. Removal must happen before the sale row is
+        deleted.
+        """
+        if sign >= 0:
+            cur.execute(f"""
+                INSERT INTO resumo_clientes (
+                    cliente_id, num_compras, valor_total, primeira_compra, ultima_compra
+                )
+                {_SUMMARY_SELECT.format(where='id = ?')}
+                ON CONFLICT (cliente_id) DO UPDATE SET
+                    num_compras = num_compras + excluded.num_compras,
+                    valor_total = valor_total + excluded.valor_total,
+                    primeira_compra = MIN(primeira_compra, excluded.primeira_compra),
+                    ultima_compra = MAX(ultima_compra, excluded.ultima_compra)
+            """, (venda_id,))
+            return
+
+        # First/last purchase cannot be un-applied; re-read them from the
+        # customer's other sales (an index range on idx_vendas_cliente_data)
+        cur.execute("""
+            UPDATE resumo_clientes
+            SET num_compras = num_compras - 1,
+                valor_total = valor_total - (
+                    SELECT valor_total - COALESCE(desconto, 0) FROM vendas WHERE id = :venda),
+                primeira_compra = (
+                    SELECT MIN(data_venda) FROM vendas
+                    WHERE cliente_id = resumo_clientes.cliente_id AND id != :venda),
+                ultima_compra = (
+                    SELECT MAX(data_venda) FROM vendas
+                    WHERE cliente_id = resumo_clientes.cliente_id AND id != :venda)
+            WHERE cliente_id = (SELECT cliente_id FROM vendas WHERE id = :venda)
+        """, {'venda': venda_id})
+        cur.execute("""
+            DELETE FROM resumo_clientes
+            WHERE cliente_id = (SELECT cliente_id FROM vendas WHERE id = ?)
+              AND num_compras <= 0
+        """, (venda_id,))
+
+    @staticmethod
+    def rebuild():
+        """Recompute every customer's summary from vendas."""
+        db = Database()
+        conn = db.get_connection()
+        
+        try:
+            cur = conn.cursor()
+            conn.execute("BEGIN")
+            cur.execute("DELETE FROM resumo_clientes")
+            cur.execute(f"""
+                INSERT INTO resumo_clientes (
+                    cliente_id, num_compras, valor_total, primeira_compra, ultima_compra
+                )
+                {_SUMMARY_SELECT.format(where='1')}
+            """)
+            conn.commit()
+            return cur.rowcount
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            db.return_connection(conn)
+
+    @staticmethod
+    def get(cliente_id):
+        """Lifetime value, purchase count, average ticket and first/last purchase."""
+        with Database().connection() as conn:
+            row = conn.execute("""
+                SELECT num_compras, valor_total, primeira_compra, ultima_compra
+                FROM resumo_clientes
+                WHERE cliente_id = ?
+            """, (cliente_id,)).fetchone()
+        
+        if row is None:
+            return {'num_compras': 0, 'valor_total': ZERO, 'ticket_medio': ZERO,
+                    'primeira_compra': None, 'ultima_compra': None}
+        num_compras, valor_total = row[0], row[1]
+        return {
+            'num_compras': num_compras,
+            'valor_total': from_cents(valor_total),
+            # Rounded to the centavo like every other amount
+            'ticket_medio': from_cents(round(valor_total / num_compras)),
+            'primeira_compra': parse_timestamp(row[2]),
+            'ultima_compra': parse_timestamp(row[3])
+        }
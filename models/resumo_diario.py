@@ -0,0 +1,147 @@
+from config.database import Database
+from models.periodo import day_range
+from models.dinheiro import from_cents
+
+# Shared by the incremental path (one sale, signed) and the full rebuild.
+_ROLLUP_SELECT = """
+    SELECT substr(v.data_venda, 1, 10), iv.produto_id, COALESCE(v.forma_pagamento, ''),
+           {sign} * SUM(iv.quantidade), {sign} * SUM(iv.subtotal),
+           {sign} * SUM(iv.quantidade * COALESCE(iv.custo_unitario, 0)),
+           {sign} * COUNT(DISTINCT v.id)
+    FROM vendas v
+    JOIN itens_venda iv ON iv.venda_id = v.id
+    WHERE {where} AND iv.produto_id IS NOT NULL
+    GROUP BY 1, 2, 3
+"""
+
+
+class ResumoDiario:
+    """Daily sales rollup (vendas_diarias): day x product x payment method.
+
+    Trend and profit reports read this table instead of scanning
+    itens_venda. Values are item subtotals, i.e. before the per-sale
+    discount, which cannot be attributed to individual products.
+    """
+
+    @staticmethod
+    def apply_sale(cur, venda_id, sign=1):
+        """Add (sign=1) or remove (sign=-1) one sale from the rollup.
+
+        Runs on the caller's cursor so it commits or rolls back together
+        with the sale itself.
+        """
+        sign = 1 if sign >= 0 else -1
+        cur.execute(f"""
+            INSERT INTO vendas_diarias (
+                dia, produto_id, forma_pagamento,
+                quantidade, valor_total, custo_total, num_vendas
+            )
+            {_ROLLUP_SELECT.format(sign=sign, where='v.id = ?')}
+            ON CONFLICT (dia, produto_id, forma_pagamento) DO UPDATE SET
+                quantidade = quantidade + excluded.quantidade,
+                valor_total = valor_total + excluded.valor_total,
+                custo_total = custo_total + excluded.custo_total,
+                num_vendas = num_vendas + excluded.num_vendas
+        """, (venda_id,))
+        if sign < 0:
+            cur.execute("""
+                DELETE FROM vendas_diarias
+                WHERE dia = (SELECT substr(data_venda, 1, 10) FROM vendas WHERE id = ?)
+                  AND num_vendas <= 0
+            """, (venda_id,))
+
+    @staticmethod
+    def rebuild():
+        """Recompute the whole rollup from vendas/itens_venda."""
+        db = Database()
+        conn = db.get_connection()
+        
+        try:
+            cur = conn.cursor()
+            conn.execute("BEGIN")
+            cur.execute("DELETE FROM vendas_diarias")
+            cur.execute(f"""
+                INSERT INTO vendas_diarias (
+                    dia, produto_id, forma_pagamento,
+                    quantidade, valor_total, custo_total, num_vendas
+                )
+                {_ROLLUP_SELECT.format(sign=1, where='1')}
+            """)
+            conn.commit()
+            return cur.rowcount
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            db.return_connection(conn)
+
+    @staticmethod
+    def _day_strings(start_date, end_date):
+        start, end = day_range(start_date, end_date)
+        return start.isoformat(), end.isoformat()
+
+    @classmethod
+    def get_profit_by_product(cls, start_date, end_date, limit=None):
+        db = Database()
+        conn = db.get_connection()
+        
+        try:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT d.produto_id, p.nome,
+                       SUM(d.quantidade), SUM(d.valor_total), SUM(d.custo_total)
+                FROM vendas_diarias d
+                LEFT JOIN produtos p ON p.id = d.produto_id
+                WHERE d.dia >= ? AND d.dia < ?
+                GROUP BY d.produto_id
+                ORDER BY SUM(d.valor_total) - SUM(d.custo_total) DESC
+                LIMIT ?
+            """, (*cls._day_strings(start_date, end_date), -1 if limit is None else limit))
+            
+            rows = []
+            for row in cur.fetchall():
+                receita, custo = row[3], row[4]
+                rows.append({
+                    'produto_id': row[0],
+                    'produto': row[1] or f'#{row[0]}',
+                    'quantidade': row[2],
+                    'receita': from_cents(receita),
+                    'custo': from_cents(custo),
+                    'lucro': from_cents(receita - custo),
+                    'margem': (receita - custo) / receita if receita else 0.0
+                })
+            
+            return rows
+        finally:
+            db.return_connection(conn)
+
+    @classmethod
+    def get_trends(cls, start_date, end_date, granularity='day'):
+        """Quantity, revenue and profit per day, month or year."""
+        length = {'day': 10, 'month': 7, 'year': 4}[granularity]
+        db = Database()
+        conn = db.get_connection()
+        
+        try:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT substr(dia, 1, ?) AS periodo,
+                       SUM(quantidade), SUM(valor_total), SUM(custo_total)
+                FROM vendas_diarias
+                WHERE dia >= ? AND dia < ?
+                GROUP BY periodo
+                ORDER BY periodo
+            """, (length, *cls._day_strings(start_date, end_date)))
+            
+            rows = []
+            for row in cur.fetchall():
+                rows.append({
+                    'periodo': row[0],
+                    'quantidade': row[1],
+                    'receita': from_cents(row[2]),
+                    'lucro': from_cents(row[2] - row[3])
+                })
+            
+            return rows
+        finally:
+            db.return_connection(conn)
@@ -1,29 +1,128 @@
 
+import time
+from threading import Lock
 from passlib.hash import pbkdf2_sha256
 from config.database import Database
+from models.configuracao import Configuracao
+from models.registro import RowMapper, name_keyset, where_clause
 import sqlite3
 
+
+class PasswordPolicy:
+    """PBKDF2 cost used for new hashes, stored per installation.
+
+    ``calibrate`` measures this machine and picks the number of rounds that
+    makes one verification take about ``target_ms``; hashes made under an
+    older policy are upgraded the next time their owner logs in.
+    """
+    KEY = 'pbkdf2_rounds'
+    DEFAULT_ROUNDS = pbkdf2_sha256.default_rounds
+    MIN_ROUNDS = 10000
+
+    _rounds = None
+    _lock = Lock()
+
+    @classmethod
+    def rounds(cls):
+        with cls._lock:
+            if cls._rounds is None:
+                try:
+                    cls._rounds = int(Configuracao.get(cls.KEY, cls.DEFAULT_ROUNDS))
+                except (sqlite3.Error, ValueError) as e:
+                    print(f"Error loading password policy: {e}")
+                    return cls.DEFAULT_ROUNDS
+            return cls._rounds
+
+    @classmethod
+    def set_rounds(cls, rounds):
+        rounds = max(int(rounds), cls.MIN_ROUNDS)
+        Configuracao.set(cls.KEY, rounds)
+        with cls._lock:
+            cls._rounds = rounds
+        return rounds
+
+    @classmethod
+    def hasher(cls):
+        return pbkdf2_sha256.using(rounds=cls.rounds())
+
+    @classmethod
+    def needs_rehash(cls, password_hash):
+        try:
+            return pbkdf2_sha256.from_string(password_hash).rounds != cls.rounds()
+        except ValueError:
+            return True
+
+    @staticmethod
+    def measure(rounds, samples=3):
+        """Best-of-``samples`` time in ms to verify one hash at ``rounds``."""
+        hasher = pbkdf2_sha256.using(rounds=rounds)
+        password_hash = hasher.hash('calibration')
+        best = None
+        for _ in range(samples):
+            start = time.perf_counter()
+            hasher.verify('calibration', password_hash)
+            elapsed = (time.perf_counter() - start) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    @classmethod
+    def calibrate(cls, target_ms=250, samples=3):
+        """Rounds that make a verification take about ``target_ms`` here."""
+        probe = cls.MIN_ROUNDS
+        elapsed = cls.measure(probe, samples)
+        # PBKDF2 cost is linear in the round count
+        rounds = int(probe * target_ms / max(elapsed, 0.001))
+        return max(cls.MIN_ROUNDS, round(rounds, -3))
+
+
+USER_COLUMNS = "id, username, password_hash, nome, nivel_acesso"
+
+
+def _nivel_acesso(value):
+    # Stored as lower-case text, like the constructor normalises it
+    return str(value).lower() if value else 'user'
+
+
 class Usuario:
+    __slots__ = ('id', 'username', 'password_hash', 'nome', 'nivel_acesso')
+
     def __init__(self, id=None, username=None, password=None, nome=None, nivel_acesso=None):
         self.id = id
         self.username = username
         self.password_hash = None if password is None else self.hash_password(password)
         self.nome = nome
         # Store nivel_acesso as string to maintain consistency
-        self.nivel_acesso = str(nivel_acesso).lower() if nivel_acesso else 'user'
-        self.db = Database()
+        self.nivel_acesso = _nivel_acesso(nivel_acesso)
 
     @staticmethod
     def hash_password(password):
-        return pbkdf2_sha256.hash(password)
+        return PasswordPolicy.hasher().hash(password)
 
     def verify_password(self, password):
         return pbkdf2_sha256.verify(password, self.password_hash)
 
+    def _update_password_hash(self, password):
+        # Re-hash under the current policy without touching other fields
+        db = Database()
+        conn = db.get_connection()
+        try:
+            password_hash = self.hash_password(password)
+            conn.execute(
+                "UPDATE usuarios SET password_hash = ? WHERE id = ?",
+                (password_hash, self.id)
+            )
+            conn.commit()
+            self.password_hash = password_hash
+        except sqlite3.Error as e:
+            print(f"Error updating password hash: {e}")
+        finally:
+            db.return_connection(conn)
+
     def save(self):
+        db = Database()
         conn = None
         try:
-            conn = self.db.get_connection()
+            conn = db.get_connection()
             cur = conn.cursor()
             
             if self.id is None:
@@ -45,12 +144,14 @@ class Usuario:
             return self.id
         finally:
             if conn:
-                self.db.return_connection(conn)
+                db.return_connection(conn)
 
     @classmethod
     def authenticate(cls, username, password):
         user = cls.get_by_username(username)
         if user and user.verify_password(password):
+            if PasswordPolicy.needs_rehash(user.password_hash):
+                user._update_password_hash(password)
             return user
         return None
 
@@ -62,18 +163,11 @@ class Usuario:
             conn = db.get_connection()
             cur = conn.cursor()
             
-            cur.execute("SELECT * FROM usuarios WHERE username = ?", (username,))
+            cur.execute(f"SELECT {USER_COLUMNS} FROM usuarios WHERE username = ?", (username,))
             user_data = cur.fetchone()
             
             if user_data:
-                user = cls(
-                    id=user_data[0],
-                    username=user_data[1],
-                    nome=user_data[3],
-                    nivel_acesso=user_data[4]
-                )
-                user.password_hash = user_data[2]  # Load password hash for verification
-                return user
+                return cls._from_row(user_data)
             return None
         finally:
             if conn:
@@ -87,17 +181,11 @@ class Usuario:
             conn = db.get_connection()
             cur = conn.cursor()
             
-            cur.execute("SELECT * FROM usuarios WHERE id = ?", (user_id,))
+            cur.execute(f"SELECT {USER_COLUMNS} FROM usuarios WHERE id = ?", (user_id,))
             user_data = cur.fetchone()
             
             if user_data:
-                return cls(
-                    id=user_data[0],
-                    username=user_data[1],
-                    password=None,
-                    nome=user_data[3],
-                    nivel_acesso=user_data[4]
-                )
+                return cls._from_row(user_data)
             return None
         finally:
             if conn:
@@ -105,25 +193,46 @@ class Usuario:
 
     @classmethod
     def get_all(cls):
+        return list(cls.iter_all())
+
+    @classmethod
+    def iter_all(cls, batch_size=500):
+        """Stream every user by name, ``batch_size`` rows per fetch."""
+        rows = Database().iter_query(f"""
+            SELECT {USER_COLUMNS}
+            FROM usuarios
+            ORDER BY nome, id
+        """, batch_size=batch_size)
+        for row in rows:
+            yield cls._from_row(row)
+
+    @classmethod
+    def get_page(cls, limit=100, after_id=None, after_name=None, nivel_acesso=None):
+        """One page of users by name, after the (after_name, after_id) cursor."""
+        conditions = []
+        params = []
+        keyset, keyset_params = name_keyset('usuarios', after_id, after_name)
+        if keyset:
+            conditions.append(keyset)
+            params.extend(keyset_params)
+        if nivel_acesso is not None:
+            conditions.append("nivel_acesso = ?")
+            params.append(_nivel_acesso(nivel_acesso))
+
         db = Database()
         conn = None
         try:
             conn = db.get_connection()
             cur = conn.cursor()
             
-            cur.execute("SELECT * FROM usuarios ORDER BY nome")
-            users = []
-            
-            for user_data in cur.fetchall():
-                users.append(cls(
-                    id=user_data[0],
-                    username=user_data[1],
-                    password=None,
-                    nome=user_data[3],
-                    nivel_acesso=user_data[4]
-                ))
-            
-            return users
+            cur.execute(f"""
+                SELECT {USER_COLUMNS}
+                FROM usuarios
+                {where_clause(conditions)}
+                ORDER BY nome, id
+                LIMIT ?
+            """, (*params, limit))
+            return cls._from_row.all(cur.fetchall())
         finally:
             if conn:
                 db.return_connection(conn)
@@ -132,7 +241,8 @@ class Usuario:
         if self.id is None:
             return False
             
-        conn = self.db.get_connection()
+        db = Database()
+        conn = db.get_connection()
         
         try:
             cur = conn.cursor()
@@ -143,6 +253,13 @@ class Usuario:
             print(f"Error deleting user: {e}")
             success = False
         finally:
-            self.db.return_connection(conn)
+            db.return_connection(conn)
             
         return success
+
+
+# Row (USER_COLUMNS order) -> Usuario. The stored hash is loaded too, so
+# saving an edited user without a new password keeps the old one.
+Usuario._from_row = RowMapper(Usuario, [
+    'id', 'username', 'password_hash', 'nome', ('nivel_acesso', _nivel_acesso),
+])
@@ -1,23 +1,77 @@
 
 from config.database import Database
+from models.produto import invalidate_product_cache
+from models.resumo_diario import ResumoDiario
+from models.resumo_cliente import ResumoCliente
+from models.dinheiro import to_money, to_cents, from_cents
+from models.registro import RowMapper, where_clause
+from models.periodo import (to_timestamp, parse_timestamp, day_range,
+                            day_bounds, month_range, year_range)
 from datetime import datetime
+from collections import namedtuple
+import json
+import uuid
 import sqlite3
 
+ItemVenda = namedtuple(
+    'ItemVenda', 'produto_id quantidade preco_unitario subtotal produto_nome'
+)
+
+SALE_COLUMNS = """id, cliente_id, usuario_id, data_venda, valor_total, desconto,
+                  forma_pagamento, chave_idempotencia"""
+
+
+def _item_from_row(row):
+    # (produto_id, quantidade, preco_unitario, subtotal, produto_nome), money in centavos
+    return {
+        'produto_id': row[0],
+        'quantidade': row[1],
+        'preco_unitario': from_cents(row[2]),
+        'subtotal': from_cents(row[3]),
+        'produto_nome': row[4]
+    }
+
+
+class EstoqueInsuficiente(Exception):
+    """Raised when a sale asks for more units than a product has in stock.
+
+    ``faltas`` holds one dict per short product: produto_id, produto_nome,
+    solicitado (units in the sale) and disponivel (units in stock).
+    """
+
+    def __init__(self, faltas):
+        self.faltas = faltas
+        super().__init__('Estoque insuficiente: ' + ', '.join(
+            f"{falta['produto_nome'] or falta['produto_id']} "
+            f"({falta['solicitado']} pedidos, {falta['disponivel']} em estoque)"
+            for falta in faltas
+        ))
+
+
 class Venda:
+    __slots__ = ('id', 'cliente_id', 'usuario_id', 'data_venda', 'valor_total',
+                 'desconto', 'forma_pagamento', 'chave_idempotencia', 'faltas', 'itens')
+
+    # Callables notified with (venda, results) after a sale is committed
+    _listeners = []
+
     def __init__(self, id=None, cliente_id=None, usuario_id=None, data_venda=None,
-                 valor_total=0, desconto=0, forma_pagamento=None):
+                 valor_total=0, desconto=0, forma_pagamento=None,
+                 chave_idempotencia=None):
         self.id = id
         self.cliente_id = cliente_id
         self.usuario_id = usuario_id
-        self.data_venda = data_venda or datetime.now()
-        self.valor_total = valor_total
-        self.desconto = desconto
+        self.data_venda = parse_timestamp(data_venda) or datetime.now()
+        self.valor_total = to_money(valor_total)
+        self.desconto = to_money(desconto)
         self.forma_pagamento = forma_pagamento
+        self.chave_idempotencia = chave_idempotencia
+        self.faltas = []
         self.itens = []
-        self.db = Database()
     
     def add_item(self, produto_id, quantidade, preco_unitario):
         """Add an item to the sale"""
+        preco_unitario = to_money(preco_unitario)
         subtotal = quantidade * preco_unitario
         self.itens.append({
             'produto_id': produto_id,
@@ -27,64 +81,337 @@ class Venda:
         })
         self.valor_total += subtotal
     
+    @classmethod
+    def add_listener(cls, callback):
+        if callback not in cls._listeners:
+            cls._listeners.append(callback)
+
+    @classmethod
+    def remove_listener(cls, callback):
+        if callback in cls._listeners:
+            cls._listeners.remove(callback)
+
+    def _notify_listeners(self, results):
+        for callback in list(self._listeners):
+            try:
+                callback(self, results)
+            except Exception as e:
+                print(f"Error in sale listener: {e}")
+
+    def get_items(self):
+        """Sale items as ItemVenda tuples, loading them once if needed."""
+        if not self.itens and self.id is not None:
+            db = Database()
+            conn = db.get_connection()
+            try:
+                cur = conn.cursor()
+                cur.execute("""
+                    SELECT iv.produto_id, iv.quantidade, iv.preco_unitario,
+                           iv.subtotal, p.nome
+                    FROM itens_venda iv
+                    LEFT JOIN produtos p ON p.id = iv.produto_id
+                    WHERE iv.venda_id = ?
+                    ORDER BY iv.id
+                """, (self.id,))
+                self.itens = [_item_from_row(row) for row in cur.fetchall()]
+            finally:
+                db.return_connection(conn)
+
+        return [ItemVenda(item['produto_id'], item['quantidade'],
+                          item['preco_unitario'], item['subtotal'],
+                          item.get('produto_nome'))
+                for item in self.itens]
+    
     def apply_discount(self, discount_value):
         """Apply discount to the total value"""
+        discount_value = to_money(discount_value)
         if discount_value > self.valor_total:
             return False
         self.desconto = discount_value
         return True
     
-    def save(self):
-        conn = self.db.get_connection()
+    def _quantities(self):
+        quantities = {}
+        for item in self.itens:
+            quantities[item['produto_id']] = quantities.get(item['produto_id'], 0) + item['quantidade']
+        return quantities
+
+    # Checkout gives up on a locked database after this long (ms) and
+    # journals the sale unreserved instead of freezing the register
+    RESERVE_BUSY_TIMEOUT = 100
+
+    def reserve_stock(self):
+        """Take the sale's units out of stock now, ahead of the commit.
+
+        The register calls this at checkout, before the sale is journalled,
+        so a cart that asks for more than is on the shelf is refused while
+        the customer is still there. Every product is decremented by one
+        conditional UPDATE in a BEGIN IMMEDIATE transaction; if any line
+        is short, nothing is taken and EstoqueInsuficiente lists the
+        shortfall per product. If the write lock is not free within
+        RESERVE_BUSY_TIMEOUT ms the busy OperationalError is raised at
+        once, with no retries, so checkout never hangs on the lock.
+
+        The units taken are recorded in reservas_estoque under the sale's
+        idempotency key (assigned here if missing), in the same
+        transaction. Committing the sale consumes that record instead of
+        decrementing again; a record no journalled sale refers to is
+        given back by release_stale_reservations.
+        """
+        if self.chave_idempotencia is None:
+            self.chave_idempotencia = uuid.uuid4().hex
+        quantities = self._quantities()
+        lines = json.dumps(list(quantities.items()))
+
+        def reserve(cur):
+            cur.execute("""
+                UPDATE produtos
+                SET estoque_atual = estoque_atual - q.quantidade
+                FROM (SELECT json_extract(value, '$[0]') AS produto_id,
+                             json_extract(value, '$[1]') AS quantidade
+                      FROM json_each(?)) AS q
+                WHERE produtos.id = q.produto_id
+                  AND produtos.estoque_atual >= q.quantidade
+                RETURNING produtos.id
+            """, (lines,))
+            reserved = {row[0] for row in cur.fetchall()}
+            if len(reserved) == len(quantities):
+                cur.execute("""
+                    INSERT INTO reservas_estoque (chave, produto_id, quantidade)
+                    SELECT ?, json_extract(value, '$[0]'), json_extract(value, '$[1]')
+                    FROM json_each(?)
+                """, (self.chave_idempotencia, lines))
+                return
+            short = [produto_id for produto_id in quantities if produto_id not in reserved]
+            cur.execute(f"""
+                SELECT id, nome, estoque_atual FROM produtos
+                WHERE id IN ({', '.join('?' * len(short))})
+            """, short)
+            found = {row[0]: row for row in cur.fetchall()}
+            # Raising rolls back the units already taken for the other lines
+            raise EstoqueInsuficiente([
+                {'produto_id': produto_id,
+                 'produto_nome': found[produto_id][1] if produto_id in found else None,
+                 'solicitado': quantities[produto_id],
+                 'disponivel': found[produto_id][2] if produto_id in found else 0}
+                for produto_id in short
+            ])
+
+        Database().run_immediate(reserve, retries=0, busy_timeout=self.RESERVE_BUSY_TIMEOUT)
+        invalidate_product_cache(*quantities)
+
+    @staticmethod
+    def _release_reservations(cur, condition, params):
+        cur.execute(f"""
+            DELETE FROM reservas_estoque WHERE {condition}
+            RETURNING produto_id, quantidade
+        """, params)
+        released = {}
+        for produto_id, quantidade in cur.fetchall():
+            released[produto_id] = released.get(produto_id, 0) + quantidade
+        cur.executemany("UPDATE produtos SET estoque_atual = estoque_atual + ? WHERE id = ?",
+                        [(quantidade, produto_id) for produto_id, quantidade in released.items()])
+        return released
+
+    def release_stock(self):
+        """Give back units reserve_stock() took for a sale that will not be committed."""
+        if self.chave_idempotencia is None:
+            return
+        released = Database().run_immediate(lambda cur: self._release_reservations(
+            cur, "chave = ?", (self.chave_idempotencia,)))
+        invalidate_product_cache(*released)
+
+    @classmethod
+    def release_stale_reservations(cls, chaves_ativas, older_than=60):
+        """Give back reservations older than ``older_than`` seconds whose sale is
+        not among ``chaves_ativas`` (the keys still pending in the journal).
+
+        These are checkouts that crashed between reserving and journalling.
+        The age limit leaves alone a reservation whose sale is being
+        journalled right now. Returns the number of products restocked.
+        """
+        cutoff = f'-{int(older_than)} seconds'
+        db = Database()
+        # Normally there is nothing to do: check without taking the write lock
+        with db.connection() as conn:
+            if not conn.execute("""
+                SELECT 1 FROM reservas_estoque WHERE criada_em < datetime('now', ?) LIMIT 1
+            """, (cutoff,)).fetchone():
+                return 0
+        released = db.run_immediate(lambda cur: cls._release_reservations(
+            cur,
+            "criada_em < datetime('now', ?) AND chave NOT IN (SELECT value FROM json_each(?))",
+            (cutoff, json.dumps(list(chaves_ativas)))))
+        invalidate_product_cache(*released)
+        return len(released)
+
+    def commit(self, permitir_falta=False):
+        """Persist a new sale and its items in one transaction.
+
+        Items go in with a single executemany and stock is reserved by one
+        conditional UPDATE driven by the rows just inserted, so the number
+        of statements does not grow with the size of the cart. Unless
+        ``permitir_falta`` is set, a product without enough stock raises
+        EstoqueInsuficiente and nothing is written.
+        Returns one outcome dict per cart line; raises on failure after
+        rolling back.
+        """
+        return self.commit_batch([self], permitir_falta)[0]
+
+    @classmethod
+    def commit_batch(cls, vendas, permitir_falta=False):
+        """Persist several new sales in a single transaction.
+
+        A sale whose chave_idempotencia is already in the database is not
+        inserted again; it just picks up the existing id and yields no
+        results. Returns the per-line outcomes of each sale, in order.
+        """
+        pending = [venda for venda in vendas if venda.id is None]
+        if not pending:
+            return [[] for _ in vendas]
+
+        # BEGIN IMMEDIATE, retried on SQLITE_BUSY; any error rolls back
+        written = Database().run_immediate(lambda cur: {
+            id(venda): venda._write(cur, permitir_falta) for venda in pending
+        })
+        
+        outcomes = []
+        for venda in vendas:
+            venda_id, rows = written.get(id(venda), (venda.id, None))
+            venda.id = venda_id
+            outcomes.append(venda._after_commit(rows) if rows is not None else [])
+        return outcomes
+
+    def _write(self, cur, permitir_falta=False):
+        """Insert this sale inside the caller's transaction.
+
+        Returns (venda_id, item rows), or (existing id, None) when the
+        idempotency key shows the sale was committed before.
+        """
+        if self.chave_idempotencia is not None:
+            cur.execute("SELECT id FROM vendas WHERE chave_idempotencia = ?",
+                        (self.chave_idempotencia,))
+            existing = cur.fetchone()
+            if existing:
+                return existing[0], None
+        
+        # Insert new sale
+        cur.execute("""
+            INSERT INTO vendas (
+                cliente_id, usuario_id, data_venda,
+                valor_total, desconto, forma_pagamento, chave_idempotencia
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (
+            self.cliente_id, self.usuario_id, to_timestamp(self.data_venda),
+            to_cents(self.valor_total), to_cents(self.desconto), self.forma_pagamento,
+            self.chave_idempotencia
+        ))
+        venda_id = cur.lastrowid
+        
+        # Insert sale items
+        cur.executemany("""
+            INSERT INTO itens_venda (
+                venda_id, produto_id, quantidade,
+                preco_unitario, subtotal, custo_unitario
+            )
+            VALUES (?, ?, ?, ?, ?,
+                    (SELECT preco_custo FROM produtos WHERE id = ?))
+        """, [
+            (venda_id, item['produto_id'], item['quantidade'],
+             to_cents(item['preco_unitario']), to_cents(item['subtotal']),
+             item['produto_id'])
+            for item in self.itens
+        ])
         
+        # Units reserved at checkout are already out of stock: consume the
+        # reservation instead of taking them again
+        reserved = False
+        if self.chave_idempotencia is not None:
+            cur.execute("DELETE FROM reservas_estoque WHERE chave = ?", (self.chave_idempotencia,))
+            reserved = cur.rowcount > 0
+        if not reserved:
+            self._reserve_stock(cur, venda_id, permitir_falta)
+        
+        # Keep the daily rollup and customer summary in step within the same transaction
+        ResumoDiario.apply_sale(cur, venda_id)
+        ResumoCliente.apply_sale(cur, venda_id)
+        
+        # Item ids are assigned in insertion order, i.e. cart order
+        cur.execute("""
+            SELECT iv.id, p.estoque_atual
+            FROM itens_venda iv
+            JOIN produtos p ON p.id = iv.produto_id
+            WHERE iv.venda_id = ?
+            ORDER BY iv.id
+        """, (venda_id,))
+        return venda_id, cur.fetchall()
+
+    def _reserve_stock(self, cur, venda_id, permitir_falta):
+        """Take the sale's units out of stock, all products in one UPDATE.
+
+        The stock test sits in the UPDATE's own WHERE clause, so two
+        registers selling the last unit cannot both succeed: the second
+        one finds the row already decremented and matches nothing.
+        """
+        sold = """
+            SELECT SUM(iv.quantidade)
+            FROM itens_venda iv
+            WHERE iv.venda_id = :venda AND iv.produto_id = produtos.id
+        """
+        cur.execute(f"""
+            UPDATE produtos
+            SET estoque_atual = estoque_atual - ({sold})
+            WHERE id IN (SELECT produto_id FROM itens_venda WHERE venda_id = :venda)
+              AND (:permitir OR estoque_atual >= ({sold}))
+            RETURNING id
+        """, {'venda': venda_id, 'permitir': int(permitir_falta)})
+        reserved = {row[0] for row in cur.fetchall()}
+        if reserved >= {item['produto_id'] for item in self.itens}:
+            return
+        
+        cur.execute("""
+            SELECT iv.produto_id, p.nome, SUM(iv.quantidade), p.estoque_atual
+            FROM itens_venda iv
+            JOIN produtos p ON p.id = iv.produto_id
+            WHERE iv.venda_id = ?
+            GROUP BY iv.produto_id
+        """, (venda_id,))
+        faltas = [
+            {'produto_id': row[0], 'produto_nome': row[1],
+             'solicitado': row[2], 'disponivel': row[3]}
+            for row in cur.fetchall() if row[0] not in reserved
+        ]
+        if faltas:
+            raise EstoqueInsuficiente(faltas)
+
+    def _after_commit(self, rows):
+        invalidate_product_cache(*{item['produto_id'] for item in self.itens})
+        results = []
+        for item, (item_id, estoque_atual) in zip(self.itens, rows):
+            results.append({
+                'item_id': item_id,
+                'produto_id': item['produto_id'],
+                'quantidade': item['quantidade'],
+                'subtotal': item['subtotal'],
+                'estoque_atual': estoque_atual,
+                'estoque_negativo': estoque_atual < 0
+            })
+        self._notify_listeners(results)
+        return results
+
+    def save(self):
+        self.faltas = []
         try:
-            cur = conn.cursor()
-            # Start transaction
-            conn.execute("BEGIN")
-            
-            if self.id is None:
-                # Insert new sale
-                cur.execute("""
-                    INSERT INTO vendas (
-                        cliente_id, usuario_id, data_venda,
-                        valor_total, desconto, forma_pagamento
-                    )
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (
-                    self.cliente_id, self.usuario_id, self.data_venda,
-                    self.valor_total, self.desconto, self.forma_pagamento
-                ))
-                self.id = cur.lastrowid
-                
-                # Insert sale items
-                for item in self.itens:
-                    cur.execute("""
-                        INSERT INTO itens_venda (
-                            venda_id, produto_id, quantidade,
-                            preco_unitario, subtotal
-                        )
-                        VALUES (?, ?, ?, ?, ?)
-                    """, (
-                        self.id, item['produto_id'], item['quantidade'],
-                        item['preco_unitario'], item['subtotal']
-                    ))
-                    
-                    # Update product stock
-                    cur.execute("""
-                        UPDATE produtos
-                        SET estoque_atual = estoque_atual - ?
-                        WHERE id = ?
-                    """, (item['quantidade'], item['produto_id']))
-            
-            # Commit transaction
-            conn.commit()
+            self.commit()
             success = True
+        except EstoqueInsuficiente as e:
+            print(f"Error saving sale: {e}")
+            self.faltas = e.faltas
+            success = False
         except Exception as e:
-            conn.rollback()
             print(f"Error saving sale: {e}")
             success = False
-        finally:
-            self.db.return_connection(conn)
         
         return success
 
@@ -96,79 +423,241 @@ class Venda:
         try:
             cur = conn.cursor()
             # Get sale data
-            cur.execute("SELECT * FROM vendas WHERE id = ?", (venda_id,))
+            cur.execute(f"SELECT {SALE_COLUMNS} FROM vendas WHERE id = ?", (venda_id,))
             venda_data = cur.fetchone()
             
             if not venda_data:
                 return None
-            
-            # Create sale object
-            venda = cls(
-                id=venda_data[0],
-                cliente_id=venda_data[1],
-                usuario_id=venda_data[2],
-                data_venda=venda_data[3],
-                valor_total=venda_data[4],
-                desconto=venda_data[5],
-                forma_pagamento=venda_data[6]
-            )
+            venda = cls._from_row(venda_data)
             
             # Get sale items
             cur.execute("""
-                SELECT produto_id, quantidade, preco_unitario, subtotal
-                FROM itens_venda
-                WHERE venda_id = ?
+                SELECT iv.produto_id, iv.quantidade, iv.preco_unitario,
+                       iv.subtotal, p.nome
+                FROM itens_venda iv
+                LEFT JOIN produtos p ON p.id = iv.produto_id
+                WHERE iv.venda_id = ?
+                ORDER BY iv.id
             """, (venda_id,))
-            
-            for item_data in cur.fetchall():
-                venda.itens.append({
-                    'produto_id': item_data[0],
-                    'quantidade': item_data[1],
-                    'preco_unitario': item_data[2],
-                    'subtotal': item_data[3]
-                })
+            venda.itens = [_item_from_row(row) for row in cur.fetchall()]
             
             return venda
         finally:
             db.return_connection(conn)
 
     @classmethod
-    def get_sales_by_period(cls, start_date, end_date):
+    def get_sales_in_range(cls, start, end):
+        """Sales with start <= data_venda < end, newest first.
+
+        The bare column comparison lets SQLite walk the data_venda index and only
+        touch the rows inside the range.
+        """
         db = Database()
         conn = db.get_connection()
         
         try:
             cur = conn.cursor()
             cur.execute("""
-                SELECT v.*, c.nome as cliente_nome, u.nome as usuario_nome
+                SELECT v.id, v.data_venda, v.valor_total, v.desconto,
+                       v.forma_pagamento, c.nome as cliente_nome,
+                       u.nome as usuario_nome
                 FROM vendas v
                 LEFT JOIN clientes c ON v.cliente_id = c.id
                 LEFT JOIN usuarios u ON v.usuario_id = u.id
-                WHERE DATE(v.data_venda) BETWEEN ? AND ?
+                WHERE v.data_venda >= ? AND v.data_venda < ?
                 ORDER BY v.data_venda DESC
-            """, (start_date, end_date))
+            """, (to_timestamp(start), to_timestamp(end)))
             
             sales = []
             for row in cur.fetchall():
                 sales.append({
                     'id': row[0],
-                    'cliente_nome': row[7],
-                    'usuario_nome': row[8],
-                    'data_venda': row[3],
-                    'valor_total': row[4],
-                    'desconto': row[5],
-                    'forma_pagamento': row[6]
+                    'cliente_nome': row[5],
+                    'usuario_nome': row[6],
+                    'data_venda': parse_timestamp(row[1]),
+                    'valor_total': from_cents(row[2]),
+                    'desconto': from_cents(row[3]),
+                    'forma_pagamento': row[4]
                 })
             
             return sales
         finally:
             db.return_connection(conn)
 
+    @classmethod
+    def get_sales_by_period(cls, start_date, end_date):
+        """Sales from start_date to end_date, both days included."""
+        return cls.get_sales_in_range(*day_range(start_date, end_date))
+
+    @classmethod
+    def get_sales_by_month(cls, year, month):
+        return cls.get_sales_in_range(*month_range(year, month))
+
+    @classmethod
+    def get_sales_by_year(cls, year):
+        return cls.get_sales_in_range(*year_range(year))
+
+    @classmethod
+    def get_by_date_range(cls, start_date, end_date):
+        """Sales (with their items preloaded) from start_date to end_date.
+
+        Two queries in total regardless of how many sales fall in the range.
+        """
+        start, end = day_bounds(start_date, end_date)
+        db = Database()
+        conn = db.get_connection()
+        
+        try:
+            cur = conn.cursor()
+            cur.execute(f"""
+                SELECT {SALE_COLUMNS}
+                FROM vendas
+                WHERE data_venda >= ? AND data_venda < ?
+                ORDER BY data_venda DESC
+            """, (start, end))
+            vendas = {venda.id: venda for venda in cls._from_row.all(cur.fetchall())}
+            
+            cur.execute("""
+                SELECT iv.venda_id, iv.produto_id, iv.quantidade,
+                       iv.preco_unitario, iv.subtotal, p.nome
+                FROM vendas v
+                JOIN itens_venda iv ON iv.venda_id = v.id
+                LEFT JOIN produtos p ON p.id = iv.produto_id
+                WHERE v.data_venda >= ? AND v.data_venda < ?
+                ORDER BY iv.id
+            """, (start, end))
+            
+            for item_data in cur.fetchall():
+                vendas[item_data[0]].itens.append(_item_from_row(item_data[1:]))
+            
+            return list(vendas.values())
+        finally:
+            db.return_connection(conn)
+
+    @classmethod
+    def iter_all(cls, batch_size=500):
+        """Stream every sale (items not loaded) in id order, ``batch_size`` rows per fetch."""
+        rows = Database().iter_query(f"""
+            SELECT {SALE_COLUMNS}
+            FROM vendas
+            ORDER BY id
+        """, batch_size=batch_size)
+        for row in rows:
+            yield cls._from_row(row)
+
+    @classmethod
+    def get_page(cls, limit=100, after_id=None, cliente_id=None, usuario_id=None,
+                 start_date=None, end_date=None, forma_pagamento=None):
+        """One page of sales (items not loaded), newest id first.
+
+        ``after_id`` is the id of the last sale already shown; the next
+        page starts below it on the primary key, so deep pages cost the
+        same as the first. ``start_date``/``end_date`` are whole days.
+        """
+        conditions = []
+        params = []
+        if after_id is not None:
+            conditions.append("id < ?")
+            params.append(after_id)
+        if cliente_id is not None:
+            conditions.append("cliente_id = ?")
+            params.append(cliente_id)
+        if usuario_id is not None:
+            conditions.append("usuario_id = ?")
+            params.append(usuario_id)
+        if start_date is not None:
+            conditions.append("data_venda >= ?")
+            params.append(day_bounds(start_date, start_date)[0])
+        if end_date is not None:
+            conditions.append("data_venda < ?")
+            params.append(day_bounds(end_date, end_date)[1])
+        if forma_pagamento is not None:
+            conditions.append("forma_pagamento = ?")
+            params.append(forma_pagamento)
+
+        db = Database()
+        conn = db.get_connection()
+        
+        try:
+            cur = conn.cursor()
+            cur.execute(f"""
+                SELECT {SALE_COLUMNS}
+                FROM vendas
+                {where_clause(conditions)}
+                ORDER BY id DESC
+                LIMIT ?
+            """, (*params, limit))
+            return cls._from_row.all(cur.fetchall())
+        finally:
+            db.return_connection(conn)
+
+    @classmethod
+    def get_sales_report(cls, start_date, end_date):
+        """Ready-to-render rows for the "Vendas por Período" report."""
+        return list(cls.iter_sales_report(start_date, end_date))
+
+    @staticmethod
+    def iter_sales_report(start_date, end_date):
+        """Stream the "Vendas por Período" rows, newest sale first.
+
+        Client names and the item summary come from one grouped query
+        instead of a lookup per sale and per item.
+        """
+        rows = Database().iter_query("""
+            SELECT v.id, v.data_venda, c.nome, v.valor_total, v.forma_pagamento,
+                   group_concat(iv.quantidade || 'x ' || COALESCE(p.nome, '?'),
+                                char(10)) AS produtos
+            FROM vendas v
+            LEFT JOIN clientes c ON c.id = v.cliente_id
+            LEFT JOIN itens_venda iv ON iv.venda_id = v.id
+            LEFT JOIN produtos p ON p.id = iv.produto_id
+            WHERE v.data_venda >= ? AND v.data_venda < ?
+            GROUP BY v.id
+            ORDER BY v.data_venda DESC
+        """, day_bounds(start_date, end_date))
+        
+        for row in rows:
+            yield {
+                'id': row[0],
+                'data_venda': parse_timestamp(row[1]),
+                'cliente_nome': row[2] or 'N/A',
+                'valor_total': from_cents(row[3]),
+                'forma_pagamento': row[4],
+                'produtos': row[5] or ''
+            }
+
+    @staticmethod
+    def iter_sold_items(start_date, end_date):
+        """Stream one row per sold item from start_date to end_date, in sale order."""
+        rows = Database().iter_query("""
+            SELECT v.id, v.data_venda, c.nome, p.nome, iv.quantidade,
+                   iv.preco_unitario, iv.subtotal, v.forma_pagamento
+            FROM vendas v
+            JOIN itens_venda iv ON iv.venda_id = v.id
+            LEFT JOIN clientes c ON c.id = v.cliente_id
+            LEFT JOIN produtos p ON p.id = iv.produto_id
+            WHERE v.data_venda >= ? AND v.data_venda < ?
+            ORDER BY v.data_venda, iv.id
+        """, day_bounds(start_date, end_date))
+        
+        for row in rows:
+            yield {
+                'venda_id': row[0],
+                'data_venda': parse_timestamp(row[1]),
+                'cliente_nome': row[2] or 'N/A',
+                'produto_nome': row[3] or '?',
+                'quantidade': row[4],
+                'preco_unitario': from_cents(row[5]),
+                'subtotal': from_cents(row[6]),
+                'forma_pagamento': row[7]
+            }
+
     def delete(self):
         if self.id is None:
             return False
             
-        conn = self.db.get_connection()
+        db = Database()
+        conn = db.get_connection()
         
         try:
             cur = conn.cursor()
@@ -183,13 +672,18 @@ class Venda:
             """, (self.id,))
             
             # Restore stock for each item
-            for item in cur.fetchall():
+            itens = cur.fetchall()
+            for item in itens:
                 cur.execute("""
                     UPDATE produtos
                     SET estoque_atual = estoque_atual + ?
                     WHERE id = ?
                 """, (item[1], item[0]))
             
+            # Take the sale out of the rollups before its rows go
+            ResumoDiario.apply_sale(cur, self.id, sign=-1)
+            ResumoCliente.apply_sale(cur, self.id, sign=-1)
+            
             # Delete sale items
             cur.execute("DELETE FROM itens_venda WHERE venda_id = ?", (self.id,))
             
@@ -198,12 +692,21 @@ class Venda:
             
             # Commit transaction
             conn.commit()
+            invalidate_product_cache(*{item[0] for item in itens})
             success = True
         except Exception as e:
             conn.rollback()
             print(f"Error deleting sale: {e}")
             success = False
         finally:
-            self.db.return_connection(conn)
+            db.return_connection(conn)
             
         return success
+
+
+# Row (SALE_COLUMNS order, money in centavos) -> Venda with its items not loaded
+Venda._from_row = RowMapper(Venda, [
+    'id', 'cliente_id', 'usuario_id', ('data_venda', parse_timestamp),
+    ('valor_total', from_cents), ('desconto', from_cents),
+    'forma_pagamento', 'chave_idempotencia',
+], defaults={'itens': list, 'faltas': list})
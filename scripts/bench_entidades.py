@@ -0,0 +1,114 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import tracemalloc
+
+# Add project root directory to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from config.database import Database
+from models.produto import Produto, PRODUCT_COLUMNS
+from models.dinheiro import to_money, from_cents
+
+PRODUCTS = 100_000
+ROUNDS = 3
+
+
+class LegacyProduto:
+    """The previous Produto: a __dict__ object holding its own Database handle."""
+
+    def __init__(self, id=None, nome=None, codigo_barras=None, categoria_id=None,
+                 preco_custo=None, preco_venda=None, estoque_atual=None,
+                 estoque_minimo=None, fornecedor=None):
+        self.id = id
+        self.nome = nome
+        self.codigo_barras = codigo_barras
+        self.categoria_id = categoria_id
+        self.preco_custo = None if preco_custo is None else to_money(preco_custo)
+        self.preco_venda = None if preco_venda is None else to_money(preco_venda)
+        self.estoque_atual = estoque_atual
+        self.estoque_minimo = estoque_minimo
+        self.fornecedor = fornecedor
+        self.db = Database()
+
+
+def legacy_get_all(rows):
+    # The previous get_all loop: keyword construction with positional indexing
+    return [LegacyProduto(
+        id=row[0],
+        nome=row[1],
+        codigo_barras=row[2],
+        categoria_id=row[3],
+        preco_custo=from_cents(row[4]),
+        preco_venda=from_cents(row[5]),
+        estoque_atual=row[6],
+        estoque_minimo=row[7],
+        fornecedor=row[8]
+    ) for row in rows]
+
+
+def seed_products(db, count):
+    with db.connection() as conn:
+        conn.executemany("""
+            INSERT INTO produtos (nome, codigo_barras, preco_custo, preco_venda,
+                                  estoque_atual, estoque_minimo, fornecedor)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, [(f'Produto {i:06d}', f'789{i:010d}', 500 + i % 300, 990 + i % 500,
+               i % 50, 5, 'Fornecedor') for i in range(count)])
+        conn.commit()
+
+
+def fetch_rows(db):
+    with db.connection() as conn:
+        return conn.execute(f"SELECT {PRODUCT_COLUMNS} FROM produtos ORDER BY nome").fetchall()
+
+
+def measure(build, rows):
+    best = None
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        build(rows)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    objects = build(rows)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return best, size
+
+
+def run_benchmark():
+    tmp_dir = tempfile.mkdtemp(prefix='supercash-bench-')
+    db = Database()
+    db.db_path = os.path.join(tmp_dir, 'bench.db')
+    try:
+        db.initialize()
+        seed_products(db, PRODUCTS)
+        # Rows are fetched once so only object construction is compared
+        rows = fetch_rows(db)
+
+        print(f'{"classe":>10} {"tempo (ms)":>11} {"linhas/s":>10} {"memória (MB)":>13} '
+              f'{"bytes/obj":>10}')
+        for name, build in (('legado', legacy_get_all), ('slots', Produto._from_row.all)):
+            elapsed, size = measure(build, rows)
+            print(f'{name:>10} {elapsed * 1000:>11.1f} {len(rows) / elapsed:>10.0f} '
+                  f'{size / 1e6:>13.1f} {size / len(rows):>10.0f}')
+
+        start = time.perf_counter()
+        Produto.get_all()
+        print(f'Produto.get_all() com {PRODUCTS} produtos: '
+              f'{(time.perf_counter() - start) * 1000:.0f} ms')
+        return True
+    finally:
+        db.close_all()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    success = run_benchmark()
+    sys.exit(0 if success else 1)
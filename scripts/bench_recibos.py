@@ -0,0 +1,74 @@
+import io
+import os
+import sys
+import time
+import uuid
+import shutil
+import tempfile
+from datetime import datetime
+
+# Add project root directory to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from config.database import Database
+from models.venda import Venda
+from models.impressao import ReceiptRenderer, build_receipt, fonts, load_logo
+
+CART_SIZES = (5, 20, 80)
+RECEIPTS = 200
+
+
+def build_recibo(lines):
+    venda = Venda(usuario_id=1, forma_pagamento='PIX', data_venda=datetime.now(),
+                  chave_idempotencia=uuid.uuid4().hex)
+    for produto_id in range(1, lines + 1):
+        venda.add_item(produto_id, 2, 4.99)
+    nomes = {produto_id: f'Produto de teste número {produto_id}'
+             for produto_id in range(1, lines + 1)}
+    return build_receipt(venda, nomes, operador='Benchmark', cliente='Cliente Teste')
+
+
+def cold_render(recibo):
+    """Every cache dropped: what rendering cost before the engine kept state."""
+    fonts.cache_clear()
+    load_logo.cache_clear()
+    ReceiptRenderer._qr_cache.clear()
+    ReceiptRenderer().render(recibo, io.BytesIO())
+
+
+def receipts_per_second(render, recibos):
+    start = time.perf_counter()
+    for recibo in recibos:
+        render(recibo)
+    return len(recibos) / (time.perf_counter() - start)
+
+
+def run_benchmark():
+    tmp_dir = tempfile.mkdtemp(prefix='supercash-bench-')
+    db = Database()
+    db.db_path = os.path.join(tmp_dir, 'bench.db')
+    try:
+        db.initialize()
+        renderer = ReceiptRenderer()
+
+        print(f'{"linhas":>8} {"frio (rec/s)":>13} {"quente (rec/s)":>15} '
+              f'{"reimpressão (rec/s)":>20}')
+        for lines in CART_SIZES:
+            recibos = [build_recibo(lines) for _ in range(RECEIPTS)]
+            cold = receipts_per_second(cold_render, recibos)
+            # Fresh keys: fonts, logo and header cached, QR codes still new
+            recibos = [build_recibo(lines) for _ in range(RECEIPTS)]
+            warm = receipts_per_second(lambda r: renderer.render(r, io.BytesIO()), recibos)
+            # Same receipts again: QR codes come from the cache too
+            reprint = receipts_per_second(lambda r: renderer.render(r, io.BytesIO()), recibos)
+            print(f'{lines:>8} {cold:>13.1f} {warm:>15.1f} {reprint:>20.1f}')
+        return True
+    finally:
+        db.close_all()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    success = run_benchmark()
+    sys.exit(0 if success else 1)
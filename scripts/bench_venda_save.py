@@ -0,0 +1,135 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+# Add project root directory to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from config.database import Database
+from models.venda import Venda
+from models.periodo import to_timestamp
+from models.dinheiro import to_cents
+
+CART_SIZES = (10, 100, 1000)
+ROUNDS = 40
+
+
+def insert_sale(cur, venda):
+    # Identical on both sides: the vendas row the items hang off
+    cur.execute("""
+        INSERT INTO vendas (
+            cliente_id, usuario_id, data_venda,
+            valor_total, desconto, forma_pagamento
+        )
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (
+        venda.cliente_id, venda.usuario_id, to_timestamp(venda.data_venda),
+        to_cents(venda.valor_total), to_cents(venda.desconto), venda.forma_pagamento
+    ))
+    return cur.lastrowid
+
+
+def legacy_items(cur, venda):
+    """The previous Venda.save() loop: one INSERT and one UPDATE per cart line."""
+    venda_id = insert_sale(cur, venda)
+    for item in venda.itens:
+        cur.execute("""
+            INSERT INTO itens_venda (
+                venda_id, produto_id, quantidade,
+                preco_unitario, subtotal, custo_unitario
+            )
+            VALUES (?, ?, ?, ?, ?,
+                    (SELECT preco_custo FROM produtos WHERE id = ?))
+        """, (
+            venda_id, item['produto_id'], item['quantidade'],
+            to_cents(item['preco_unitario']), to_cents(item['subtotal']), item['produto_id']
+        ))
+        cur.execute("""
+            UPDATE produtos
+            SET estoque_atual = estoque_atual - ?
+            WHERE id = ?
+        """, (item['quantidade'], item['produto_id']))
+
+
+def batched_items(cur, venda):
+    """What Venda._write does for the same lines: one executemany, one UPDATE."""
+    venda_id = insert_sale(cur, venda)
+    cur.executemany("""
+        INSERT INTO itens_venda (
+            venda_id, produto_id, quantidade,
+            preco_unitario, subtotal, custo_unitario
+        )
+        VALUES (?, ?, ?, ?, ?,
+                (SELECT preco_custo FROM produtos WHERE id = ?))
+    """, [
+        (venda_id, item['produto_id'], item['quantidade'],
+         to_cents(item['preco_unitario']), to_cents(item['subtotal']), item['produto_id'])
+        for item in venda.itens
+    ])
+    venda._reserve_stock(cur, venda_id, permitir_falta=False)
+
+
+def seed_products(db, count):
+    with db.connection() as conn:
+        conn.execute("""
+            INSERT INTO usuarios (id, username, password_hash, nome)
+            VALUES (1, 'bench', '-', 'Benchmark')
+        """)
+        conn.executemany("""
+            INSERT INTO produtos (nome, codigo_barras, preco_custo, preco_venda, estoque_atual)
+            VALUES (?, ?, ?, ?, ?)
+        """, [(f'Produto {i}', f'789{i:010d}', 500, 990, 10 ** 9) for i in range(count)])
+        conn.commit()
+
+
+def build_sale(lines):
+    venda = Venda(usuario_id=1, forma_pagamento='Dinheiro')
+    for produto_id in range(1, lines + 1):
+        venda.add_item(produto_id, 1, 9.9)
+    return venda
+
+
+def time_paths(lines):
+    # Both paths run in the same BEGIN IMMEDIATE transaction with the same
+    # sale row around them; only the item and stock statements differ.
+    # Rollups, idempotency and listeners are left out on both sides.
+    db = Database()
+    totals = {legacy_items: 0.0, batched_items: 0.0}
+    for round_number in range(ROUNDS):
+        # Alternate the order so table growth does not favour either path
+        paths = list(totals)
+        if round_number % 2:
+            paths.reverse()
+        for write in paths:
+            venda = build_sale(lines)
+            start = time.perf_counter()
+            db.run_immediate(lambda cur: write(cur, venda))
+            totals[write] += time.perf_counter() - start
+    return totals[legacy_items] / ROUNDS, totals[batched_items] / ROUNDS
+
+
+def run_benchmark():
+    tmp_dir = tempfile.mkdtemp(prefix='supercash-bench-')
+    db = Database()
+    db.db_path = os.path.join(tmp_dir, 'bench.db')
+    try:
+        db.initialize()
+        seed_products(db, max(CART_SIZES))
+
+        print(f'{"linhas":>8} {"legado (ms)":>12} {"lote (ms)":>10} {"ganho":>7}')
+        for lines in CART_SIZES:
+            legacy, batched = time_paths(lines)
+            print(f'{lines:>8} {legacy * 1000:>12.2f} {batched * 1000:>10.2f} '
+                  f'{legacy / batched:>6.1f}x')
+        return True
+    finally:
+        db.close_all()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    success = run_benchmark()
+    sys.exit(0 if success else 1)
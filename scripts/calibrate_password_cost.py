@@ -0,0 +1,43 @@
+import os
+import sys
+import argparse
+
+# Add project root directory to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from config.database import Database
+from models.usuario import PasswordPolicy
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Tune the PBKDF2 round count to a target login latency on this machine.'
+    )
+    parser.add_argument('--target-ms', type=float, default=250,
+                        help='verification time to aim for (default: 250)')
+    parser.add_argument('--samples', type=int, default=5,
+                        help='timing samples per measurement (default: 5)')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='only report, do not store the new policy')
+    args = parser.parse_args()
+
+    Database().initialize()
+
+    current = PasswordPolicy.rounds()
+    print(f'Current policy: {current} rounds, '
+          f'{PasswordPolicy.measure(current, args.samples):.1f} ms per verification')
+
+    rounds = PasswordPolicy.calibrate(args.target_ms, args.samples)
+    print(f'Calibrated:     {rounds} rounds, '
+          f'{PasswordPolicy.measure(rounds, args.samples):.1f} ms per verification '
+          f'(target {args.target_ms:.0f} ms)')
+
+    if args.dry_run or rounds == current:
+        return
+    PasswordPolicy.set_rounds(rounds)
+    print('Policy saved; existing passwords are re-hashed as their users log in.')
+
+
+if __name__ == '__main__':
+    main()
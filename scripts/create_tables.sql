@@ -1,3 +1,6 @@
+-- Baseline schema. Later changes (indexes, new columns) live in
+-- scripts/migrations and are applied by Database.initialize().
+
 -- Create usuarios table
 CREATE TABLE IF NOT EXISTS usuarios (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -0,0 +1,19 @@
+-- Items of a sale (Venda.get_by_id); covers the columns it reads
+CREATE INDEX IF NOT EXISTS idx_itens_venda_venda
+    ON itens_venda (venda_id, produto_id, quantidade, preco_unitario, subtotal);
+
+-- Sales of a product (best sellers, stock history) and FK checks on produtos
+CREATE INDEX IF NOT EXISTS idx_itens_venda_produto
+    ON itens_venda (produto_id, venda_id, quantidade, subtotal);
+
+-- Customer purchase history, newest first
+CREATE INDEX IF NOT EXISTS idx_vendas_cliente_data
+    ON vendas (cliente_id, data_venda);
+
+-- Sales by period
+CREATE INDEX IF NOT EXISTS idx_vendas_data
+    ON vendas (data_venda);
+
+-- Name-ordered listings (get_all)
+CREATE INDEX IF NOT EXISTS idx_produtos_nome ON produtos (nome);
+CREATE INDEX IF NOT EXISTS idx_clientes_nome ON clientes (nome)
@@ -0,0 +1,23 @@
+-- Venda.__init__ used to store datetime objects through the sqlite3 default
+-- adapter ('YYYY-MM-DD HH:MM:SS.ffffff'), while CURRENT_TIMESTAMP and
+-- callers passing strings produced other layouts. Rewrite everything as
+-- 'YYYY-MM-DD HH:MM:SS' so range comparisons on data_venda sort correctly
+-- and can use idx_vendas_data.
+UPDATE vendas
+SET data_venda = strftime('%Y-%m-%d %H:%M:%S', data_venda, 'unixepoch')
+WHERE typeof(data_venda) IN ('integer', 'real');
+
+UPDATE vendas
+SET data_venda = strftime('%Y-%m-%d %H:%M:%S', data_venda)
+WHERE typeof(data_venda) = 'text'
+  AND strftime('%Y-%m-%d %H:%M:%S', data_venda) IS NOT NULL
+  AND data_venda <> strftime('%Y-%m-%d %H:%M:%S', data_venda);
+
+-- Brazilian 'DD/MM/YYYY[ HH:MM[:SS]]' strings typed by hand
+UPDATE vendas
+SET data_venda = strftime('%Y-%m-%d %H:%M:%S',
+        substr(data_venda, 7, 4) || '-' || substr(data_venda, 4, 2) || '-' ||
+        substr(data_venda, 1, 2) ||
+        CASE WHEN length(data_venda) > 10 THEN substr(data_venda, 11) ELSE '' END)
+WHERE typeof(data_venda) = 'text'
+  AND data_venda GLOB '[0-9][0-9]/[0-9][0-9]/[0-9][0-9][0-9][0-9]*'
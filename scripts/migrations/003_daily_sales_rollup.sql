@@ -0,0 +1,35 @@
+-- Cost snapshot per sold item, so profit does not move when preco_custo
+-- changes later. Existing rows get the current cost as best estimate.
+ALTER TABLE itens_venda ADD COLUMN custo_unitario DECIMAL(10,2);
+
+UPDATE itens_venda
+SET custo_unitario = (SELECT preco_custo FROM produtos WHERE produtos.id = itens_venda.produto_id);
+
+-- Pre-aggregated sales per day x product x payment method, maintained by
+-- Venda.save/Venda.delete (see models/resumo_diario.py)
+CREATE TABLE IF NOT EXISTS vendas_diarias (
+    dia DATE NOT NULL,
+    produto_id INTEGER NOT NULL,
+    forma_pagamento VARCHAR(50) NOT NULL DEFAULT '',
+    quantidade INTEGER NOT NULL DEFAULT 0,
+    valor_total DECIMAL(12,2) NOT NULL DEFAULT 0,
+    custo_total DECIMAL(12,2) NOT NULL DEFAULT 0,
+    num_vendas INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (dia, produto_id, forma_pagamento)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_vendas_diarias_produto
+    ON vendas_diarias (produto_id, dia);
+
+INSERT INTO vendas_diarias (
+    dia, produto_id, forma_pagamento,
+    quantidade, valor_total, custo_total, num_vendas
+)
+SELECT substr(v.data_venda, 1, 10), iv.produto_id, COALESCE(v.forma_pagamento, ''),
+       SUM(iv.quantidade), SUM(iv.subtotal),
+       SUM(iv.quantidade * COALESCE(iv.custo_unitario, 0)),
+       COUNT(DISTINCT v.id)
+FROM vendas v
+JOIN itens_venda iv ON iv.venda_id = v.id
+WHERE iv.produto_id IS NOT NULL
+GROUP BY 1, 2, 3
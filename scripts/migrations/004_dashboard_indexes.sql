@@ -0,0 +1,9 @@
+-- Covering index for date-range aggregates (dashboard totals, active
+-- customers); replaces the narrower idx_vendas_data from 001.
+CREATE INDEX IF NOT EXISTS idx_vendas_data_cobertura
+    ON vendas (data_venda, cliente_id, valor_total, desconto);
+
+DROP INDEX IF EXISTS idx_vendas_data;
+
+-- Lets "products in stock" be counted from the index alone
+CREATE INDEX IF NOT EXISTS idx_produtos_estoque ON produtos (estoque_atual)
@@ -0,0 +1,59 @@
+-- Full-text search indexes for the product and customer screens.
+-- External-content FTS5 tables (no copy of the data), kept in sync by
+-- triggers. remove_diacritics makes "racao" match "Ração"; the prefix
+-- indexes keep search-as-you-type queries ("ra*") cheap.
+
+CREATE VIRTUAL TABLE IF NOT EXISTS produtos_fts USING fts5(
+    nome, codigo_barras, fornecedor,
+    content='produtos', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS produtos_fts_ai AFTER INSERT ON produtos BEGIN
+    INSERT INTO produtos_fts (rowid, nome, codigo_barras, fornecedor)
+    VALUES (new.id, new.nome, new.codigo_barras, new.fornecedor);
+END;
+
+CREATE TRIGGER IF NOT EXISTS produtos_fts_ad AFTER DELETE ON produtos BEGIN
+    INSERT INTO produtos_fts (produtos_fts, rowid, nome, codigo_barras, fornecedor)
+    VALUES ('delete', old.id, old.nome, old.codigo_barras, old.fornecedor);
+END;
+
+-- Only the indexed columns: stock updates at the register skip the index
+CREATE TRIGGER IF NOT EXISTS produtos_fts_au
+AFTER UPDATE OF nome, codigo_barras, fornecedor ON produtos BEGIN
+    INSERT INTO produtos_fts (produtos_fts, rowid, nome, codigo_barras, fornecedor)
+    VALUES ('delete', old.id, old.nome, old.codigo_barras, old.fornecedor);
+    INSERT INTO produtos_fts (rowid, nome, codigo_barras, fornecedor)
+    VALUES (new.id, new.nome, new.codigo_barras, new.fornecedor);
+END;
+
+INSERT INTO produtos_fts (produtos_fts) VALUES ('rebuild');
+
+CREATE VIRTUAL TABLE IF NOT EXISTS clientes_fts USING fts5(
+    nome, cpf_cnpj, email, telefone, pet_nome,
+    content='clientes', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS clientes_fts_ai AFTER INSERT ON clientes BEGIN
+    INSERT INTO clientes_fts (rowid, nome, cpf_cnpj, email, telefone, pet_nome)
+    VALUES (new.id, new.nome, new.cpf_cnpj, new.email, new.telefone, new.pet_nome);
+END;
+
+CREATE TRIGGER IF NOT EXISTS clientes_fts_ad AFTER DELETE ON clientes BEGIN
+    INSERT INTO clientes_fts (clientes_fts, rowid, nome, cpf_cnpj, email, telefone, pet_nome)
+    VALUES ('delete', old.id, old.nome, old.cpf_cnpj, old.email, old.telefone, old.pet_nome);
+END;
+
+CREATE TRIGGER IF NOT EXISTS clientes_fts_au
+AFTER UPDATE OF nome, cpf_cnpj, email, telefone, pet_nome ON clientes BEGIN
+    INSERT INTO clientes_fts (clientes_fts, rowid, nome, cpf_cnpj, email, telefone, pet_nome)
+    VALUES ('delete', old.id, old.nome, old.cpf_cnpj, old.email, old.telefone, old.pet_nome);
+    INSERT INTO clientes_fts (rowid, nome, cpf_cnpj, email, telefone, pet_nome)
+    VALUES (new.id, new.nome, new.cpf_cnpj, new.email, new.telefone, new.pet_nome);
+END;
+
+INSERT INTO clientes_fts (clientes_fts) VALUES ('rebuild')
@@ -0,0 +1,6 @@
+-- Key/value store for per-installation settings (e.g. the password
+-- hashing cost calibrated for this machine).
+CREATE TABLE IF NOT EXISTS configuracoes (
+    chave TEXT PRIMARY KEY,
+    valor TEXT NOT NULL
+)
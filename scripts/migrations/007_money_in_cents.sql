@@ -0,0 +1,32 @@
+-- Store every money column as integer centavos instead of REAL reais, so
+-- sums are exact integer arithmetic. Column names and declared types stay
+-- the same; models/dinheiro.py converts to and from Decimal in Python.
+UPDATE produtos
+SET preco_custo = CAST(ROUND(preco_custo * 100) AS INTEGER),
+    preco_venda = CAST(ROUND(preco_venda * 100) AS INTEGER);
+
+UPDATE vendas
+SET valor_total = CAST(ROUND(valor_total * 100) AS INTEGER),
+    desconto = CAST(ROUND(COALESCE(desconto, 0) * 100) AS INTEGER);
+
+UPDATE itens_venda
+SET preco_unitario = CAST(ROUND(preco_unitario * 100) AS INTEGER),
+    subtotal = CAST(ROUND(subtotal * 100) AS INTEGER),
+    custo_unitario = CAST(ROUND(custo_unitario * 100) AS INTEGER);
+
+-- Re-derive the rollup from the converted items rather than scaling its
+-- float sums, which may already carry drift
+DELETE FROM vendas_diarias;
+
+INSERT INTO vendas_diarias (
+    dia, produto_id, forma_pagamento,
+    quantidade, valor_total, custo_total, num_vendas
+)
+SELECT substr(v.data_venda, 1, 10), iv.produto_id, COALESCE(v.forma_pagamento, ''),
+       SUM(iv.quantidade), SUM(iv.subtotal),
+       SUM(iv.quantidade * COALESCE(iv.custo_unitario, 0)),
+       COUNT(DISTINCT v.id)
+FROM vendas v
+JOIN itens_venda iv ON iv.venda_id = v.id
+WHERE iv.produto_id IS NOT NULL
+GROUP BY 1, 2, 3
@@ -0,0 +1,8 @@
+-- Idempotency key for sales replayed from the local sale journal
+-- (models/diario_vendas.py): a sale whose commit outlived a crash is
+-- recognised on replay instead of being inserted twice.
+ALTER TABLE vendas ADD COLUMN chave_idempotencia TEXT;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_vendas_chave_idempotencia
+    ON vendas (chave_idempotencia)
+    WHERE chave_idempotencia IS NOT NULL
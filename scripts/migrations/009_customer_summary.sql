@@ -0,0 +1,20 @@
+-- Lifetime totals per customer, maintained by Venda.commit/Venda.delete
+-- (see models/resumo_cliente.py) so the customer screen reads one row
+-- instead of aggregating the whole purchase history. Money in centavos,
+-- net of the sale discount.
+CREATE TABLE IF NOT EXISTS resumo_clientes (
+    cliente_id INTEGER PRIMARY KEY REFERENCES clientes(id) ON DELETE CASCADE,
+    num_compras INTEGER NOT NULL DEFAULT 0,
+    valor_total INTEGER NOT NULL DEFAULT 0,
+    primeira_compra TIMESTAMP,
+    ultima_compra TIMESTAMP
+);
+
+INSERT INTO resumo_clientes (
+    cliente_id, num_compras, valor_total, primeira_compra, ultima_compra
+)
+SELECT cliente_id, COUNT(*), SUM(valor_total - COALESCE(desconto, 0)),
+       MIN(data_venda), MAX(data_venda)
+FROM vendas
+WHERE cliente_id IS NOT NULL
+GROUP BY cliente_id
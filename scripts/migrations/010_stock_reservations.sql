@@ -0,0 +1,12 @@
+-- Stock taken at checkout (Venda.reserve_stock) for a sale that is still
+-- on its way through the sale journal. Committing the sale deletes its
+-- rows instead of decrementing stock again; rows whose sale never made it
+-- into the journal (crash between the two) are given back on start-up by
+-- Venda.release_stale_reservations. chave is the sale's idempotency key.
+CREATE TABLE IF NOT EXISTS reservas_estoque (
+    chave TEXT NOT NULL,
+    produto_id INTEGER NOT NULL REFERENCES produtos(id),
+    quantidade INTEGER NOT NULL,
+    criada_em TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (chave, produto_id)
+);
@@ -0,0 +1,46 @@
+import os
+import sys
+import json
+import argparse
+
+# Add project root directory to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from config.database import Database
+from config.instrumentation import format_report, stats_path
+
+SORT_KEYS = ('total_ms', 'calls', 'avg_ms', 'p95_ms', 'max_ms', 'rows', 'errors')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Mostra os contadores de consultas gravados pelo Supercash ao sair.')
+    parser.add_argument('path', nargs='?', default=stats_path(Database().db_path),
+                        help='arquivo de estatísticas (padrão: ao lado do banco)')
+    parser.add_argument('--sort', choices=SORT_KEYS, default='total_ms')
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--slow', action='store_true',
+                        help='lista apenas o log de consultas lentas')
+    parser.add_argument('--json', action='store_true', help='imprime o arquivo bruto')
+    args = parser.parse_args()
+
+    try:
+        with open(args.path, encoding='utf-8') as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        print(f'Nenhuma estatística em {args.path}; abra e feche o Supercash primeiro.')
+        return 1
+
+    if args.json:
+        print(json.dumps(snapshot, ensure_ascii=False, indent=1))
+    elif args.slow:
+        for entry in snapshot['slow_queries']:
+            print(f'{entry["ms"]:>9.1f} ms  {entry["site"]}\n           {entry["sql"]}')
+    else:
+        print(format_report(snapshot, limit=args.limit, sort=args.sort))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,11 +5,13 @@ from PySide6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QFont
 from models.usuario import Usuario
+from controllers.worker import Worker
 
 class UserDialog(QDialog):
     def __init__(self, parent=None, user=None):
         super().__init__(parent)
         self.user = user
+        self._worker = None
         self.setWindowTitle("Adicionar Usuário" if not user else "Editar Usuário")
         self.setFixedSize(400, 300)
         self.setup_ui()
@@ -60,6 +62,9 @@ class UserDialog(QDialog):
         layout.addLayout(button_layout)
     
     def save_user(self):
+        if self._worker is not None:
+            return
+
         username = self.username_input.text()
         password = self.password_input.text()
         name = self.name_input.text()
@@ -76,16 +81,45 @@ class UserDialog(QDialog):
             self.user = Usuario()
         
         self.user.username = username
-        if password:
-            self.user.password_hash = self.user.hash_password(password)
         self.user.nome = name
         self.user.nivel_acesso = access_level
         
-        if self.user.save():
+        # Hashing takes a noticeable fraction of a second; do it off the UI thread
+        self.set_busy(True)
+        self._worker = Worker(self._hash_and_save, self.user, password)
+        self._worker.signals.finished.connect(self.on_saved)
+        self._worker.signals.failed.connect(self.on_save_failed)
+        self._worker.start()
+
+    @staticmethod
+    def _hash_and_save(user, password):
+        if password:
+            user.password_hash = user.hash_password(password)
+        return user.save()
+
+    def set_busy(self, busy):
+        self.save_button.setEnabled(not busy)
+        self.cancel_button.setEnabled(not busy)
+        self.save_button.setText("Salvando..." if busy else "Salvar")
+
+    def on_saved(self, saved):
+        self._worker = None
+        self.set_busy(False)
+        if saved:
             self.accept()
         else:
             QMessageBox.warning(self, "Erro", "Erro ao salvar usuário.")
 
+    def reject(self):
+        # Don't close under a save that is still running
+        if self._worker is None:
+            super().reject()
+
+    def on_save_failed(self, message):
+        self._worker = None
+        self.set_busy(False)
+        QMessageBox.warning(self, "Erro", f"Erro ao salvar usuário: {message}")
+
 class AdminDashboardWindow(QMainWindow):
     def __init__(self, user=None):
         super().__init__()
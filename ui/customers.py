@@ -3,10 +3,16 @@ from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                              QMessageBox, QFormLayout, QDateEdit)
 from PySide6.QtCore import Qt, QDate
 from models.cliente import Cliente
+from models.dinheiro import format_brl
+from controllers.search_controller import SearchController
 
 class CustomersWindow(QWidget):
+    HISTORY_PAGE = 20
+
     def __init__(self):
         super().__init__()
+        self.history_customer = None
+        self.history_last_id = None
         self.setup_ui()
         self.load_customers()
         
@@ -60,7 +66,6 @@ class CustomersWindow(QWidget):
         search_layout.addWidget(self.search_input)
         
         self.search_btn = QPushButton('Buscar')
-        self.search_btn.clicked.connect(self.search_customers)
         search_layout.addWidget(self.search_btn)
         
         layout.addLayout(search_layout)
@@ -76,6 +81,30 @@ class CustomersWindow(QWidget):
         self.customers_table.itemClicked.connect(self.load_customer_to_form)
         layout.addWidget(self.customers_table)
         
+        # Selected customer's summary and purchase history, one sale per row
+        self.summary_label = QLabel('')
+        layout.addWidget(self.summary_label)
+        
+        self.history_table = QTableWidget()
+        self.history_table.setColumnCount(4)
+        self.history_table.setHorizontalHeaderLabels([
+            'Data', 'Produtos', 'Total', 'Pagamento'
+        ])
+        self.history_table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.history_table)
+        
+        self.more_history_btn = QPushButton('Carregar mais compras')
+        self.more_history_btn.clicked.connect(self.load_more_history)
+        self.more_history_btn.setVisible(False)
+        layout.addWidget(self.more_history_btn)
+        
+        # Search as you type, off the UI thread
+        self.search_controller = SearchController(self.search_input, self.query_customers)
+        self.search_controller.results_ready.connect(self.show_search_results)
+        self.search_controller.search_failed.connect(self.show_search_error)
+        self.search_input.returnPressed.connect(self.search_customers)
+        self.search_btn.clicked.connect(self.search_customers)
+        
     def clear_form(self):
         self.name_input.clear()
         self.cpf_cnpj_input.clear()
@@ -110,26 +139,27 @@ class CustomersWindow(QWidget):
     
     def load_customers(self):
         try:
-            customers = Cliente.get_all()
-            self.customers_table.setRowCount(len(customers))
-            
-            for row, customer in enumerate(customers):
-                self.customers_table.setItem(row, 0, QTableWidgetItem(customer.nome))
-                self.customers_table.setItem(row, 1, QTableWidgetItem(customer.cpf_cnpj))
-                self.customers_table.setItem(row, 2, QTableWidgetItem(customer.telefone))
-                self.customers_table.setItem(row, 3, QTableWidgetItem(customer.endereco))
-                self.customers_table.setItem(row, 4, QTableWidgetItem(customer.pet_nome))
-                
-                if customer.pet_nascimento:
-                    birth_date = customer.pet_nascimento.strftime('%d/%m/%Y')
-                    self.customers_table.setItem(row, 5, QTableWidgetItem(birth_date))
-                else:
-                    self.customers_table.setItem(row, 5, QTableWidgetItem(''))
-        
+            self.show_customers(Cliente.get_all())
         except Exception as e:
             QMessageBox.critical(self, 'Erro',
                                 f'Erro ao carregar clientes: {str(e)}')
     
+    def show_customers(self, customers):
+        self.customers_table.setRowCount(len(customers))
+        
+        for row, customer in enumerate(customers):
+            self.customers_table.setItem(row, 0, QTableWidgetItem(customer.nome))
+            self.customers_table.setItem(row, 1, QTableWidgetItem(customer.cpf_cnpj))
+            self.customers_table.setItem(row, 2, QTableWidgetItem(customer.telefone))
+            self.customers_table.setItem(row, 3, QTableWidgetItem(customer.endereco))
+            self.customers_table.setItem(row, 4, QTableWidgetItem(customer.pet_nome))
+            
+            if customer.pet_nascimento:
+                birth_date = customer.pet_nascimento.strftime('%d/%m/%Y')
+                self.customers_table.setItem(row, 5, QTableWidgetItem(birth_date))
+            else:
+                self.customers_table.setItem(row, 5, QTableWidgetItem(''))
+    
     def load_customer_to_form(self, item):
         row = item.row()
         
@@ -153,18 +183,63 @@ class CustomersWindow(QWidget):
                     )
                 
                 self.save_btn.setText('Atualizar')
+                self.show_customer_history(customer)
         except Exception as e:
             QMessageBox.critical(self, 'Erro',
                                 f'Erro ao carregar cliente: {str(e)}')
     
-    def search_customers(self):
-        search_text = self.search_input.text().strip().lower()
+    def show_customer_history(self, customer):
+        summary = customer.get_summary()
+        if summary['num_compras']:
+            self.summary_label.setText(
+                f"{summary['num_compras']} compra(s) - "
+                f"Total: {format_brl(summary['valor_total'])} - "
+                f"Ticket médio: {format_brl(summary['ticket_medio'])} - "
+                f"Última compra: {summary['ultima_compra'].strftime('%d/%m/%Y')}"
+            )
+        else:
+            self.summary_label.setText('Nenhuma compra registrada.')
         
-        for row in range(self.customers_table.rowCount()):
-            name = self.customers_table.item(row, 0).text().lower()
-            cpf_cnpj = self.customers_table.item(row, 1).text().lower()
-            
-            if search_text in name or search_text in cpf_cnpj:
-                self.customers_table.setRowHidden(row, False)
-            else:
-                self.customers_table.setRowHidden(row, True)
\ No newline at end of file
+        self.history_customer = customer
+        self.history_last_id = None
+        self.history_table.setRowCount(0)
+        self.load_more_history()
+    
+    def load_more_history(self):
+        if self.history_customer is None:
+            return
+        purchases = self.history_customer.get_purchase_history(
+            self.HISTORY_PAGE, after_id=self.history_last_id
+        )
+        start = self.history_table.rowCount()
+        self.history_table.setRowCount(start + len(purchases))
+        for row, purchase in enumerate(purchases, start):
+            produtos = ', '.join(f"{item['quantidade']}x {item['produto']}"
+                                 for item in purchase['itens'])
+            total = purchase['valor_total'] - purchase['desconto']
+            self.history_table.setItem(row, 0, QTableWidgetItem(
+                purchase['data'].strftime('%d/%m/%Y %H:%M')))
+            self.history_table.setItem(row, 1, QTableWidgetItem(produtos))
+            self.history_table.setItem(row, 2, QTableWidgetItem(format_brl(total)))
+            self.history_table.setItem(row, 3, QTableWidgetItem(purchase['forma_pagamento'] or ''))
+        
+        if purchases:
+            self.history_last_id = purchases[-1]['venda_id']
+        self.more_history_btn.setVisible(len(purchases) == self.HISTORY_PAGE)
+    
+    def search_customers(self):
+        self.search_controller.trigger()
+    
+    @staticmethod
+    def query_customers(text):
+        # Runs on a worker thread
+        if not text:
+            return Cliente.get_all()
+        return Cliente.search(text, limit=500)
+    
+    def show_search_results(self, text, customers):
+        self.show_customers(customers)
+    
+    def show_search_error(self, text, message):
+        QMessageBox.critical(self, 'Erro',
+                            f'Erro ao buscar clientes: {message}')
@@ -1,8 +1,10 @@
 from PySide6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                                QFrame, QPushButton, QStackedWidget, QTableWidget, QTableWidgetItem,
                                QHeaderView)
-from PySide6.QtCore import Qt
-from PySide6.QtGui import QFont
+from PySide6.QtCore import Qt, QTimer
+from PySide6.QtGui import QFont, QKeySequence, QShortcut
+from models.estatisticas import Estatisticas
+from models.dinheiro import format_brl
 
 class DashboardWindow(QMainWindow):
     def __init__(self, user=None):
@@ -22,9 +24,28 @@ class DashboardWindow(QMainWindow):
         # Create and setup the content area
         self.setup_content_area()
         
+        # Overview figures come from the cached stats service; re-reading
+        # them is cheap, the service decides when to hit the database
+        self.stats = Estatisticas()
+        self.stats_timer = QTimer(self)
+        self.stats_timer.timeout.connect(self.update_stats)
+        self.stats_timer.start(5000)
+        
+        # Developer overlay with the live query counters
+        self.query_stats_dialog = None
+        QShortcut(QKeySequence('Ctrl+Shift+Q'), self, self.show_query_stats)
+        
         # Set the initial page
         self.show_overview()
     
+    def show_query_stats(self):
+        # Imported here so the overlay costs nothing until first opened
+        from ui.query_stats import QueryStatsDialog
+        if self.query_stats_dialog is None:
+            self.query_stats_dialog = QueryStatsDialog(self)
+        self.query_stats_dialog.show()
+        self.query_stats_dialog.raise_()
+    
     def setup_menu(self):
         # Create menu frame
         menu_frame = QFrame()
@@ -143,10 +164,9 @@ class DashboardWindow(QMainWindow):
             title.setStyleSheet('color: #888888; font-size: 14px;')
             card_layout.addWidget(title)
             
-            # Add stat value as a clickable label
+            # Add stat value
             value = QLabel(stat['value'])
-            value.setStyleSheet('color: #ffffff; font-size: 24px; font-weight: bold; cursor: pointer;')
-            value.mousePressEvent = lambda _, t=stat['title'], v=value: self.edit_stat_value(t, v)
+            value.setStyleSheet('color: #ffffff; font-size: 24px; font-weight: bold;')
             card_layout.addWidget(value)
             
             self.stat_values[stat['title']] = value
@@ -202,18 +222,17 @@ class DashboardWindow(QMainWindow):
         
         return page
     
-    def edit_stat_value(self, title, label):
-        from PySide6.QtWidgets import QInputDialog
-        new_value, ok = QInputDialog.getText(
-            self, f'Editar {title}',
-            'Digite o novo valor:',
-            text=label.text()
-        )
-        if ok and new_value:
-            if title in ['Vendas Hoje', 'Vendas no Mês']:
-                if not new_value.startswith('R$ '):
-                    new_value = 'R$ ' + new_value
-            label.setText(new_value)
+    def update_stats(self):
+        try:
+            stats = self.stats.get()
+        except Exception as e:
+            print(f"Error loading statistics: {e}")
+            return
+        
+        self.stat_values['Vendas Hoje'].setText(format_brl(stats['vendas_hoje']))
+        self.stat_values['Produtos em Estoque'].setText(str(stats['produtos_estoque']))
+        self.stat_values['Clientes Ativos'].setText(str(stats['clientes_ativos']))
+        self.stat_values['Vendas no Mês'].setText(format_brl(stats['vendas_mes']))
     
     def add_new_sale(self):
         from PySide6.QtWidgets import QInputDialog
@@ -248,7 +267,7 @@ class DashboardWindow(QMainWindow):
     def create_page(self, title):
         if title == 'Vendas':
             from ui.sales import SalesWindow
-            return SalesWindow()
+            return SalesWindow(self.user)
         elif title == 'Produtos':
             from ui.products import ProductsWindow
             return ProductsWindow()
@@ -269,6 +288,7 @@ class DashboardWindow(QMainWindow):
             return page
     
     def show_overview(self):
+        self.update_stats()
         self.content_stack.setCurrentWidget(self.overview_page)
     
     def show_sales(self):
@@ -1,8 +1,7 @@
 import sys
-from PySide6.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLineEdit, QPushButton, QLabel, QMessageBox
+from PySide6.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLineEdit, QPushButton, QLabel
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QPalette, QColor, QFont
-from models.usuario import Usuario
 
 class LoginWindow(QMainWindow):
     def __init__(self):
@@ -86,42 +85,23 @@ class LoginWindow(QMainWindow):
         
         # Login button
         self.login_button = QPushButton("Entrar")
-        self.login_button.clicked.connect(self.handle_login)
         layout.addWidget(self.login_button)
         
         # Add stretching space at the bottom
         layout.addStretch()
     
-    def handle_login(self):
-        username = self.username_input.text()
-        password = self.password_input.text()
-        
-        if not username or not password:
-            QMessageBox.warning(self, "Erro", "Por favor, preencha todos os campos.")
-            return
-        
-        # Authenticate user
-        user = Usuario.authenticate(username, password)
-        if user:
-            if user.nivel_acesso == 'admin':
-                # Open admin dashboard
-                from ui.admin_dashboard import AdminDashboard
-                self.admin_dashboard = AdminDashboard(user)
-                self.admin_dashboard.show()
-            else:
-                # Open regular dashboard
-                from ui.dashboard import Dashboard
-                self.dashboard = Dashboard(user)
-                self.dashboard.show()
-            self.close()
-        else:
-            QMessageBox.warning(self, "Erro", "Usuário ou senha inválidos.")
-            self.password_input.clear()
+    def set_busy(self, busy):
+        """Lock the form while the credentials are being checked."""
+        self.username_input.setEnabled(not busy)
+        self.password_input.setEnabled(not busy)
+        self.login_button.setEnabled(not busy)
+        self.login_button.setText("Verificando..." if busy else "Entrar")
 
 def main():
+    from controllers.login_controller import LoginController
     app = QApplication(sys.argv)
-    window = LoginWindow()
-    window.show()
+    controller = LoginController()
+    controller.show_login()
     sys.exit(app.exec_())
 
 if __name__ == '__main__':
@@ -1,8 +1,96 @@
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-                             QLineEdit, QPushButton, QTableWidget, QTableWidgetItem,
+                             QLineEdit, QPushButton, QTableView,
                              QSpinBox, QDoubleSpinBox, QMessageBox, QFormLayout)
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PySide6.QtGui import QColor
 from models.produto import Produto
+from models.dinheiro import from_cents
+from controllers.search_controller import SearchController
+
+
+class ProductTableModel(QAbstractTableModel):
+    """Product list that pages rows in from SQLite as the view scrolls.
+
+    Only raw row tuples are kept; cell text and colours are produced in
+    data() when the view asks for a visible cell.
+    """
+    HEADERS = ['ID', 'Nome', 'Código', 'Custo', 'Preço',
+               'Estoque', 'Est. Mín', 'Fornecedor']
+    # Position of each column in Produto.get_rows_page() rows
+    FIELDS = [0, 1, 2, 4, 5, 6, 7, 8]
+    PAGE_SIZE = 200
+    SEARCH_LIMIT = 500
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+        self._exhausted = False
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+
+        if role == Qt.DisplayRole:
+            value = row[self.FIELDS[index.column()]]
+            if value is None:
+                return ''
+            if index.column() in (3, 4):
+                return f'R$ {from_cents(value):.2f}'
+            return str(value)
+
+        # Highlight low stock
+        low_stock = row[6] <= row[7]
+        if role == Qt.BackgroundRole and low_stock:
+            return QColor(Qt.red)
+        if role == Qt.ForegroundRole and low_stock:
+            return QColor(Qt.white)
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        last = self._rows[-1] if self._rows else (None, None)
+        rows = Produto.get_rows_page(self.PAGE_SIZE, after_id=last[0], after_name=last[1])
+        if len(rows) < self.PAGE_SIZE:
+            self._exhausted = True
+        if rows:
+            start = len(self._rows)
+            self.beginInsertRows(QModelIndex(), start, start + len(rows) - 1)
+            self._rows.extend(rows)
+            self.endInsertRows()
+
+    def reload(self):
+        self.beginResetModel()
+        self._rows = []
+        self._exhausted = False
+        self.endResetModel()
+        self.fetchMore()
+
+    def set_rows(self, rows):
+        """Show a fixed result set (e.g. ranked search hits) with no paging."""
+        self.beginResetModel()
+        self._rows = list(rows)
+        self._exhausted = True
+        self.endResetModel()
+
+    def product_id(self, row):
+        return self._rows[row][0]
+
 
 class ProductsWindow(QWidget):
     def __init__(self):
@@ -65,7 +153,6 @@ class ProductsWindow(QWidget):
         search_layout.addWidget(self.search_input)
         
         self.search_btn = QPushButton('Buscar')
-        self.search_btn.clicked.connect(self.search_products)
         search_layout.addWidget(self.search_btn)
         
         layout.addLayout(search_layout)
@@ -73,16 +160,22 @@ class ProductsWindow(QWidget):
         layout.addWidget(form_group)
         
         # Products Table
-        self.products_table = QTableWidget()
-        self.products_table.setColumnCount(8)
-        self.products_table.setHorizontalHeaderLabels([
-            'ID', 'Nome', 'Código', 'Custo', 'Preço',
-            'Estoque', 'Est. Mín', 'Fornecedor'
-        ])
+        self.products_model = ProductTableModel(self)
+        self.products_table = QTableView()
+        self.products_table.setModel(self.products_model)
+        self.products_table.setSelectionBehavior(QTableView.SelectRows)
+        self.products_table.verticalHeader().setVisible(False)
         self.products_table.horizontalHeader().setStretchLastSection(True)
-        self.products_table.itemClicked.connect(self.load_product_to_form)
+        self.products_table.clicked.connect(self.load_product_to_form)
         layout.addWidget(self.products_table)
         
+        # Search as you type, off the UI thread
+        self.search_controller = SearchController(self.search_input, self.query_products)
+        self.search_controller.results_ready.connect(self.show_search_results)
+        self.search_controller.search_failed.connect(self.show_search_error)
+        self.search_input.returnPressed.connect(self.search_products)
+        self.search_btn.clicked.connect(self.search_products)
+        
         # Apply dark theme styling
         self.setStyleSheet("""
             QWidget {
@@ -96,7 +189,7 @@ class ProductsWindow(QWidget):
                 background-color: #2d2d2d;
                 color: #ffffff;
             }
-            QTableWidget {
+            QTableView {
                 background-color: #252526;
                 border: none;
                 border-radius: 8px;
@@ -108,7 +201,7 @@ class ProductsWindow(QWidget):
                 border: none;
                 padding: 8px;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 8px;
                 border-bottom: 1px solid #3d3d3d;
             }
@@ -163,41 +256,26 @@ class ProductsWindow(QWidget):
                                 f'Erro ao salvar produto: {str(e)}')
     
     def load_products(self):
-        try:
-            products = Produto.get_all()
-            self.products_table.setRowCount(len(products))
-            
-            for row, product in enumerate(products):
-                self.products_table.setItem(row, 0, QTableWidgetItem(str(product.id)))
-                self.products_table.setItem(row, 1, QTableWidgetItem(product.nome))
-                self.products_table.setItem(row, 2, QTableWidgetItem(product.codigo_barras))
-                self.products_table.setItem(row, 3, QTableWidgetItem(f'R$ {product.preco_custo:.2f}'))
-                self.products_table.setItem(row, 4, QTableWidgetItem(f'R$ {product.preco_venda:.2f}'))
-                self.products_table.setItem(row, 5, QTableWidgetItem(str(product.estoque_atual)))
-                self.products_table.setItem(row, 6, QTableWidgetItem(str(product.estoque_minimo)))
-                self.products_table.setItem(row, 7, QTableWidgetItem(product.fornecedor))
-                
-                # Highlight low stock
-                if product.estoque_atual <= product.estoque_minimo:
-                    for col in range(self.products_table.columnCount()):
-                        self.products_table.item(row, col).setBackground(Qt.red)
-                        self.products_table.item(row, col).setForeground(Qt.white)
+        if self.search_input.text().strip():
+            self.search_products()
+            return
         
+        try:
+            self.products_model.reload()
         except Exception as e:
             QMessageBox.critical(self, 'Erro',
                                 f'Erro ao carregar produtos: {str(e)}')
     
-    def load_product_to_form(self, item):
-        row = item.row()
-        product_id = int(self.products_table.item(row, 0).text())
+    def load_product_to_form(self, index):
+        product_id = self.products_model.product_id(index.row())
         
         try:
             product = Produto.get_by_id(product_id)
             if product:
                 self.name_input.setText(product.nome)
                 self.barcode_input.setText(product.codigo_barras)
-                self.cost_input.setValue(product.preco_custo)
-                self.price_input.setValue(product.preco_venda)
+                self.cost_input.setValue(float(product.preco_custo))
+                self.price_input.setValue(float(product.preco_venda))
                 self.stock_input.setValue(product.estoque_atual)
                 self.min_stock_input.setValue(product.estoque_minimo)
                 self.supplier_input.setText(product.fornecedor)
@@ -207,14 +285,21 @@ class ProductsWindow(QWidget):
                                 f'Erro ao carregar produto: {str(e)}')
     
     def search_products(self):
-        search_text = self.search_input.text().strip().lower()
-        
-        for row in range(self.products_table.rowCount()):
-            name = self.products_table.item(row, 1).text().lower()
-            code = self.products_table.item(row, 2).text().lower()
-            supplier = self.products_table.item(row, 7).text().lower()
-            
-            if search_text in name or search_text in code or search_text in supplier:
-                self.products_table.setRowHidden(row, False)
-            else:
-                self.products_table.setRowHidden(row, True)
\ No newline at end of file
+        self.search_controller.trigger()
+    
+    @staticmethod
+    def query_products(text):
+        # Runs on a worker thread; None means "no filter"
+        if not text:
+            return None
+        return Produto.search_rows(text, limit=ProductTableModel.SEARCH_LIMIT)
+    
+    def show_search_results(self, text, rows):
+        if rows is None:
+            self.products_model.reload()
+        else:
+            self.products_model.set_rows(rows)
+    
+    def show_search_error(self, text, message):
+        QMessageBox.critical(self, 'Erro',
+                            f'Erro ao buscar produtos: {message}')
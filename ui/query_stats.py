@@ -0,0 +1,84 @@
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
+                               QPlainTextEdit, QComboBox)
+from PySide6.QtCore import QTimer
+from PySide6.QtGui import QFont
+from config.database import Database
+from config.instrumentation import format_report, stats_path
+
+SORT_OPTIONS = {
+    'Tempo total': 'total_ms',
+    'Chamadas': 'calls',
+    'Tempo médio': 'avg_ms',
+    'p95': 'p95_ms',
+    'Linhas': 'rows',
+}
+
+
+class QueryStatsDialog(QDialog):
+    """Developer overlay with the live query counters (Ctrl+Shift+Q)."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.db = Database()
+        self.setWindowTitle('Estatísticas de Consultas')
+        self.resize(1000, 600)
+        self.setup_ui()
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start(2000)
+        self.refresh()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        controls = QHBoxLayout()
+        self.summary_label = QLabel()
+        controls.addWidget(self.summary_label)
+        controls.addStretch()
+        controls.addWidget(QLabel('Ordenar por:'))
+        self.sort_combo = QComboBox()
+        self.sort_combo.addItems(list(SORT_OPTIONS))
+        self.sort_combo.currentIndexChanged.connect(self.refresh)
+        controls.addWidget(self.sort_combo)
+        layout.addLayout(controls)
+
+        self.report_view = QPlainTextEdit()
+        self.report_view.setReadOnly(True)
+        self.report_view.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.report_view.setFont(QFont('Monospace', 9))
+        layout.addWidget(self.report_view)
+
+        button_layout = QHBoxLayout()
+        self.reset_button = QPushButton('Zerar')
+        self.reset_button.clicked.connect(self.reset)
+        self.dump_button = QPushButton('Salvar JSON')
+        self.dump_button.clicked.connect(self.dump)
+        self.close_button = QPushButton('Fechar')
+        self.close_button.clicked.connect(self.accept)
+        button_layout.addWidget(self.reset_button)
+        button_layout.addWidget(self.dump_button)
+        button_layout.addStretch()
+        button_layout.addWidget(self.close_button)
+        layout.addLayout(button_layout)
+
+    def refresh(self):
+        snapshot = self.db.stats.snapshot()
+        calls = sum(stats['calls'] for stats in snapshot['statements'])
+        total_ms = sum(stats['total_ms'] for stats in snapshot['statements'])
+        self.summary_label.setText(
+            f'{len(snapshot["statements"])} consultas distintas, {calls} execuções, '
+            f'{total_ms:.0f} ms no total, {len(snapshot["slow_queries"])} lentas '
+            f'(>= {snapshot["slow_ms"]:g} ms)')
+        sort = SORT_OPTIONS[self.sort_combo.currentText()]
+        scroll = self.report_view.verticalScrollBar().value()
+        self.report_view.setPlainText(format_report(snapshot, limit=50, sort=sort))
+        self.report_view.verticalScrollBar().setValue(scroll)
+
+    def reset(self):
+        self.db.stats.reset()
+        self.refresh()
+
+    def dump(self):
+        path = self.db.stats.dump(stats_path(self.db.db_path))
+        self.summary_label.setText(f'Estatísticas salvas em {path}')
@@ -1,15 +1,64 @@
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-                             QPushButton, QTableWidget, QTableWidgetItem,
-                             QComboBox, QDateEdit, QMessageBox)
-from PySide6.QtCore import Qt, QDate
-from models.venda import Venda
-from models.produto import Produto
-from models.cliente import Cliente
-from datetime import datetime, timedelta
+                             QPushButton, QTableView, QComboBox, QDateEdit,
+                             QMessageBox, QFileDialog, QProgressDialog)
+from PySide6.QtCore import Qt, QDate, QAbstractTableModel, QModelIndex
+from PySide6.QtGui import QColor
+from itertools import islice
+from models.relatorios import RELATORIOS, format_value
+from controllers.export_controller import ExportTask
+
+
+class ReportTableModel(QAbstractTableModel):
+    """Rows of one report; cell text is formatted only when the view asks for it."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.relatorio = RELATORIOS[0]
+        self._rows = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.relatorio.colunas)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.relatorio.colunas[section].titulo
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        values = self._rows[index.row()]
+
+        if role == Qt.DisplayRole:
+            return format_value(values[index.column()],
+                                self.relatorio.colunas[index.column()].tipo)
+
+        # Highlight critical stock levels
+        if role == Qt.BackgroundRole and self.relatorio.chave == 'estoque_baixo':
+            estoque_atual, estoque_minimo = values[1], values[2]
+            if estoque_atual == 0:
+                return QColor(Qt.red)
+            if estoque_atual <= estoque_minimo:
+                return QColor(Qt.yellow)
+        return None
+
+    def set_report(self, relatorio, rows=()):
+        self.beginResetModel()
+        self.relatorio = relatorio
+        self._rows = list(rows)
+        self.endResetModel()
+
 
 class ReportsWindow(QWidget):
+    # Rows shown on screen; exports always contain the full report
+    DISPLAY_LIMIT = 5000
+
     def __init__(self):
         super().__init__()
+        self.export_task = None
         self.setup_ui()
         
     def setup_ui(self):
@@ -19,14 +68,7 @@ class ReportsWindow(QWidget):
         type_layout = QHBoxLayout()
         
         self.report_type = QComboBox()
-        self.report_type.addItems([
-            'Vendas por Período',
-            'Produtos Mais Vendidos',
-            'Clientes Mais Ativos',
-            'Produtos com Estoque Baixo',
-            'Análise de Lucro',
-            'Tendências de Vendas'
-        ])
+        self.report_type.addItems([relatorio.titulo for relatorio in RELATORIOS])
         self.report_type.setStyleSheet("""
             QComboBox {
                 padding: 8px;
@@ -106,10 +148,24 @@ class ReportsWindow(QWidget):
             }
         """)
         self.generate_btn.clicked.connect(self.generate_report)
-        layout.addWidget(self.generate_btn)
+        
+        self.export_btn = QPushButton('Exportar')
+        self.export_btn.setStyleSheet(self.generate_btn.styleSheet())
+        self.export_btn.clicked.connect(self.export_report)
+        
+        buttons_layout = QHBoxLayout()
+        buttons_layout.addWidget(self.generate_btn)
+        buttons_layout.addWidget(self.export_btn)
+        layout.addLayout(buttons_layout)
+        
+        self.status_label = QLabel('')
+        layout.addWidget(self.status_label)
         
         # Report Table with enhanced styling
-        self.report_table = QTableWidget()
+        self.report_model = ReportTableModel(self)
+        self.report_table = QTableView()
+        self.report_table.setModel(self.report_model)
+        self.report_table.verticalHeader().setVisible(False)
         # Apply dark theme styling
         self.setStyleSheet("""
             QWidget {
@@ -131,7 +187,7 @@ class ReportsWindow(QWidget):
             QComboBox::drop-down, QDateEdit::drop-down {
                 border: none;
             }
-            QTableWidget {
+            QTableView {
                 background-color: #252526;
                 border: none;
                 border-radius: 8px;
@@ -144,11 +200,11 @@ class ReportsWindow(QWidget):
                 padding: 8px;
                 font-weight: bold;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 8px;
                 border-bottom: 1px solid #3d3d3d;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #0078d4;
                 color: #ffffff;
             }
@@ -174,131 +230,89 @@ class ReportsWindow(QWidget):
         self.change_report(0)
     
     def change_report(self, index):
-        self.start_date.setEnabled(index != 3)  # Disable dates for low stock report
-        self.end_date.setEnabled(index != 3)
+        relatorio = RELATORIOS[index]
+        self.start_date.setEnabled(relatorio.usa_periodo)
+        self.end_date.setEnabled(relatorio.usa_periodo)
         
         # Configure table columns based on report type
-        if index == 0:  # Sales by Period
-            self.report_table.setColumnCount(5)
-            self.report_table.setHorizontalHeaderLabels([
-                'Data', 'Cliente', 'Produtos', 'Valor Total', 'Forma Pagamento'
-            ])
-        elif index == 1:  # Best Selling Products
-            self.report_table.setColumnCount(4)
-            self.report_table.setHorizontalHeaderLabels([
-                'Produto', 'Quantidade Vendida', 'Valor Total', 'Lucro'
-            ])
-        elif index == 2:  # Most Active Customers
-            self.report_table.setColumnCount(4)
-            self.report_table.setHorizontalHeaderLabels([
-                'Cliente', 'Total de Compras', 'Valor Total', 'Última Compra'
-            ])
-        else:  # Low Stock Products
-            self.report_table.setColumnCount(4)
-            self.report_table.setHorizontalHeaderLabels([
-                'Produto', 'Estoque Atual', 'Estoque Mínimo', 'Fornecedor'
-            ])
+        self.report_model.set_report(relatorio)
+        self.status_label.setText('')
+    
+    def current_period(self):
+        return self.start_date.date().toPython(), self.end_date.date().toPython()
     
     def generate_report(self):
+        relatorio = RELATORIOS[self.report_type.currentIndex()]
+        linhas = relatorio.linhas(*self.current_period())
+        
         try:
-            report_type = self.report_type.currentIndex()
-            
-            if report_type == 0:
-                self.generate_sales_report()
-            elif report_type == 1:
-                self.generate_best_sellers_report()
-            elif report_type == 2:
-                self.generate_customer_report()
-            else:
-                self.generate_low_stock_report()
-                
+            # One extra row tells whether the report was cut short
+            rows = list(islice(linhas, self.DISPLAY_LIMIT + 1))
         except Exception as e:
             QMessageBox.critical(self, 'Erro', f'Erro ao gerar relatório: {str(e)}')
-    
-    def generate_sales_report(self):
-        start = self.start_date.date().toPython()
-        end = self.end_date.date().toPython()
+            return
+        finally:
+            linhas.close()
+        
+        truncated = len(rows) > self.DISPLAY_LIMIT
+        rows = rows[:self.DISPLAY_LIMIT]
         
-        sales = Venda.get_by_date_range(start, end)
-        self.report_table.setRowCount(len(sales))
+        self.report_model.set_report(relatorio, rows)
         
-        for row, sale in enumerate(sales):
-            self.report_table.setItem(row, 0, 
-                QTableWidgetItem(sale.data_venda.strftime('%d/%m/%Y')))
-            
-            client = Cliente.get_by_id(sale.cliente_id)
-            self.report_table.setItem(row, 1,
-                QTableWidgetItem(client.nome if client else 'N/A'))
-            
-            items = sale.get_items()
-            products = [f'{item.quantidade}x {Produto.get_by_id(item.produto_id).nome}'
-                       for item in items]
-            self.report_table.setItem(row, 2,
-                QTableWidgetItem('\n'.join(products)))
-            
-            self.report_table.setItem(row, 3,
-                QTableWidgetItem(f'R$ {sale.valor_total:.2f}'))
-            
-            self.report_table.setItem(row, 4,
-                QTableWidgetItem(sale.forma_pagamento))
+        if truncated:
+            self.status_label.setText(f'Mostrando as primeiras {self.DISPLAY_LIMIT} linhas; '
+                                      'exporte o relatório para ver todas.')
+        else:
+            self.status_label.setText(f'{len(rows)} linha(s)')
     
-    def generate_best_sellers_report(self):
-        start = self.start_date.date().toPython()
-        end = self.end_date.date().toPython()
+    def export_report(self):
+        if self.export_task is not None:
+            return
         
-        products = Produto.get_best_sellers(start, end)
-        self.report_table.setRowCount(len(products))
+        relatorio = RELATORIOS[self.report_type.currentIndex()]
+        path, selected_filter = QFileDialog.getSaveFileName(
+            self, 'Exportar Relatório', relatorio.chave,
+            'Planilha Excel (*.xlsx);;CSV (*.csv);;PDF (*.pdf)'
+        )
+        if not path:
+            return
+        if not path.lower().endswith(('.xlsx', '.csv', '.pdf')):
+            path += ('.csv' if 'csv' in selected_filter
+                     else '.pdf' if 'pdf' in selected_filter else '.xlsx')
         
-        for row, data in enumerate(products):
-            self.report_table.setItem(row, 0,
-                QTableWidgetItem(data['produto'].nome))
-            self.report_table.setItem(row, 1,
-                QTableWidgetItem(str(data['quantidade'])))
-            self.report_table.setItem(row, 2,
-                QTableWidgetItem(f'R$ {data["valor_total"]:.2f}'))
-            
-            lucro = data['valor_total'] - (data['produto'].preco_custo * data['quantidade'])
-            self.report_table.setItem(row, 3,
-                QTableWidgetItem(f'R$ {lucro:.2f}'))
-    
-    def generate_customer_report(self):
-        start = self.start_date.date().toPython()
-        end = self.end_date.date().toPython()
+        start, end = self.current_period() if relatorio.usa_periodo else (None, None)
+        self.export_task = ExportTask(path, relatorio, start, end)
         
-        customers = Cliente.get_most_active(start, end)
-        self.report_table.setRowCount(len(customers))
+        # Row total is unknown while streaming: busy indicator plus a counter
+        self.export_progress = QProgressDialog('Exportando...', 'Cancelar', 0, 0, self)
+        self.export_progress.setWindowTitle('Exportar Relatório')
+        self.export_progress.setWindowModality(Qt.WindowModal)
+        self.export_progress.setMinimumDuration(300)
+        self.export_progress.canceled.connect(self.export_task.cancel)
         
-        for row, data in enumerate(customers):
-            self.report_table.setItem(row, 0,
-                QTableWidgetItem(data['cliente'].nome))
-            self.report_table.setItem(row, 1,
-                QTableWidgetItem(str(data['total_compras'])))
-            self.report_table.setItem(row, 2,
-                QTableWidgetItem(f'R$ {data["valor_total"]:.2f}'))
-            self.report_table.setItem(row, 3,
-                QTableWidgetItem(data['ultima_compra'].strftime('%d/%m/%Y')))
+        self.export_task.signals.progress.connect(self.on_export_progress)
+        self.export_task.signals.finished.connect(self.on_export_finished)
+        self.export_task.signals.failed.connect(self.on_export_failed)
+        self.export_task.signals.cancelled.connect(self.on_export_cancelled)
+        self.export_btn.setEnabled(False)
+        self.export_task.start()
     
-    def generate_low_stock_report(self):
-        products = Produto.get_low_stock()
-        self.report_table.setRowCount(len(products))
-        
-        for row, product in enumerate(products):
-            self.report_table.setItem(row, 0,
-                QTableWidgetItem(product.nome))
-            self.report_table.setItem(row, 1,
-                QTableWidgetItem(str(product.estoque_atual)))
-            self.report_table.setItem(row, 2,
-                QTableWidgetItem(str(product.estoque_minimo)))
-            self.report_table.setItem(row, 3,
-                QTableWidgetItem(product.fornecedor))
-            
-            # Highlight critical stock levels
-            if product.estoque_atual == 0:
-                color = Qt.red
-            elif product.estoque_atual <= product.estoque_minimo:
-                color = Qt.yellow
-            else:
-                continue
-                
-            for col in range(self.report_table.columnCount()):
-                self.report_table.item(row, col).setBackground(color)
\ No newline at end of file
+    def on_export_progress(self, rows):
+        self.export_progress.setLabelText(f'Exportando... {rows} linhas')
+    
+    def end_export(self):
+        self.export_task = None
+        self.export_progress.reset()
+        self.export_btn.setEnabled(True)
+    
+    def on_export_finished(self, path, rows):
+        self.end_export()
+        self.status_label.setText(f'{rows} linha(s) exportadas para {path}')
+    
+    def on_export_failed(self, message):
+        self.end_export()
+        QMessageBox.critical(self, 'Erro', f'Erro ao exportar relatório: {message}')
+    
+    def on_export_cancelled(self):
+        self.end_export()
+        self.status_label.setText('Exportação cancelada')
@@ -1,16 +1,135 @@
+import sqlite3
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-                             QLineEdit, QPushButton, QTableWidget, QTableWidgetItem,
-                             QComboBox, QSpinBox, QDoubleSpinBox, QMessageBox)
-from PySide6.QtCore import Qt
+                             QLineEdit, QPushButton, QTableView, QHeaderView,
+                             QAbstractItemView, QComboBox, QDoubleSpinBox, QMessageBox,
+                             QListWidget, QListWidgetItem)
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, Signal, QUrl
+from PySide6.QtGui import QKeySequence, QShortcut, QDesktopServices
 from models.produto import Produto
 from models.cliente import Cliente
-from models.venda import Venda
-from datetime import datetime
+from config.database import is_busy_error
+from models.venda import Venda, EstoqueInsuficiente
+from models.diario_vendas import DiarioVendas
+from models.carrinho import Carrinho
+from models.dinheiro import format_brl
+from models.impressao import ReceiptRenderer, build_receipt
+from controllers.search_controller import SearchController
+from controllers.worker import Worker
+
+
+class CartTableModel(QAbstractTableModel):
+    """Table view over a Carrinho; quantity and manual price are editable in place."""
+    HEADERS = ['Produto', 'Quantidade', 'Preço Unit.', 'Preço Manual', 'Subtotal']
+    COL_QUANTIDADE = 1
+    COL_PRECO = 3
+    COL_SUBTOTAL = 4
+
+    totals_changed = Signal()
+
+    def __init__(self, carrinho, parent=None):
+        super().__init__(parent)
+        self.carrinho = carrinho
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.carrinho)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.column() in (self.COL_QUANTIDADE, self.COL_PRECO):
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        item = self.carrinho[index.row()]
+        column = index.column()
+
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return item.nome
+            if column == self.COL_QUANTIDADE:
+                return str(item.quantidade)
+            if column == 2:
+                return format_brl(item.preco_tabela)
+            if column == self.COL_PRECO:
+                return format_brl(item.preco)
+            return format_brl(item.subtotal)
+        if role == Qt.EditRole:
+            # Plain int/float so the default delegate picks a spin box
+            if column == self.COL_QUANTIDADE:
+                return item.quantidade
+            if column == self.COL_PRECO:
+                return float(item.preco)
+        if role == Qt.TextAlignmentRole and column > 0:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.EditRole or not index.isValid():
+            return False
+        row = index.row()
+        if index.column() == self.COL_QUANTIDADE:
+            changed = self.carrinho.set_quantidade(row, int(value))
+        elif index.column() == self.COL_PRECO:
+            changed = self.carrinho.set_preco(row, value)
+        else:
+            return False
+        if changed:
+            self._row_changed(row)
+        return changed
+
+    def _row_changed(self, row):
+        self.dataChanged.emit(self.index(row, self.COL_QUANTIDADE),
+                              self.index(row, self.COL_SUBTOTAL))
+        self.totals_changed.emit()
+
+    def add_product(self, product):
+        """Add or merge ``product``; returns its row, or None when out of stock."""
+        if not self.carrinho.can_add(product):
+            return None
+        row = self.carrinho.row_of(product.id)
+        if row is None:
+            row = len(self.carrinho)
+            self.beginInsertRows(QModelIndex(), row, row)
+            self.carrinho.add(product)
+            self.endInsertRows()
+            self.totals_changed.emit()
+        else:
+            self.carrinho.add(product)
+            self._row_changed(row)
+        return row
+
+    def remove_row(self, row):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self.carrinho.remove(row)
+        self.endRemoveRows()
+        self.totals_changed.emit()
+
+    def clear(self):
+        self.beginResetModel()
+        self.carrinho.clear()
+        self.endResetModel()
+        self.totals_changed.emit()
+
 
 class SalesWindow(QWidget):
-    def __init__(self):
+    def __init__(self, user=None):
         super().__init__()
+        self.user = user
         self.current_sale = None
+        self.current_client = None
+        self.receipt_renderer = None
+        self.receipt_workers = set()
+        self.last_receipt = None
         self.setup_ui()
         
     def setup_ui(self):
@@ -30,35 +149,63 @@ class SalesWindow(QWidget):
         
         layout.addLayout(header_layout)
         
+        # Product suggestions while typing a name
+        self.product_suggestions = QListWidget()
+        self.product_suggestions.setMaximumHeight(150)
+        self.product_suggestions.hide()
+        self.product_suggestions.itemActivated.connect(self.add_suggested_product)
+        layout.addWidget(self.product_suggestions)
+        
+        self.product_search_controller = SearchController(self.product_search,
+                                                          self.query_products)
+        self.product_search_controller.results_ready.connect(self.show_product_suggestions)
+        
         # Cart section
-        self.cart_table = QTableWidget()
-        self.cart_table.setColumnCount(6)  # Added one more column for manual price
-        self.cart_table.setHorizontalHeaderLabels(['Produto', 'Quantidade', 'Preço Unit.', 'Preço Manual', 'Subtotal', 'Ações'])
-        self.cart_table.horizontalHeader().setStretchLastSection(True)
+        self.cart = Carrinho()
+        self.cart_model = CartTableModel(self.cart, self)
+        self.cart_model.totals_changed.connect(self.update_total)
+        self.cart_table = QTableView()
+        self.cart_table.setModel(self.cart_model)
+        self.cart_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.cart_table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.cart_table.setEditTriggers(QAbstractItemView.DoubleClicked |
+                                        QAbstractItemView.EditKeyPressed |
+                                        QAbstractItemView.AnyKeyPressed)
+        self.cart_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.cart_table.verticalHeader().setVisible(False)
         self.cart_table.setStyleSheet("""
-            QTableWidget::item {
+            QTableView::item {
                 padding: 4px;
                 border-bottom: 1px solid #3d3d3d;
             }
             QSpinBox, QDoubleSpinBox {
-                min-width: 100px;
                 padding: 4px;
                 background-color: #2d2d2d;
                 color: #ffffff;
                 border: 1px solid #3d3d3d;
                 border-radius: 4px;
             }
+        """)
+        layout.addWidget(self.cart_table)
+        
+        self.remove_item_btn = QPushButton('Remover Item')
+        self.remove_item_btn.clicked.connect(self.remove_selected_item)
+        self.remove_item_btn.setStyleSheet("""
             QPushButton {
-                min-width: 80px;
-                padding: 4px 8px;
                 background-color: #d32f2f;
-                border-radius: 4px;
             }
             QPushButton:hover {
                 background-color: #ef5350;
             }
+            QPushButton:pressed {
+                background-color: #c62828;
+            }
         """)
-        layout.addWidget(self.cart_table)
+        remove_layout = QHBoxLayout()
+        remove_layout.addStretch()
+        remove_layout.addWidget(self.remove_item_btn)
+        layout.addLayout(remove_layout)
+        QShortcut(QKeySequence.Delete, self.cart_table, self.remove_selected_item)
         
         # Totals section
         totals_layout = QHBoxLayout()
@@ -69,7 +216,7 @@ class SalesWindow(QWidget):
         self.discount_spin = QDoubleSpinBox()
         self.discount_spin.setPrefix('Desconto: R$ ')
         self.discount_spin.setMaximum(9999.99)
-        self.discount_spin.valueChanged.connect(self.update_total)
+        self.discount_spin.valueChanged.connect(self.update_discount)
         totals_layout.addWidget(self.discount_spin)
         
         self.total_label = QLabel('Total: R$ 0,00')
@@ -88,6 +235,11 @@ class SalesWindow(QWidget):
         self.finish_sale_btn.clicked.connect(self.finish_sale)
         payment_layout.addWidget(self.finish_sale_btn)
         
+        self.print_receipt_btn = QPushButton('Imprimir Recibo')
+        self.print_receipt_btn.setEnabled(False)
+        self.print_receipt_btn.clicked.connect(self.print_last_receipt)
+        payment_layout.addWidget(self.print_receipt_btn)
+        
         layout.addLayout(payment_layout)
         
         # Initialize new sale
@@ -105,7 +257,7 @@ class SalesWindow(QWidget):
                 background-color: #2d2d2d;
                 color: #ffffff;
             }
-            QTableWidget {
+            QTableView {
                 background-color: #252526;
                 border: none;
                 border-radius: 8px;
@@ -148,8 +300,9 @@ class SalesWindow(QWidget):
         """)
     
     def new_sale(self):
-        self.current_sale = Venda()
-        self.cart_table.setRowCount(0)
+        self.current_sale = Venda(usuario_id=self.user.id if self.user else None)
+        self.current_client = None
+        self.cart_model.clear()
         self.discount_spin.setValue(0)
         self.update_total()
     
@@ -159,6 +312,7 @@ class SalesWindow(QWidget):
             client = Cliente.get_by_cpf_cnpj(cpf_cnpj)
             if client:
                 self.current_sale.cliente_id = client.id
+                self.current_client = client.nome
                 QMessageBox.information(self, 'Cliente Encontrado', f'Cliente: {client.nome}')
             else:
                 QMessageBox.warning(self, 'Cliente não Encontrado', 'Cliente não cadastrado no sistema.')
@@ -167,97 +321,143 @@ class SalesWindow(QWidget):
         code = self.product_search.text().strip()
         if code:
             product = Produto.get_by_barcode(code)
+            if product is None and self.product_suggestions.count():
+                # Not a barcode: take the best name match
+                self.add_suggested_product(self.product_suggestions.item(0))
+                return
             if product:
                 self.add_product_to_cart(product)
                 self.product_search.clear()
             else:
                 QMessageBox.warning(self, 'Produto não Encontrado', 'Produto não cadastrado no sistema.')
     
+    @staticmethod
+    def query_products(text):
+        # Runs on a worker thread; barcodes are resolved on Enter instead
+        if len(text) < 2 or text.isdigit():
+            return []
+        return Produto.search(text, limit=10)
+    
+    def show_product_suggestions(self, text, products):
+        self.product_suggestions.clear()
+        for product in products:
+            item = QListWidgetItem(f'{product.nome} - R$ {product.preco_venda:.2f}')
+            item.setData(Qt.UserRole, product.id)
+            self.product_suggestions.addItem(item)
+        self.product_suggestions.setVisible(bool(products))
+    
+    def add_suggested_product(self, item):
+        product = Produto.get_by_id(item.data(Qt.UserRole))
+        if product:
+            self.add_product_to_cart(product)
+        self.product_search_controller.cancel()
+        self.product_search.clear()
+        self.product_suggestions.clear()
+        self.product_suggestions.hide()
+    
     def add_product_to_cart(self, product):
-        row = self.cart_table.rowCount()
-        self.cart_table.insertRow(row)
-        
-        # Store product ID for later use
-        self.cart_table.setItem(row, 0, QTableWidgetItem(product.nome))
-        self.cart_table.item(row, 0).setData(Qt.UserRole, product.id)
-        
-        qty_spin = QSpinBox()
-        qty_spin.setMinimum(1)
-        qty_spin.setMaximum(min(9999, product.estoque_atual))  # Limit by available stock
-        qty_spin.valueChanged.connect(lambda: self.update_item_total(row))
-        self.cart_table.setCellWidget(row, 1, qty_spin)
-        
-        price_item = QTableWidgetItem(f'R$ {product.preco_venda:.2f}')
-        self.cart_table.setItem(row, 2, price_item)
-        
-        manual_price = QDoubleSpinBox()
-        manual_price.setPrefix('R$ ')
-        manual_price.setMaximum(9999.99)
-        manual_price.setValue(product.preco_venda)
-        manual_price.valueChanged.connect(lambda: self.update_item_total(row))
-        self.cart_table.setCellWidget(row, 3, manual_price)
-        
-        subtotal_item = QTableWidgetItem('R$ 0,00')
-        self.cart_table.setItem(row, 4, subtotal_item)
-        
-        remove_btn = QPushButton('Remover')
-        remove_btn.clicked.connect(lambda: self.remove_item(row))
-        remove_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #d32f2f;
-                color: white;
-                border: none;
-                border-radius: 4px;
-                padding: 4px 8px;
-            }
-            QPushButton:hover {
-                background-color: #ef5350;
-            }
-            QPushButton:pressed {
-                background-color: #c62828;
-            }
-        """)
-        self.cart_table.setCellWidget(row, 5, remove_btn)
-        
-        # Update sale model
-        self.current_sale.add_item(product.id, 1, product.preco_venda)
-        self.update_item_total(row)
+        row = self.cart_model.add_product(product)
+        if row is None:
+            QMessageBox.warning(self, 'Estoque Insuficiente',
+                                f'Sem estoque disponível para {product.nome}.')
+            return
+        self.cart_table.selectRow(row)
     
-    def update_item_total(self, row):
-        qty = self.cart_table.cellWidget(row, 1).value()
-        manual_price = self.cart_table.cellWidget(row, 3).value()
-        subtotal = qty * manual_price
-        
-        self.cart_table.item(row, 4).setText(f'R$ {subtotal:.2f}')
-        self.update_total()
+    def remove_selected_item(self):
+        index = self.cart_table.currentIndex()
+        if index.isValid():
+            self.cart_model.remove_row(index.row())
     
-    def remove_item(self, row):
-        self.cart_table.removeRow(row)
+    def update_discount(self, value):
+        self.cart.set_desconto(value)
         self.update_total()
     
     def update_total(self):
-        subtotal = sum(float(self.cart_table.item(row, 4).text().replace('R$ ', ''))
-                      for row in range(self.cart_table.rowCount()))
-        
-        discount = self.discount_spin.value()
-        total = subtotal - discount
-        
-        self.subtotal_label.setText(f'Subtotal: R$ {subtotal:.2f}')
-        self.total_label.setText(f'Total: R$ {total:.2f}')
+        self.subtotal_label.setText(f'Subtotal: {format_brl(self.cart.subtotal)}')
+        self.total_label.setText(f'Total: {format_brl(self.cart.total)}')
     
     def finish_sale(self):
-        if self.cart_table.rowCount() == 0:
+        if not len(self.cart):
             QMessageBox.warning(self, 'Venda Vazia',
                                'Adicione produtos antes de finalizar a venda.')
             return
         
+        self.cart.fill_venda(self.current_sale)
         self.current_sale.forma_pagamento = self.payment_method.currentText()
-        self.current_sale.desconto = self.discount_spin.value()
         
-        if self.current_sale.save():
-            QMessageBox.information(self, 'Sucesso',
-                                   'Venda finalizada com sucesso!')
-            self.new_sale()
-        else:
+        # Take the units out of stock while the customer is still here; a
+        # short line refuses the sale and nothing is taken
+        try:
+            self.current_sale.reserve_stock()
+        except EstoqueInsuficiente as e:
+            self.show_shortfall(e.faltas)
+            return
+        except sqlite3.Error as e:
+            if not is_busy_error(e):
+                QMessageBox.critical(self, 'Erro',
+                                    f'Erro ao finalizar a venda: {e}. Tente novamente.')
+                return
+            # Database busy: sell anyway, the committer records any shortfall
+            print(f"Error reserving stock, selling without reservation: {e}")
+        
+        # Journalled locally and committed in the background, so checkout
+        # does not wait on (or fail because of) a busy database
+        try:
+            DiarioVendas().append(self.current_sale)
+        except OSError as e:
+            try:
+                self.current_sale.release_stock()
+            except sqlite3.Error as release_error:
+                print(f"Error releasing reserved stock: {release_error}")
             QMessageBox.critical(self, 'Erro',
-                                'Erro ao finalizar a venda. Tente novamente.')
\ No newline at end of file
+                                f'Erro ao finalizar a venda: {e}. Tente novamente.')
+            return
+        
+        self.render_receipt()
+        QMessageBox.information(self, 'Sucesso',
+                               'Venda finalizada com sucesso!')
+        self.new_sale()
+    
+    def show_shortfall(self, faltas):
+        # Cap the cart lines at what is really on the shelf, so the cashier
+        # can adjust the quantities and finish again
+        for falta in faltas:
+            for item in self.cart.itens:
+                if item.produto_id == falta['produto_id']:
+                    item.estoque = max(falta['disponivel'], 0)
+        linhas = '\n'.join(
+            f"• {falta['produto_nome'] or falta['produto_id']}: "
+            f"{falta['solicitado']} no carrinho, {falta['disponivel']} em estoque"
+            for falta in faltas
+        )
+        QMessageBox.warning(self, 'Estoque Insuficiente',
+                           f'Não há estoque suficiente para:\n{linhas}\n\n'
+                           'Ajuste as quantidades e finalize novamente.')
+    
+    def render_receipt(self):
+        # The PDF is drawn on a pool thread from a snapshot of the sale,
+        # so the register is free for the next customer straight away
+        if self.receipt_renderer is None:
+            self.receipt_renderer = ReceiptRenderer()
+        nomes = {item.produto_id: item.nome for item in self.cart.itens}
+        recibo = build_receipt(self.current_sale, nomes,
+                               operador=self.user.nome if self.user else None,
+                               cliente=self.current_client)
+        worker = Worker(self.receipt_renderer.render, recibo)
+        worker.signals.finished.connect(self.on_receipt_rendered)
+        worker.signals.failed.connect(self.on_receipt_failed)
+        worker.signals.finished.connect(lambda _, w=worker: self.receipt_workers.discard(w))
+        worker.signals.failed.connect(lambda _, w=worker: self.receipt_workers.discard(w))
+        self.receipt_workers.add(worker)
+        worker.start()
+    
+    def on_receipt_rendered(self, path):
+        self.last_receipt = path
+        self.print_receipt_btn.setEnabled(True)
+    
+    def on_receipt_failed(self, message):
+        print(f"Error rendering receipt: {message}")
+    
+    def print_last_receipt(self):
+        if self.last_receipt:
+            QDesktopServices.openUrl(QUrl.fromLocalFile(self.last_receipt))
\ No newline at end of file